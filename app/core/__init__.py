@@ -7,10 +7,13 @@ from app.core.security import (
     get_password_hash,
     create_access_token,
     decode_access_token,
+    decode_access_token_cached,
     authenticate_admin,
-    get_current_user
+    get_current_user,
+    get_webhook_secret,
+    verify_webhook_secret
 )
-from app.core.logging import setup_logging
+from app.core.logging import setup_logging, stop_logging
 
 __all__ = [
     "settings",
@@ -19,7 +22,11 @@ __all__ = [
     "get_password_hash",
     "create_access_token",
     "decode_access_token",
+    "decode_access_token_cached",
     "authenticate_admin",
     "get_current_user",
-    "setup_logging"
+    "get_webhook_secret",
+    "verify_webhook_secret",
+    "setup_logging",
+    "stop_logging"
 ]
@@ -2,6 +2,7 @@
 Configuration Management
 """
 import os
+from typing import Optional
 from pydantic import BaseSettings
 from functools import lru_cache
 
@@ -16,18 +17,105 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-super-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    COOKIE_SECURE: Optional[bool] = None  # Send the login cookie over HTTPS only; unset means "not DEBUG"
     
     # Admin Credentials
     ADMIN_USERNAME: str = "admin"
     ADMIN_PASSWORD: str = "admin123"  # Change this!
+    ADMIN_PASSWORD_HASH: str = ""  # bcrypt hash; takes precedence over ADMIN_PASSWORD
+    AUTH_CACHE_TTL: float = 300.0  # Seconds a verified token or password is cached
+    METRICS_TOKEN: str = ""  # Bearer token required by /metrics; empty leaves it open
     
     # Database
     DATABASE_URL: str = "sqlite:///./data/master_bot.db"
     
+    # Audit Log Writer
+    AUDIT_LOG_BATCH_SIZE: int = 200  # Rows per bulk insert
+    AUDIT_LOG_FLUSH_INTERVAL: float = 1.0  # Max seconds an entry waits before being written
+    AUDIT_LOG_MAX_QUEUE: int = 100000  # Oldest entries are dropped beyond this
+    AUDIT_LOG_MAX_RETRIES: int = 5  # Failed writes retried before a batch is dropped
+    
+    # Audit Log Retention (older rows move to compressed daily archives)
+    LOG_RETENTION_DAYS: int = 90  # 0 keeps every row in the database
+    LOG_ARCHIVE_DIR: str = "./data/logs/audit"
+    LOG_ARCHIVE_CHUNK_SIZE: int = 5000  # Rows moved per transaction
+    LOG_RETENTION_INTERVAL: float = 3600.0  # Seconds between archival runs
+    
+    # System Stats Sampler (ring buffer in memory, 1m/1h/1d rollups in system_stats)
+    STATS_SAMPLE_INTERVAL: float = 1.0  # Seconds between samples
+    STATS_BUFFER_SIZE: int = 3600  # Samples kept in memory
+    STATS_RETENTION_1M_DAYS: int = 7  # Days of minute rows kept; 0 keeps all
+    STATS_RETENTION_1H_DAYS: int = 90  # Days of hour rows kept; daily rows are never pruned
+    
+    # Request Profiling (single requests opt in with an "X-Profile: 1" or "X-Profile: sample" header)
+    PROFILING_ENABLED: bool = False  # Profile every request
+    PROFILING_SAMPLE: bool = False  # Also sample the event loop stack of every profiled request
+    PROFILING_SAMPLE_INTERVAL: float = 0.005  # Seconds between stack samples
+    PROFILING_SLOW_MS: float = 500.0  # Profiled requests slower than this are logged and kept
+    PROFILING_HISTORY: int = 200  # Recent and slow profiles kept in memory
+    
     # Bots Directory
     BOTS_DIR: str = "./data/bots"
     LOGS_DIR: str = "./data/logs"
     
+    # Logging (written by a background thread; per-bot files go to LOGS_DIR/bots)
+    LOG_LEVEL: str = "INFO"
+    LOG_ROTATION: str = "size"  # size, or a TimedRotatingFileHandler interval such as midnight
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # Size at which a log file rotates
+    LOG_BACKUP_COUNT: int = 7  # Rotated files kept per log
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer; newer ones are dropped beyond this
+    BOT_LOG_FILES: bool = True  # Also write each bot's records to bot_<id>.log
+    BOT_LOG_MAX_OPEN: int = 128  # Per-bot log files kept open at once
+    LOG_TAIL_HISTORY: int = 1000  # Recent bot log lines a reconnecting live tail can resume from
+    LOG_TAIL_CLIENT_BUFFER: int = 500  # Lines buffered per live tail client before the oldest are dropped
+    
+    # Templates
+    TEMPLATE_CACHE_DIR: str = "./data/cache/templates"  # Compiled template bytecode; empty disables
+    TEMPLATE_FRAGMENT_CACHE_SIZE: int = 5000  # Bots whose rendered rows and cards are kept
+    
+    # API Response Cache (ETags follow bot and log changes)
+    RESPONSE_CACHE_TTL: float = 2.0  # Seconds a serialized read API response is reused
+    RESPONSE_CACHE_SIZE: int = 1000  # Cached responses, one per path and query string
+    
+    # Live Dashboard (deltas pushed over /api/dashboard/stream)
+    DASHBOARD_PUSH_INTERVAL: float = 1.0  # Min seconds between updates sent to one dashboard
+    
+    # Bot Runtime
+    BOT_RUN_MODE: str = "polling"  # polling, webhook
+    WEBHOOK_BASE_URL: str = ""  # Public HTTPS base URL Telegram can reach, e.g. https://bots.example.com
+    BOT_SHARDS: int = 0  # Worker processes running bots; 0 runs bots in the API process
+    TELEGRAM_API_URL: str = ""  # Custom Bot API server; empty uses api.telegram.org
+    
+    # Shared HTTP Pool (connections to the Telegram Bot API)
+    HTTP_POOL_LIMIT: int = 100  # Max open connections across all bots
+    HTTP_POOL_LIMIT_PER_HOST: int = 100  # Max open connections per host
+    HTTP_POOL_KEEPALIVE_TIMEOUT: float = 60.0  # Seconds an idle connection is kept
+    
+    # Outbound Send Scheduler (Telegram allows ~30 msg/s per bot, 1 msg/s per chat)
+    SEND_BOT_RATE: float = 30.0  # Messages per second per bot
+    SEND_CHAT_RATE: float = 1.0  # Messages per second per chat
+    SEND_GLOBAL_RATE: float = 0.0  # Messages per second across all bots; 0 disables
+    
+    # Bulk Operations
+    BULK_CONCURRENCY: int = 20  # Bots started or stopped in parallel by bulk actions
+    
+    # Warm Start (restore bots that were running before a restart)
+    RESTORE_BOTS_ON_STARTUP: bool = True
+    WARM_START_RATE: float = 10.0  # Bots started per second
+    WARM_START_BATCH_SIZE: int = 10  # Bots started together
+    
+    # Supervisor (restarts crashed or stalled bots)
+    SUPERVISOR_INTERVAL: float = 5.0  # Seconds between health checks
+    SUPERVISOR_STALL_TIMEOUT: float = 60.0  # Restart a polling bot without a successful poll for this long
+    SUPERVISOR_MAX_ERRORS: int = 5  # Restart after this many getUpdates errors in a row
+    SUPERVISOR_BACKOFF_BASE: float = 1.0  # First restart delay; doubles per consecutive failure
+    SUPERVISOR_BACKOFF_MAX: float = 300.0  # Upper bound for the restart delay
+    
+    # Shared Polling Scheduler
+    POLL_WORKERS: int = 50  # Max concurrent getUpdates requests
+    POLL_MIN_INTERVAL: float = 0.5  # Seconds between polls of a busy bot
+    POLL_MAX_INTERVAL: float = 10.0  # Seconds between polls of an idle bot
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
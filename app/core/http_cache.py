@@ -0,0 +1,137 @@
+"""
+Conditional GET and Response Caching
+"""
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.serialization import FastJSONResponse
+
+# Changes with every process start, so counters that restart at 0 never repeat an ETag
+_EPOCH = secrets.token_hex(4)
+
+class ResourceVersions:
+    """Counters bumped whenever a resource changes, e.g. "bots" or "logs"
+    
+    A response built from resources whose counters have not moved is still
+    current, so it can be answered with 304 or served from the cache
+    without looking at the data.
+    """
+    
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+    
+    def bump(self, resource: str):
+        """Record a change of a resource"""
+        self._versions[resource] = self._versions.get(resource, 0) + 1
+    
+    def get(self, resource: str) -> int:
+        """Current counter of a resource"""
+        return self._versions.get(resource, 0)
+    
+    def tag(self, resources: Sequence[str]) -> str:
+        """Combined version of several resources"""
+        return ".".join(str(self.get(resource)) for resource in resources)
+
+class ResponseCache:
+    """Serialized API responses keyed by path and query string
+    
+    An entry is reused until RESPONSE_CACHE_TTL passes or, for responses
+    built from versioned resources, one of them changes. The least
+    recently used entries are evicted beyond `max_entries`.
+    """
+    
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl if ttl is not None else settings.RESPONSE_CACHE_TTL
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_SIZE
+        # key -> (version, expires_at, body, etag)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Optional[str], float, bytes, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+    
+    def get(self, key: Tuple[str, str], version: Optional[str]) -> Optional[Tuple[bytes, str]]:
+        """Body and ETag of a current entry"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] < time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return entry[2], entry[3]
+    
+    def put(self, key: Tuple[str, str], version: Optional[str], body: bytes, etag: str):
+        """Store a serialized response"""
+        self._entries[key] = (version, time.monotonic() + self.ttl, body, etag)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get_stats(self) -> dict:
+        """Entries and hit counters"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
+
+def _matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+def _not_modified(etag: str) -> Response:
+    response_cache.not_modified += 1
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+async def cached_json(
+    request: Request,
+    build: Callable[[], Awaitable[dict]],
+    resources: Sequence[str] = ()
+) -> Response:
+    """JSON response with a strong ETag, 304 handling and a short-lived cache
+    
+    With `resources`, the ETag is derived from their version counters and
+    the query, so an unchanged poll gets 304 before `build` runs or the
+    cache is consulted. Without, the ETag is a digest of the body and only
+    saves the transfer.
+    """
+    key = (request.url.path, request.url.query)
+    version = versions.tag(resources) if resources else None
+    if version is not None:
+        query_digest = hashlib.blake2b(f"{key[0]}?{key[1]}".encode(), digest_size=6).hexdigest()
+        etag = f'"{_EPOCH}-{version}-{query_digest}"'
+        if _matches(request, etag):
+            return _not_modified(etag)
+    
+    cached = response_cache.get(key, version)
+    if cached is not None:
+        response_cache.hits += 1
+        body, etag = cached
+    else:
+        response_cache.misses += 1
+        # Payloads are plain data, so jsonable_encoder is skipped
+        body = FastJSONResponse(await build()).body
+        if version is None:
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        response_cache.put(key, version, body, etag)
+    
+    if _matches(request, etag):
+        return _not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
+
+# Global resource versions instance
+versions = ResourceVersions()
+
+# Global response cache instance
+response_cache = ResponseCache()
@@ -1,18 +1,129 @@
 """
 Logging Configuration
 """
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-import os
-from datetime import datetime
+from collections import OrderedDict
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Optional
 
-def setup_logging():
-    """Setup application logging"""
-    log_dir = Path("data/logs")
-    log_dir.mkdir(parents=True, exist_ok=True)
+from app.core.config import settings
+
+# Bot whose update is being handled by the current task; tags its log records
+current_bot_id: ContextVar[Optional[int]] = ContextVar("current_bot_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+def _rotating_handler(path: Path) -> logging.Handler:
+    """File handler rotating by size or by LOG_ROTATION interval"""
+    if settings.LOG_ROTATION == "size":
+        return logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True
+        )
+    return logging.handlers.TimedRotatingFileHandler(
+        path,
+        when=settings.LOG_ROTATION,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,
+        utc=True
+    )
+
+class BotContextFilter(logging.Filter):
+    """Copy the current bot id onto records that were not given one"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "bot_id", None) is None:
+            record.bot_id = current_bot_id.get()
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the writer thread without ever blocking the caller
+    
+    When the writer falls behind and the queue is full, new records are
+    dropped and counted instead of stalling the event loop.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+    
+    def enqueue(self, record: logging.LogRecord):
+        # The queue itself is unbounded so the listener's stop sentinel always fits
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+class PerBotFileHandler(logging.Handler):
+    """Write records tagged with a bot id to LOGS_DIR/bots/bot_<id>.log
+    
+    Runs on the writer thread. At most `max_open` files are kept open; the
+    least recently used one is closed when another bot logs.
+    """
+    
+    def __init__(self, directory: Path, max_open: int):
+        super().__init__()
+        self.directory = directory
+        self.max_open = max_open
+        self._handlers: "OrderedDict[int, logging.Handler]" = OrderedDict()
+    
+    def _handler(self, bot_id: int) -> logging.Handler:
+        handler = self._handlers.get(bot_id)
+        if handler is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            handler = _rotating_handler(self.directory / f"bot_{bot_id}.log")
+            handler.setFormatter(self.formatter)
+            self._handlers[bot_id] = handler
+            if len(self._handlers) > self.max_open:
+                _, oldest = self._handlers.popitem(last=False)
+                oldest.close()
+        else:
+            self._handlers.move_to_end(bot_id)
+        return handler
     
-    log_filename = log_dir / f"master_bot_{datetime.now().strftime('%Y%m%d')}.log"
+    def emit(self, record: logging.LogRecord):
+        bot_id = getattr(record, "bot_id", None)
+        if bot_id is None:
+            return
+        try:
+            self._handler(bot_id).handle(record)
+        except Exception:
+            self.handleError(record)
+    
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers.clear()
+        super().close()
+
+def setup_logging(process_name: str = None):
+    """Setup application logging
+    
+    Records from every logger go through a bounded queue to a background
+    writer thread, so logging never does file I/O on the event loop.
+    Calling this again returns the existing setup. Shard processes pass
+    their name to get a main log file of their own.
+    """
+    global _listener, _queue_handler
+    
+    logger = logging.getLogger("master_bot")
+    if _listener is not None:
+        return logger
+    
+    log_dir = Path(settings.LOGS_DIR)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_filename = log_dir / (f"master_bot.{process_name}.log" if process_name else "master_bot.log")
     
     # Create formatter
     formatter = logging.Formatter(
@@ -20,7 +131,7 @@ def setup_logging():
     )
     
     # File handler
-    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
+    file_handler = _rotating_handler(log_filename)
     file_handler.setFormatter(formatter)
     file_handler.setLevel(logging.INFO)
     
@@ -29,13 +140,54 @@ def setup_logging():
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.DEBUG)
     
-    # Setup logger
-    logger = logging.getLogger("master_bot")
+    handlers = [file_handler, console_handler]
+    if settings.BOT_LOG_FILES:
+        bot_handler = PerBotFileHandler(log_dir / "bots", settings.BOT_LOG_MAX_OPEN)
+        bot_handler.setFormatter(formatter)
+        handlers.append(bot_handler)
+    
+    # Everything funnels through the queue; the listener thread does the writing
+    _queue_handler = DroppingQueueHandler(queue.Queue(), settings.LOG_QUEUE_SIZE)
+    _queue_handler.addFilter(BotContextFilter())
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.addHandler(_queue_handler)
     logger.setLevel(logging.DEBUG)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
     
     return logger
 
-# Create logs directory on import
-Path("data/logs").mkdir(parents=True, exist_ok=True)
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+def add_log_handler(handler: logging.Handler):
+    """Run an extra handler on the writer thread, e.g. to stream records"""
+    if _listener is not None:
+        _listener.handlers = _listener.handlers + (handler,)
+
+def remove_log_handler(handler: logging.Handler):
+    """Stop running a handler added with add_log_handler"""
+    if _listener is not None:
+        _listener.handlers = tuple(h for h in _listener.handlers if h is not handler)
+
+def get_logging_stats() -> dict:
+    """Queue depth and records dropped because the writer fell behind"""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped
+    }
@@ -0,0 +1,365 @@
+"""
+Runtime Metrics
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.profiling import record_query
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by /metrics"""
+    
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+    
+    def register(self, metric: "Metric"):
+        """Add a metric to the registry"""
+        self._metrics.append(metric)
+    
+    def collect(self) -> List[dict]:
+        """Snapshot all metrics as plain, picklable families"""
+        return [metric.collect() for metric in self._metrics]
+
+class Metric:
+    """Base class of a metric family with optional labels
+    
+    Children are cached per label tuple, so recording a value on the hot
+    path is one dict lookup plus an attribute update. Label values are
+    only turned into strings when the family is collected.
+    """
+    
+    type = "untyped"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry or REGISTRY).register(self)
+    
+    def labels(self, *values):
+        """Child for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+    
+    def remove(self, *values):
+        """Drop the series of one label combination"""
+        self._children.pop(values, None)
+    
+    def remove_matching(self, label: str, value):
+        """Drop every series whose `label` has the given value"""
+        index = self.labelnames.index(label)
+        for values in [v for v in self._children if v[index] == value]:
+            del self._children[values]
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def _samples(self, labels: dict, child) -> List[Tuple[str, dict, float]]:
+        raise NotImplementedError
+    
+    def collect(self) -> dict:
+        """Family with one or more samples per child"""
+        samples = []
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, map(str, values)))
+            samples.extend(self._samples(labels, child))
+        return {
+            "name": self.name,
+            "type": self.type,
+            "help": self.documentation,
+            "samples": samples
+        }
+
+class _CounterChild:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+    
+    type = "counter"
+    
+    def _new_child(self):
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        """Increment the unlabelled counter"""
+        self._children[()].value += amount
+    
+    def values(self) -> Dict[tuple, float]:
+        """Current value per label tuple"""
+        return {values: child.value for values, child in list(self._children.items())}
+    
+    def _samples(self, labels, child):
+        return [(f"{self.name}_total", labels, child.value)]
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+    
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at scrape time"""
+    
+    type = "gauge"
+    
+    def _new_child(self):
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        """Set the unlabelled gauge"""
+        self._children[()].value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """Read the unlabelled gauge from `function` on every scrape"""
+        self._children[()].function = function
+    
+    def _samples(self, labels, child):
+        value = child.function() if child.function else child.value
+        return [(self.name, labels, value)]
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+    
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+    
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[MetricsRegistry] = None
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        """Record a value on the unlabelled histogram"""
+        self._children[()].observe(value)
+    
+    def _samples(self, labels, child):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append((f"{self.name}_sum", labels, child.sum))
+        samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+def _format_value(value: float) -> str:
+    """Number as written in the exposition format"""
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def with_labels(families: List[dict], **labels) -> List[dict]:
+    """Add constant labels to every sample, e.g. the shard a family came from"""
+    return [
+        {
+            **family,
+            "samples": [(name, {**sample_labels, **labels}, value) for name, sample_labels, value in family["samples"]]
+        }
+        for family in families
+    ]
+
+def render(families: List[dict]) -> str:
+    """Render families in the Prometheus text format
+    
+    Families sharing a name (e.g. the same metric reported by several
+    shards) are merged under one HELP/TYPE header.
+    """
+    merged: Dict[str, dict] = {}
+    for family in families:
+        target = merged.get(family["name"])
+        if target is None:
+            merged[family["name"]] = {**family, "samples": list(family["samples"])}
+        else:
+            target["samples"].extend(family["samples"])
+    
+    lines = []
+    for family in merged.values():
+        lines.append(f"# HELP {family['name']} {family['help']}")
+        lines.append(f"# TYPE {family['name']} {family['type']}")
+        for name, labels, value in family["samples"]:
+            if labels:
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """Record request count and latency per route template
+    
+    A plain ASGI middleware rather than BaseHTTPMiddleware, which would
+    wrap every response body in an extra task and stream.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[dict] = None
+    
+    def _route_path(self, scope: dict) -> str:
+        """Template of the matched route, e.g. /api/bots/{bot_id}"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {}
+            for route in scope["app"].routes:
+                target = getattr(route, "endpoint", None) or getattr(route, "app", None)
+                if target is not None:
+                    self._routes.setdefault(target, route.path)
+        return self._routes.get(endpoint, "unmatched")
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route_path(scope)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(scope["method"], route, status_code).inc()
+
+def instrument_engine(engine):
+    """Time every statement executed through a SQLAlchemy engine, for /metrics and request profiles"""
+    from sqlalchemy import event
+    
+    sync_engine = getattr(engine, "sync_engine", engine)
+    
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+    
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is not None:
+            operation = statement.lstrip()[:10].split(None, 1)[0].upper()
+            elapsed = time.perf_counter() - start
+            DB_QUERY_DURATION.labels(operation).observe(elapsed)
+            record_query(elapsed)
+
+# Global metrics registry
+REGISTRY = MetricsRegistry()
+
+# Bot runtime
+BOTS_ACTIVE = Gauge("bots_active", "Bots running in this process")
+BOTS_POLLING = Gauge("bots_polling", "Bots registered with the polling scheduler")
+BOT_UPDATES_RECEIVED = Counter(
+    "bot_updates_received", "Updates received from Telegram", ["bot_id", "source"]
+)
+BOT_REPLIES_SENT = Counter("bot_replies_sent", "Messages sent through the send scheduler", ["bot_id"])
+BOT_HANDLER_DURATION = Histogram(
+    "bot_handler_duration_seconds", "Time spent processing one update", ["update_type"]
+)
+BOT_UPDATE_LAG = Histogram(
+    "bot_update_lag_seconds", "Delay between a message being sent and its update being processed",
+    ["source"], buckets=LAG_BUCKETS
+)
+BOT_HANDLER_ERRORS = Counter("bot_handler_errors", "Updates whose handler raised", ["bot_id"])
+SEND_QUEUE_DEPTH = Gauge("send_queue_depth", "Outbound messages waiting in the send scheduler")
+
+# Telegram Bot API
+TELEGRAM_API_REQUEST_DURATION = Histogram(
+    "telegram_api_request_duration_seconds", "Bot API request latency", ["method"]
+)
+TELEGRAM_API_ERRORS = Counter(
+    "telegram_api_errors", "Bot API requests that failed, by HTTP status or 'network'", ["method", "code"]
+)
+TELEGRAM_API_RATE_LIMITED = Counter(
+    "telegram_api_rate_limited", "429 responses to outbound messages", ["bot_id"]
+)
+
+# Admin API
+HTTP_REQUESTS = Counter("http_requests", "HTTP requests handled", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+
+# Database
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["operation"], buckets=DB_BUCKETS
+)
+
+# Families labelled by bot_id; their series are dropped when a bot stops
+PER_BOT_METRICS = (BOT_UPDATES_RECEIVED, BOT_REPLIES_SENT, BOT_HANDLER_ERRORS, TELEGRAM_API_RATE_LIMITED)
+
+def remove_bot(bot_id: int):
+    """Drop a stopped bot's series, so /metrics only grows with running bots"""
+    for metric in PER_BOT_METRICS:
+        metric.remove_matching("bot_id", bot_id)
@@ -0,0 +1,298 @@
+"""
+Request Profiling
+"""
+import functools
+import inspect
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Request header that turns profiling on for one request: "1" or "sample"
+PROFILE_HEADER = b"x-profile"
+PHASES = ("dependencies", "handler", "db", "template", "serialization", "other")
+# Innermost frames kept per sampled stack
+MAX_STACK_DEPTH = 40
+# Distinct stacks returned from a sampling profile
+MAX_STACKS = 50
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+class RequestProfile:
+    """Timing breakdown of one request
+    
+    Phases nest (a query runs inside the handler), so time is charged to
+    the innermost active phase only and all phases add up to the total.
+    Time spent awaiting, including waiting for the event loop while other
+    tasks run, is charged to the phase that was awaiting.
+    """
+    
+    def __init__(self, profile_id: int, method: str, path: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.recorded_at = time.time()
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.status: Optional[int] = None
+        self.total: Optional[float] = None
+        self.stacks: Optional[List[dict]] = None
+        self._stack = ["other"]
+        self._started = self._mark = time.perf_counter()
+    
+    def enter(self, phase: str):
+        """Start charging time to a nested phase"""
+        now = time.perf_counter()
+        self.phases[self._stack[-1]] += now - self._mark
+        self._stack.append(phase)
+        self._mark = now
+    
+    def exit(self):
+        """Return to the enclosing phase"""
+        now = time.perf_counter()
+        self.phases[self._stack.pop()] += now - self._mark
+        self._mark = now
+    
+    def add(self, phase: str, seconds: float):
+        """Move time measured elsewhere into a phase, e.g. one query"""
+        self.phases[phase] += seconds
+        self.phases[self._stack[-1]] -= seconds
+    
+    def finish(self):
+        """Close all open phases"""
+        while len(self._stack) > 1:
+            self.exit()
+        self.exit()
+        self.total = time.perf_counter() - self._started
+    
+    def server_timing(self) -> str:
+        """Phases so far as a Server-Timing header value"""
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items() if seconds > 0
+        )
+    
+    def to_dict(self, include_stacks: bool = True) -> dict:
+        """Convert to dictionary, times in milliseconds"""
+        data = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.recorded_at)),
+            "total_ms": round((self.total or 0.0) * 1000, 2),
+            "phases_ms": {phase: round(seconds * 1000, 2) for phase, seconds in self.phases.items()},
+            "queries": self.queries,
+            "sampled": self.stacks is not None
+        }
+        if include_stacks and self.stacks is not None:
+            data["stacks"] = self.stacks
+        return data
+
+class StackSampler:
+    """Samples the event loop thread's stack from a helper thread
+    
+    Only one sampler runs at a time; concurrent profiled requests share
+    the loop thread, so a second sampler would record the same stacks.
+    """
+    
+    _lock = threading.Lock()
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = 0
+        self._counts: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    @classmethod
+    def start_if_idle(cls, interval: float) -> Optional["StackSampler"]:
+        """Start sampling unless another request is being sampled"""
+        if not cls._lock.acquire(blocking=False):
+            return None
+        sampler = cls(interval)
+        sampler._thread.start()
+        return sampler
+    
+    def stop(self) -> List[dict]:
+        """Stop sampling and return the most frequent stacks, outermost frame first"""
+        self._stopped.set()
+        self._thread.join()
+        StackSampler._lock.release()
+        return [
+            {"stack": stack, "samples": count, "percent": round(count * 100 / self.samples, 1)}
+            for stack, count in self._counts.most_common(MAX_STACKS)
+        ]
+    
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self._counts[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+class RequestProfiler:
+    """Keeps recent and slow request profiles"""
+    
+    def __init__(self, history: int = None, slow_ms: float = None):
+        self.slow_ms = slow_ms if slow_ms is not None else settings.PROFILING_SLOW_MS
+        history = history or settings.PROFILING_HISTORY
+        self.recent: Deque[RequestProfile] = deque(maxlen=history)
+        self.slow: Deque[RequestProfile] = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self.profiled = 0
+    
+    def begin(self, method: str, path: str) -> RequestProfile:
+        """Create a profile for a request"""
+        return RequestProfile(next(self._ids), method, path)
+    
+    def record(self, profile: RequestProfile):
+        """Keep a finished profile and log it if the request was slow"""
+        self.profiled += 1
+        self.recent.append(profile)
+        total_ms = profile.total * 1000
+        if total_ms >= self.slow_ms:
+            self.slow.append(profile)
+            breakdown = " ".join(
+                f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in profile.phases.items() if seconds > 0
+            )
+            logger.warning(
+                f"Slow request {profile.method} {profile.path} took {total_ms:.0f}ms "
+                f"({breakdown}, {profile.queries} queries) [profile {profile.id}]"
+            )
+    
+    def list(self, slow_only: bool = False, limit: int = 50) -> List[dict]:
+        """Summaries of the latest profiles, newest first"""
+        profiles = self.slow if slow_only else self.recent
+        return [profile.to_dict(include_stacks=False) for profile in reversed(list(profiles)[-limit:])]
+    
+    def get(self, profile_id: int) -> Optional[dict]:
+        """One profile including its sampled stacks"""
+        for profile in itertools.chain(self.recent, self.slow):
+            if profile.id == profile_id:
+                return profile.to_dict()
+        return None
+    
+    def get_stats(self) -> dict:
+        """Profiling configuration and counters"""
+        return {
+            "enabled": settings.PROFILING_ENABLED,
+            "sample": settings.PROFILING_SAMPLE,
+            "slow_ms": self.slow_ms,
+            "profiled": self.profiled,
+            "slow": len(self.slow)
+        }
+
+def record_query(seconds: float):
+    """Charge one SQL statement to the current request's profile"""
+    profile = _current.get()
+    if profile is not None:
+        profile.add("db", seconds)
+        profile.queries += 1
+
+@contextmanager
+def profile_phase(phase: str):
+    """Charge the enclosed block to a phase of the current profile, if any"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    profile.enter(phase)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+def timed(phase: str):
+    """Decorator charging calls of a function to a phase of the current profile"""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                with profile_phase(phase):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with profile_phase(phase):
+                    return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that charges the endpoint function to the "handler" phase
+    
+    Routers opt in with APIRouter(route_class=ProfiledRoute). The other
+    phases are marked in our own code: the auth dependency, the shared
+    templates and FastJSONResponse. Without an active profile each of
+    these costs one ContextVar lookup.
+    """
+    
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, timed("handler")(endpoint), **kwargs)
+
+class ProfilingMiddleware:
+    """Profile requests when PROFILING_ENABLED is set or an X-Profile header asks for it
+    
+    A profiled response carries a Server-Timing header; the full breakdown
+    is kept by the global profiler and served under /api/profiling.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    def _mode(self, scope: dict) -> Optional[str]:
+        """None, "timing" or "sample" for this request"""
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return "sample" if value.lower() == b"sample" else "timing"
+        if settings.PROFILING_ENABLED:
+            return "sample" if settings.PROFILING_SAMPLE else "timing"
+        return None
+    
+    async def __call__(self, scope, receive, send):
+        mode = self._mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        
+        profile = profiler.begin(scope["method"], scope["path"])
+        token = _current.set(profile)
+        sampler = StackSampler.start_if_idle(settings.PROFILING_SAMPLE_INTERVAL) if mode == "sample" else None
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                headers.append((b"x-profile-id", str(profile.id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            profile.finish()
+            if sampler is not None:
+                profile.stacks = sampler.stop()
+            profiler.record(profile)
+
+# Global request profiler instance
+profiler = RequestProfiler()
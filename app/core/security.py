@@ -1,20 +1,62 @@
 """
 Security and Authentication Utilities
 """
+import hmac
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 
 from app.core.config import settings
+from app.core.profiling import timed
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# HTTP Basic Auth
-security = HTTPBasic()
+# HTTP Basic Auth; optional because a token may be sent instead
+security = HTTPBasic(auto_error=False)
+
+# Name of the cookie holding the access token
+TOKEN_COOKIE = "access_token"
+
+class TTLCache:
+    """Small LRU cache whose entries expire"""
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+
+# Decoded tokens and recently verified passwords
+token_cache = TTLCache()
+credential_cache = TTLCache()
+
+_admin_password_hash: Optional[str] = None
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -51,24 +93,102 @@ def decode_access_token(token: str) -> dict:
     except JWTError:
         return None
 
-def get_current_user(credentials: HTTPBasicCredentials = Depends(security)):
+def _request_token(request: Request) -> Optional[str]:
+    """Access token from the Authorization header or the login cookie"""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return request.cookies.get(TOKEN_COOKIE)
+
+@timed("dependencies")
+async def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPBasicCredentials] = Depends(security)
+):
     """Get current authenticated user"""
-    # Simple username/password check (in production, check against database)
-    if credentials.username == settings.ADMIN_USERNAME and \
-       credentials.password == settings.ADMIN_PASSWORD:
+    # Signed token from /auth/login or /auth/token
+    token = _request_token(request)
+    if token:
+        payload = decode_access_token_cached(token)
+        if payload and payload.get("sub") == settings.ADMIN_USERNAME:
+            return {
+                "username": payload["sub"],
+                "role": "admin"
+            }
+    
+    # HTTP Basic against the hashed admin credential
+    if credentials and await authenticate_admin(credentials.username, credentials.password):
         return {
             "username": credentials.username,
             "role": "admin"
         }
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Basic"},
-        )
+    
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect username or password",
+        headers={"WWW-Authenticate": "Basic"},
+    )
 
-def authenticate_admin(username: str, password: str) -> bool:
+def decode_access_token_cached(token: str) -> Optional[dict]:
+    """Decode a token, reusing the result for repeated requests"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    # Never cache past the token's own expiry
+    ttl = min(settings.AUTH_CACHE_TTL, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(token, payload, ttl)
+    return payload
+
+async def get_admin_password_hash() -> str:
+    """bcrypt hash of the admin password"""
+    global _admin_password_hash
+    if _admin_password_hash is None:
+        if settings.ADMIN_PASSWORD_HASH:
+            _admin_password_hash = settings.ADMIN_PASSWORD_HASH
+        else:
+            # Plaintext password from settings: hash it once per process
+            _admin_password_hash = await run_in_threadpool(get_password_hash, settings.ADMIN_PASSWORD)
+    return _admin_password_hash
+
+def _credential_key(username: str, password: str) -> str:
+    """Cache key that does not keep the password in memory"""
+    return hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"{username}\0{password}".encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+async def authenticate_admin(username: str, password: str) -> bool:
     """Authenticate admin credentials"""
-    if username == settings.ADMIN_USERNAME and password == settings.ADMIN_PASSWORD:
+    if not hmac.compare_digest(username.encode(), settings.ADMIN_USERNAME.encode()):
+        return False
+    
+    key = _credential_key(username, password)
+    if credential_cache.get(key):
         return True
-    return False
+    
+    # bcrypt is slow on purpose; keep it off the event loop
+    password_hash = await get_admin_password_hash()
+    if not await run_in_threadpool(verify_password, password, password_hash):
+        return False
+    credential_cache.set(key, True, settings.AUTH_CACHE_TTL)
+    return True
+
+def get_webhook_secret(bot_id: int) -> str:
+    """Derive the webhook path secret for a bot"""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"webhook:{bot_id}".encode(),
+        hashlib.sha256
+    )
+    return digest.hexdigest()[:32]
+
+def verify_webhook_secret(bot_id: int, secret: str) -> bool:
+    """Check a webhook path secret in constant time"""
+    return hmac.compare_digest(get_webhook_secret(bot_id), secret)
@@ -0,0 +1,50 @@
+"""
+Fast JSON Serialization
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.core.profiling import profile_phase
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used without it
+    orjson = None
+
+def _default(value: Any):
+    """Encode types the JSON encoders do not handle natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    
+    def dumps(data: Any) -> bytes:
+        """Compact JSON; datetimes are written as ISO 8601 like isoformat()"""
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(
+        ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    )
+    
+    def dumps(data: Any) -> bytes:
+        """Compact JSON; datetimes are written as ISO 8601 like isoformat()"""
+        return _encoder.encode(data).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed
+    
+    Content returned from an endpoint still passes through FastAPI's
+    jsonable_encoder first; build the response directly to skip it for
+    large payloads of plain dicts, lists, strings, numbers and datetimes.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        with profile_phase("serialization"):
+            return dumps(content)
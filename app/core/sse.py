@@ -0,0 +1,52 @@
+"""
+Server-Sent Events Helpers
+"""
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+# Seconds between keep-alive comments on an idle stream, below common proxy timeouts
+KEEPALIVE_INTERVAL = 15.0
+# Delay the browser waits before reconnecting, in milliseconds
+RETRY_MS = 3000
+
+def format_event(data, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """Encode one event; `data` is sent as compact JSON"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+def format_comment(text: str) -> str:
+    """Encode a comment line, ignored by EventSource; used as keep-alive"""
+    return f": {text}\n\n"
+
+def last_event_id(request: Request) -> Optional[int]:
+    """Numeric id a reconnecting EventSource resumes from, if any"""
+    value = request.headers.get("last-event-id")
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+def event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    """Response for an async iterator of encoded events"""
+    async def body():
+        yield f"retry: {RETRY_MS}\n\n"
+        async for chunk in events:
+            yield chunk
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
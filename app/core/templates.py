@@ -0,0 +1,95 @@
+"""
+Shared Template Environment
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+
+from app.core.config import settings
+from app.core.profiling import profile_phase
+
+TEMPLATES_DIR = "app/templates"
+
+class FragmentCache:
+    """Rendered template fragments per bot
+    
+    Templates wrap markup that depends only on one bot in
+    `{% call cached("bot_row", bot.id, bot.updated_at) %}...{% endcall %}`.
+    The bot registry drops a bot's fragments after every commit that
+    changes it. The version (updated_at, plus e.g. message counters) guards
+    against a request that fetched the bot before the commit storing a
+    stale fragment afterwards: a different version re-renders it. The
+    least recently used bots are evicted beyond `max_bots`.
+    """
+    
+    def __init__(self, max_bots: int = None):
+        self.max_bots = max_bots or settings.TEMPLATE_FRAGMENT_CACHE_SIZE
+        self._bots: "OrderedDict[int, Dict[str, Tuple[object, Markup]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __call__(self, name: str, bot_id: int, version=None, caller=None) -> Markup:
+        fragments = self._bots.get(bot_id)
+        if fragments is None:
+            fragments = self._bots[bot_id] = {}
+            if len(self._bots) > self.max_bots:
+                self._bots.popitem(last=False)
+        else:
+            self._bots.move_to_end(bot_id)
+        
+        entry = fragments.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        markup = Markup(caller())
+        fragments[name] = (version, markup)
+        return markup
+    
+    def invalidate(self, bot_ids: Optional[Iterable[int]] = None):
+        """Drop the fragments of changed bots; None drops everything"""
+        if bot_ids is None:
+            self._bots.clear()
+            return
+        for bot_id in bot_ids:
+            self._bots.pop(bot_id, None)
+    
+    def get_stats(self) -> dict:
+        """Cached bots and hit counters"""
+        return {
+            "bots": len(self._bots),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+class ProfiledTemplates(Jinja2Templates):
+    """Jinja2Templates whose renders are charged to the "template" phase"""
+    
+    def TemplateResponse(self, *args, **kwargs):
+        # Starlette renders the template when the response is created
+        with profile_phase("template"):
+            return super().TemplateResponse(*args, **kwargs)
+
+def _bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    """On-disk cache of compiled templates, so a restart skips compiling them"""
+    if not settings.TEMPLATE_CACHE_DIR:
+        return None
+    directory = Path(settings.TEMPLATE_CACHE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(str(directory))
+
+# Global fragment cache instance
+fragment_cache = FragmentCache()
+
+# Global templates instance shared by all routers
+templates = ProfiledTemplates(
+    directory=TEMPLATES_DIR,
+    bytecode_cache=_bytecode_cache(),
+    # Without DEBUG, templates are not checked for changes on every render
+    auto_reload=settings.DEBUG
+)
+templates.env.globals["cached"] = fragment_cache
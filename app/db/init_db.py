@@ -1,16 +1,49 @@
 """
 Database Initialization
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, text
+
 from app.db.models import Base, engine
 
-def init_db():
+# Indexes no query uses any more; dropped so writes stop maintaining them
+OBSOLETE_INDEXES = ("ix_bots_status_id",)
+
+def add_missing_columns(conn):
+    """Add nullable columns added to models after their tables already existed"""
+    # create_all never alters existing tables
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def create_missing_indexes(conn):
+    """Create indexes added to models after their tables already existed"""
+    # create_all skips existing tables, including their new indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+def drop_obsolete_indexes(conn):
+    """Drop indexes that were removed from the models"""
+    for name in OBSOLETE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+async def init_db():
     """Initialize database tables"""
     # Create all tables
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+        await conn.run_sync(create_missing_indexes)
+        await conn.run_sync(drop_obsolete_indexes)
     print("✅ Database initialized successfully")
 
-def drop_db():
+async def drop_db():
     """Drop all database tables (use with caution)"""
-    Base.metadata.drop_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
     print("⚠️ Database tables dropped")
@@ -1,36 +1,46 @@
 """
 Database Models
 """
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
 import os
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL, 
+def get_async_database_url(url: str) -> str:
+    """Map a database URL onto its asyncio driver"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+# Create async database engine
+engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
 
+# Record query timings for /metrics
+instrument_engine(engine)
+
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit; lazy refreshes would need awaiting
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """Get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 class Bot(Base):
     """Telegram Bot Model"""
@@ -65,6 +75,12 @@ class Bot(Base):
 class AdminLog(Base):
     """Admin Activity Log Model"""
     __tablename__ = "admin_logs"
+    __table_args__ = (
+        # Newest-first keyset pages, optionally filtered by user or action
+        Index("ix_admin_logs_created_at_id", "created_at", "id"),
+        Index("ix_admin_logs_username_created_at_id", "username", "created_at", "id"),
+        Index("ix_admin_logs_action_created_at_id", "action", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(100))
@@ -85,12 +101,46 @@ class AdminLog(Base):
         }
 
 class SystemStats(Base):
-    """System Statistics Model"""
+    """System Statistics Model
+    
+    One row per resolution (1m, 1h, 1d) and period; recorded_at is the
+    start of the period in UTC.
+    """
     __tablename__ = "system_stats"
+    __table_args__ = (
+        # Time-series ranges of one resolution
+        Index("ix_system_stats_resolution_recorded_at", "resolution", "recorded_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    cpu_usage = Column(Integer, default=0)
-    memory_usage = Column(Integer, default=0)
-    active_bots = Column(Integer, default=0)
+    cpu_usage = Column(Integer, default=0)  # Average process CPU, percent of one core
+    memory_usage = Column(Integer, default=0)  # Average RSS, MB
+    active_bots = Column(Integer, default=0)  # Peak running bots
     total_bots = Column(Integer, default=0)
     recorded_at = Column(DateTime, default=datetime.utcnow)
+    resolution = Column(String(4), nullable=True)
+    samples = Column(Integer, nullable=True)  # Sampler ticks aggregated into the row
+    cpu_max = Column(Integer, nullable=True)
+    memory_max = Column(Integer, nullable=True)
+    loop_lag_ms = Column(Float, nullable=True)  # Average event loop lag
+    loop_lag_max_ms = Column(Float, nullable=True)
+    messages_received = Column(Integer, nullable=True)
+    messages_sent = Column(Integer, nullable=True)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            "recorded_at": self.recorded_at.isoformat() if self.recorded_at else None,
+            "resolution": self.resolution,
+            "samples": self.samples,
+            "cpu_usage": self.cpu_usage,
+            "cpu_max": self.cpu_max,
+            "memory_usage": self.memory_usage,
+            "memory_max": self.memory_max,
+            "loop_lag_ms": self.loop_lag_ms,
+            "loop_lag_max_ms": self.loop_lag_max_ms,
+            "active_bots": self.active_bots,
+            "total_bots": self.total_bots,
+            "messages_received": self.messages_received,
+            "messages_sent": self.messages_sent,
+        }
@@ -0,0 +1,201 @@
+"""
+Listing Queries
+"""
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AdminLog, Bot, SessionLocal
+
+# Fields a listing can project, matching Bot.to_dict()
+BOT_FIELDS = (
+    "id",
+    "name",
+    "token_masked",
+    "description",
+    "is_active",
+    "status",
+    "webhook_url",
+    "created_at",
+    "updated_at",
+    "started_at"
+)
+
+# Fields of an exported audit log entry, matching AdminLog.to_dict()
+LOG_FIELDS = ("id", "created_at", "username", "action", "details", "ip_address")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+# Max ids per IN (...) clause, well under SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+def id_chunks(ids: List[int]):
+    """Split ids into IN-clause sized chunks"""
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+def naive_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, as stored in the database"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def parse_fields(fields: Optional[str]) -> Sequence[str]:
+    """Parse a comma separated field list; raises ValueError on unknown fields"""
+    if not fields:
+        return BOT_FIELDS
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in BOT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def _column(field: str):
+    """Column backing a listing field"""
+    if field == "token_masked":
+        return Bot.token
+    return getattr(Bot, field)
+
+def _mask_token(token: Optional[str]) -> str:
+    """Token as shown in listings, like Bot.to_dict()"""
+    return token[:10] + "..." if token else ""
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def _projection(
+    fields: Sequence[str],
+    column_for: Callable[[str], object],
+    native_datetimes: bool,
+    extra: Sequence = ()
+) -> Tuple[list, Callable[[tuple], dict]]:
+    """Select list for `fields` and a function turning its rows into dicts
+    
+    The conversion each field needs is picked once per query instead of
+    per value. With `native_datetimes`, datetimes are left for the JSON
+    encoder instead of being formatted here.
+    """
+    columns = list(dict.fromkeys([*extra, *(column_for(field) for field in fields)]))
+    positions = {column: index for index, column in enumerate(columns)}
+    steps = []
+    for field in fields:
+        column = column_for(field)
+        convert = None
+        if field == "token_masked":
+            convert = _mask_token
+        elif isinstance(column.type, DateTime) and not native_datetimes:
+            convert = _isoformat
+        steps.append((field, positions[column], convert))
+    
+    def read(row) -> dict:
+        return {
+            field: convert(row[index]) if convert else row[index]
+            for field, index, convert in steps
+        }
+    
+    return columns, read
+
+def bot_projection(
+    fields: Sequence[str] = BOT_FIELDS,
+    native_datetimes: bool = False
+) -> Tuple[list, Callable[[tuple], dict]]:
+    """Columns and row reader producing Bot.to_dict() without loading ORM objects"""
+    return _projection(fields, _column, native_datetimes, extra=(Bot.id,))
+
+def log_projection(native_datetimes: bool = False) -> Tuple[list, Callable[[tuple], dict]]:
+    """Columns and row reader producing AdminLog.to_dict() without loading ORM objects"""
+    return _projection(LOG_FIELDS, lambda field: getattr(AdminLog, field), native_datetimes)
+
+def select_fields(bots: List[dict], fields: Sequence[str]) -> List[dict]:
+    """Bot records reduced to the requested fields"""
+    if tuple(fields) == BOT_FIELDS:
+        return bots
+    return [{field: bot[field] for field in fields} for bot in bots]
+
+def encode_log_cursor(created_at: datetime, log_id: int) -> str:
+    """Opaque cursor pointing just past a log entry"""
+    raw = f"{created_at.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Parse a log cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def _filter_logs(
+    query,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Apply the audit log filters to a query"""
+    if username:
+        query = query.where(AdminLog.username == username)
+    if action:
+        query = query.where(AdminLog.action == action)
+    if since:
+        query = query.where(AdminLog.created_at >= naive_utc(since))
+    if until:
+        query = query.where(AdminLog.created_at < naive_utc(until))
+    return query
+
+async def list_logs(
+    db: AsyncSession,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: Optional[str] = None,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    native_datetimes: bool = False
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of audit log entries, newest first, and the cursor of the next page
+    
+    Pages are keyed on (created_at, id) so each one is an index range scan
+    instead of a sort of the whole table.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    columns, read = log_projection(native_datetimes)
+    query = select(*columns).order_by(AdminLog.created_at.desc(), AdminLog.id.desc()).limit(limit + 1)
+    query = _filter_logs(query, username, action, since, until)
+    if before:
+        created_at, log_id = decode_log_cursor(before)
+        query = query.where(tuple_(AdminLog.created_at, AdminLog.id) < (created_at, log_id))
+    
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_log_cursor(last.created_at, last.id)
+    return [read(row) for row in rows[:limit]], next_cursor
+
+async def stream_logs(
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> AsyncIterator[dict]:
+    """Yield matching audit log entries, oldest first, with constant memory use"""
+    columns, read = log_projection()
+    query = _filter_logs(
+        select(*columns).order_by(AdminLog.created_at, AdminLog.id),
+        username, action, since, until
+    )
+    
+    # Own session: a response stream outlives the request's dependencies
+    async with SessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            for row in partition:
+                yield read(row)
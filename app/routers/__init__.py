@@ -5,10 +5,14 @@ from app.routers.auth import router as auth_router
 from app.routers.dashboard import router as dashboard_router
 from app.routers.bots import router as bots_router
 from app.routers.api import router as api_router
+from app.routers.webhook import router as webhook_router
+from app.routers.metrics import router as metrics_router
 
 __all__ = [
     "auth_router",
     "dashboard_router",
     "bots_router",
-    "api_router"
+    "api_router",
+    "webhook_router",
+    "metrics_router"
 ]
@@ -1,42 +1,146 @@
 """
 API Router
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.db.queries import (
+    DEFAULT_PAGE_SIZE,
+    LOG_FIELDS,
+    list_logs,
+    parse_fields,
+    select_fields,
+    stream_logs
+)
+from app.core import sse
+from app.core.http_cache import cached_json, response_cache
+from app.core.logging import get_logging_stats
+from app.core.profiling import ProfiledRoute, profiler
+from app.core.templates import fragment_cache
 from app.core.security import get_current_user
 from app.db.models import Bot, AdminLog
 from app.services.bot_manager import bot_manager
+from app.services.bot_registry import bot_registry
+from app.services.audit_log import audit_log
+from app.services.http_pool import http_pool
+from app.services.send_scheduler import send_scheduler
+from app.services.warm_start import warm_start
+from app.services.log_retention import log_retention
+from app.services.system_stats import system_stats
+from app.services.log_stream import log_hub
+from app.services.dashboard_feed import dashboard_feed
+
+router = APIRouter(route_class=ProfiledRoute)
+
+BULK_ACTIONS = {
+    "start": bot_manager.start_bots,
+    "stop": bot_manager.stop_bots,
+    "restart": bot_manager.restart_bots
+}
+
+class BulkActionRequest(BaseModel):
+    """Bots to act on and an optional parallelism override"""
+    bot_ids: List[int] = Field(..., min_items=1)
+    concurrency: Optional[int] = Field(None, ge=1, le=200)
 
-router = APIRouter()
+def _bulk_response(action: str, results: Dict[int, bool]) -> dict:
+    """Summarize per-bot results of a bulk action"""
+    succeeded = sum(results.values())
+    return {
+        "success": succeeded == len(results),
+        "message": f"{action.capitalize()}: {succeeded} of {len(results)} bots succeeded",
+        "data": {
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": {str(bot_id): success for bot_id, success in results.items()}
+        }
+    }
 
 @router.get("/bots")
 async def get_bots(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500),
+    after: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    status: Optional[str] = None,
+    name: Optional[str] = Query(None, description="Case-insensitive substring of the name"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a page of bots (API endpoint)"""
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def build():
+        bots, next_cursor = await bot_registry.page(limit, after=after, status=status, name=name)
+        return {
+            "success": True,
+            "data": select_fields(bots, selected),
+            "next_cursor": next_cursor
+        }
+    
+    return await cached_json(request, build, resources=("bots",))
+
+@router.get("/bots/counts")
+async def get_bot_counts(
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all bots (API endpoint)"""
-    bots = db.query(Bot).all()
+    """Get the number of bots per status (API endpoint)"""
+    counts = await bot_registry.counts()
     return {
         "success": True,
-        "data": [bot.to_dict() for bot in bots]
+        "data": {"total": sum(counts.values()), "by_status": counts}
     }
 
 @router.get("/bots/{bot_id}")
 async def get_bot(
+    request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific bot (API endpoint)"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    async def build():
+        bot = await bot_registry.get(bot_id)
+        if not bot:
+            raise HTTPException(status_code=404, detail="Bot not found")
+        
+        return {
+            "success": True,
+            "data": bot
+        }
+    
+    return await cached_json(request, build, resources=("bots",))
+
+@router.get("/bots/{bot_id}/health")
+async def get_bot_health(
+    bot_id: int,
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get restart count and last error of a bot (API endpoint)"""
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     return {
         "success": True,
-        "data": bot.to_dict()
+        "data": await bot_manager.get_bot_health(bot_id)
     }
 
 @router.post("/bots")
@@ -45,11 +149,11 @@ async def create_bot_api(
     token: str,
     description: str = "",
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new bot (API endpoint)"""
     # Check for duplicate
-    existing = db.query(Bot).filter(Bot.name == name).first()
+    existing = await db.scalar(select(Bot).where(Bot.name == name))
     if existing:
         raise HTTPException(status_code=400, detail="Bot with this name already exists")
     
@@ -61,7 +165,7 @@ async def create_bot_api(
         is_active=False
     )
     db.add(bot)
-    db.commit()
+    await db.commit()
     
     return {
         "success": True,
@@ -73,10 +177,10 @@ async def create_bot_api(
 async def delete_bot_api(
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a bot (API endpoint)"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await db.get(Bot, bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -85,22 +189,84 @@ async def delete_bot_api(
         await bot_manager.stop_bot(db, bot_id)
     
     bot_name = bot.name
-    db.delete(bot)
-    db.commit()
+    await db.delete(bot)
+    await db.commit()
     
     return {
         "success": True,
         "message": f"Bot {bot_name} deleted successfully"
     }
 
+# Bulk routes must be registered before /bots/{bot_id}/... routes
+@router.post("/bots/bulk/{action}")
+async def bulk_action_api(
+    action: str,
+    payload: BulkActionRequest,
+    request: Request,
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Start, stop or restart many bots in parallel (API endpoint)"""
+    if action not in BULK_ACTIONS:
+        raise HTTPException(status_code=404, detail="Unknown bulk action")
+    
+    results = await BULK_ACTIONS[action](db, payload.bot_ids, payload.concurrency)
+    
+    audit_log.log(
+        username=user["username"],
+        action=f"bulk_{action}_bots",
+        details=f"{action.capitalize()} {sum(results.values())} of {len(results)} bots",
+        ip_address=request.client.host if request.client else None
+    )
+    
+    return _bulk_response(action, results)
+
+@router.post("/bots/start-all")
+async def start_all_bots_api(
+    request: Request,
+    concurrency: Optional[int] = None,
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Start every stopped bot (API endpoint)"""
+    results = await bot_manager.start_all_bots(db, concurrency)
+    
+    audit_log.log(
+        username=user["username"],
+        action="start_all_bots",
+        details=f"Started {sum(results.values())} of {len(results)} bots",
+        ip_address=request.client.host if request.client else None
+    )
+    
+    return _bulk_response("start", results)
+
+@router.post("/bots/stop-all")
+async def stop_all_bots_api(
+    request: Request,
+    concurrency: Optional[int] = None,
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stop every running bot (API endpoint)"""
+    results = await bot_manager.stop_all_bots(db, concurrency)
+    
+    audit_log.log(
+        username=user["username"],
+        action="stop_all_bots",
+        details=f"Stopped {sum(results.values())} running bots",
+        ip_address=request.client.host if request.client else None
+    )
+    
+    return _bulk_response("stop", results)
+
 @router.post("/bots/{bot_id}/start")
 async def start_bot_api(
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Start a bot (API endpoint)"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -109,7 +275,7 @@ async def start_bot_api(
     if success:
         return {
             "success": True,
-            "message": f"Bot {bot.name} started successfully"
+            "message": f"Bot {bot['name']} started successfully"
         }
     else:
         raise HTTPException(status_code=500, detail="Failed to start bot")
@@ -118,10 +284,10 @@ async def start_bot_api(
 async def stop_bot_api(
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Stop a bot (API endpoint)"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -130,33 +296,299 @@ async def stop_bot_api(
     if success:
         return {
             "success": True,
-            "message": f"Bot {bot.name} stopped successfully"
+            "message": f"Bot {bot['name']} stopped successfully"
         }
     else:
         raise HTTPException(status_code=500, detail="Failed to stop bot")
 
 @router.get("/stats")
 async def get_stats(
+    request: Request,
     user: dict = Depends(get_current_user)
 ):
     """Get system statistics (API endpoint)"""
+    return await cached_json(request, _build_stats)
+
+async def _build_stats() -> dict:
+    """Payload of /stats; counters change constantly, so it is cached for a short time only"""
     return {
         "success": True,
         "data": {
             "active_bots": bot_manager.get_active_bots_count(),
-            "timestamp": status.__name__
+            "audit_log": audit_log.get_stats(),
+            "http_pool": http_pool.get_stats(),
+            "send_scheduler": send_scheduler.get_stats(),
+            "warm_start": warm_start.get_progress(),
+            "supervisor": await bot_manager.get_supervisor_stats(),
+            "bot_registry": bot_registry.get_stats(),
+            "log_retention": log_retention.get_stats(),
+            "system_stats": system_stats.get_stats(),
+            "profiling": profiler.get_stats(),
+            "logging": get_logging_stats(),
+            "log_stream": log_hub.get_stats(),
+            "dashboard_feed": dashboard_feed.get_stats(),
+            "template_fragments": fragment_cache.get_stats(),
+            "response_cache": response_cache.get_stats(),
+            "timestamp": datetime.utcnow().isoformat()
         }
     }
 
+# Range returned by /stats/history when no start time is given
+STATS_HISTORY_RANGES = {
+    "raw": timedelta(minutes=15),
+    "1m": timedelta(hours=24),
+    "1h": timedelta(days=30),
+    "1d": timedelta(days=365)
+}
+
+@router.get("/stats/history")
+async def get_stats_history(
+    resolution: str = Query("1m", regex="^(raw|1m|1h|1d)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(1440, ge=1, le=10000),
+    user: dict = Depends(get_current_user)
+):
+    """Get CPU, memory, loop lag, bot and message counts over time, oldest first (API endpoint)"""
+    until = until or datetime.utcnow()
+    since = since or until - STATS_HISTORY_RANGES[resolution]
+    return {
+        "success": True,
+        "data": await system_stats.history(resolution, since, until, limit)
+    }
+
+@router.get("/stats/bots")
+async def get_bot_rates(
+    limit: int = Query(10, ge=1, le=100),
+    user: dict = Depends(get_current_user)
+):
+    """Get the busiest bots by messages per minute (API endpoint)"""
+    return {
+        "success": True,
+        "data": system_stats.get_bot_rates(limit)
+    }
+
+@router.get("/profiling")
+async def get_profiles(
+    slow: bool = False,
+    limit: int = Query(50, ge=1, le=500),
+    user: dict = Depends(get_current_user)
+):
+    """Get recent request profiles, or only slow ones, newest first (API endpoint)"""
+    return {
+        "success": True,
+        "data": profiler.list(slow_only=slow, limit=limit)
+    }
+
+@router.get("/profiling/{profile_id}")
+async def get_profile(
+    profile_id: int,
+    user: dict = Depends(get_current_user)
+):
+    """Get one request profile with its sampled stacks (API endpoint)"""
+    profile = profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return {
+        "success": True,
+        "data": profile
+    }
+
+def _log_level(level: str) -> int:
+    """Numeric value of a level name such as INFO"""
+    value = logging.getLevelName(level.upper())
+    if not isinstance(value, int):
+        raise HTTPException(status_code=400, detail=f"Unknown log level: {level}")
+    return value
+
+async def _tail_events(bot_id: Optional[int], min_level: int, after: Optional[int]) -> AsyncIterator[str]:
+    """Encode live bot log lines as SSE events until the client disconnects"""
+    subscriber, missed = log_hub.subscribe(bot_id, min_level, after)
+    try:
+        if missed:
+            yield sse.format_event({"missed": missed}, event="gap")
+        while True:
+            entries, dropped = await subscriber.next_batch(sse.KEEPALIVE_INTERVAL)
+            chunk = []
+            if dropped:
+                # The client fell behind and its oldest buffered lines were discarded
+                chunk.append(sse.format_event({"dropped": dropped}, event="dropped"))
+            chunk.extend(sse.format_event(entry, event="log", event_id=entry["seq"]) for entry in entries)
+            yield "".join(chunk) if chunk else sse.format_comment("keepalive")
+    finally:
+        log_hub.unsubscribe(subscriber)
+
+@router.get("/logs/stream")
+async def stream_bot_logs(
+    request: Request,
+    bot_id: Optional[int] = None,
+    level: str = "INFO",
+    after: Optional[int] = Query(None, description="Resume after this sequence number; defaults to Last-Event-ID"),
+    user: dict = Depends(get_current_user)
+):
+    """Tail the log lines of all bots, or one, as Server-Sent Events (API endpoint)"""
+    min_level = _log_level(level)
+    if after is None:
+        after = sse.last_event_id(request)
+    return sse.event_stream(_tail_events(bot_id, min_level, after))
+
+@router.get("/bots/{bot_id}/logs/stream")
+async def stream_bot_log(
+    request: Request,
+    bot_id: int,
+    level: str = "DEBUG",
+    after: Optional[int] = Query(None, description="Resume after this sequence number; defaults to Last-Event-ID"),
+    user: dict = Depends(get_current_user)
+):
+    """Tail one bot's log lines as Server-Sent Events (API endpoint)"""
+    if not await bot_registry.get(bot_id):
+        raise HTTPException(status_code=404, detail="Bot not found")
+    
+    min_level = _log_level(level)
+    if after is None:
+        after = sse.last_event_id(request)
+    return sse.event_stream(_tail_events(bot_id, min_level, after))
+
+async def _dashboard_events(bot_ids: Optional[set]) -> AsyncIterator[str]:
+    """Encode dashboard deltas as SSE events until the client disconnects"""
+    client = await dashboard_feed.subscribe(bot_ids)
+    try:
+        while True:
+            events = await client.next_batch(sse.KEEPALIVE_INTERVAL)
+            yield sse.format_event(events, event="update") if events else sse.format_comment("keepalive")
+    finally:
+        dashboard_feed.unsubscribe(client)
+
+@router.get("/dashboard/stream")
+async def stream_dashboard(
+    bots: Optional[str] = Query(None, description="Comma separated ids of the bots shown; all bots if omitted"),
+    user: dict = Depends(get_current_user)
+):
+    """Push bot status, counters and activity to the dashboard as Server-Sent Events (API endpoint)"""
+    bot_ids = None
+    if bots:
+        try:
+            bot_ids = {int(bot_id) for bot_id in bots.split(",") if bot_id.strip()}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="bots must be comma separated ids")
+    return sse.event_stream(_dashboard_events(bot_ids))
+
 @router.get("/logs")
 async def get_logs(
-    limit: int = 50,
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a page of admin logs, newest first (API endpoint)"""
+    async def build():
+        try:
+            logs, next_cursor = await list_logs(
+                db,
+                limit=limit,
+                before=before,
+                username=username,
+                action=action,
+                since=since,
+                until=until,
+                native_datetimes=True
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "success": True,
+            "data": logs,
+            "next_cursor": next_cursor
+        }
+    
+    return await cached_json(request, build, resources=("logs",))
+
+@router.get("/logs/archive")
+async def get_archived_logs(
+    since: datetime,
+    until: datetime,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    user: dict = Depends(get_current_user)
 ):
-    """Get admin logs (API endpoint)"""
-    logs = db.query(AdminLog).order_by(AdminLog.created_at.desc()).limit(limit).all()
+    """Get archived admin logs in a time range, oldest first (API endpoint)"""
+    try:
+        logs = await log_retention.query(since, until, username, action, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     return {
         "success": True,
-        "data": [log.to_dict() for log in logs]
+        "data": logs
     }
+
+@router.get("/logs/archive/partitions")
+async def get_archive_partitions(
+    user: dict = Depends(get_current_user)
+):
+    """List archived days (API endpoint)"""
+    return {
+        "success": True,
+        "data": await asyncio.to_thread(log_retention.list_partitions)
+    }
+
+# Rows written per chunk of an export response
+EXPORT_CHUNK_ROWS = 500
+
+async def _export_chunks(entries: AsyncIterator[dict], export_format: str) -> AsyncIterator[str]:
+    """Render log entries as NDJSON or CSV text in chunks"""
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=LOG_FIELDS)
+        writer.writeheader()
+    
+    rows = 0
+    async for entry in entries:
+        if writer:
+            writer.writerow(entry)
+        else:
+            buffer.write(json.dumps(entry, ensure_ascii=False))
+            buffer.write("\n")
+        rows += 1
+        if rows % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/logs/export")
+async def export_logs(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv)$"),
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """Stream matching admin logs as NDJSON or CSV (API endpoint)"""
+    audit_log.log(
+        username=user["username"],
+        action="export_logs",
+        details=f"Exported logs as {export_format}",
+        ip_address=request.client.host if request.client else None
+    )
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"admin_logs_{datetime.utcnow():%Y%m%d_%H%M%S}.{export_format}"
+    return StreamingResponse(
+        _export_chunks(stream_logs(username, action, since, until), export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,71 +1,109 @@
 """
 Authentication Router
 """
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.security import HTTPBasicCredentials
-from sqlalchemy.orm import Session
 
-from app.db import get_db
-from app.core.security import get_current_user, authenticate_admin, create_access_token
-from app.db.models import AdminLog
+from app.core.config import settings
+from app.core.profiling import ProfiledRoute
+from app.core.templates import templates
+from app.core.security import (
+    TOKEN_COOKIE,
+    authenticate_admin,
+    create_access_token,
+    get_current_user,
+    security
+)
+from app.services.audit_log import audit_log
+
+router = APIRouter(route_class=ProfiledRoute)
 
-router = APIRouter()
+async def _login_credentials(request: Request, credentials: Optional[HTTPBasicCredentials]):
+    """Username and password from the login form or HTTP Basic"""
+    if credentials:
+        return credentials.username, credentials.password
+    form_data = await request.form()
+    return form_data.get("username") or "", form_data.get("password") or ""
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Render login page"""
-    return {
-        "template": "login.html",
-        "context": {"request": request}
-    }
+    return templates.TemplateResponse("login.html", {"request": request})
 
 @router.post("/login")
 async def login(
     request: Request,
-    credentials: HTTPBasicCredentials = Depends(HTTPBasic),
-    db: Session = Depends(get_db)
+    credentials: Optional[HTTPBasicCredentials] = Depends(security)
 ):
     """Handle login request"""
-    username = credentials.username
-    password = credentials.password
+    username, password = await _login_credentials(request, credentials)
     
-    if authenticate_admin(username, password):
+    if await authenticate_admin(username, password):
         # Create access token
         access_token = create_access_token(data={"sub": username})
         
         # Log the login
-        log = AdminLog(
+        audit_log.log(
             username=username,
             action="login",
             details="Admin logged in successfully",
             ip_address=request.client.host if request.client else None
         )
-        db.add(log)
-        db.commit()
         
         response = RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
         response.set_cookie(
-            key="access_token",
+            key=TOKEN_COOKIE,
             value=access_token,
             httponly=True,
-            max_age=60 * 24 * 7  # 7 days
+            samesite="lax",
+            secure=settings.COOKIE_SECURE if settings.COOKIE_SECURE is not None else not settings.DEBUG,
+            max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
         )
         return response
     else:
-        return {
-            "template": "login.html",
-            "context": {
+        audit_log.log(
+            username=username,
+            action="login_failed",
+            details="Invalid username or password",
+            ip_address=request.client.host if request.client else None
+        )
+        return templates.TemplateResponse(
+            "login.html",
+            {
                 "request": request,
                 "error": "Invalid username or password"
-            }
-        }
+            },
+            status_code=status.HTTP_401_UNAUTHORIZED
+        )
+
+@router.post("/token")
+async def issue_token(
+    request: Request,
+    credentials: Optional[HTTPBasicCredentials] = Depends(security)
+):
+    """Issue a bearer token for API clients"""
+    username, password = await _login_credentials(request, credentials)
+    if not await authenticate_admin(username, password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    
+    return {
+        "access_token": create_access_token(data={"sub": username}),
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
 
 @router.get("/logout")
 async def logout():
     """Handle logout"""
-    response = RedirectResponse(url="/admin/login")
-    response.delete_cookie("access_token")
+    response = RedirectResponse(url="/auth/login")
+    response.delete_cookie(TOKEN_COOKIE)
     return response
 
 @router.get("/check-auth")
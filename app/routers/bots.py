@@ -1,36 +1,56 @@
 """
 Bot Management Router
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, templating, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.core.profiling import ProfiledRoute
+from app.core.templates import templates
 from app.core.security import get_current_user
-from app.db.models import Bot, AdminLog
+from app.db.models import Bot
 from app.services.bot_manager import bot_manager
+from app.services.bot_registry import bot_registry
+from app.services.audit_log import audit_log
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-templates = templating.Jinja2Templates(directory="app/templates")
+# Bots per page on the bots list
+BOTS_PAGE_SIZE = 50
 
 @router.get("/bots", response_class=HTMLResponse)
 async def bots_list(
     request: Request,
+    after: Optional[int] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    name: Optional[str] = None,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List all managed bots"""
-    bots = db.query(Bot).all()
+    """List managed bots, one page at a time"""
+    bots, next_cursor = await bot_registry.page(
+        BOTS_PAGE_SIZE,
+        after=after,
+        status=status_filter,
+        name=name
+    )
     return templates.TemplateResponse(
         "bots.html",
         {
             "request": request,
             "user": user,
-            "bots": [bot.to_dict() for bot in bots]
+            "bots": bots,
+            "status_counts": await bot_registry.counts(),
+            "filters": {"status": status_filter or "", "name": name or ""},
+            "is_first_page": after is None,
+            "next_cursor": next_cursor
         }
     )
 
@@ -54,7 +74,7 @@ async def add_bot_page(
 async def add_bot(
     request: Request,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a new bot"""
     form_data = await request.form()
@@ -75,7 +95,7 @@ async def add_bot(
         )
     
     # Check for duplicate
-    existing = db.query(Bot).filter(Bot.name == name).first()
+    existing = await db.scalar(select(Bot).where(Bot.name == name))
     if existing:
         return templates.TemplateResponse(
             "bot_form.html",
@@ -96,17 +116,15 @@ async def add_bot(
         is_active=False
     )
     db.add(bot)
-    db.commit()
+    await db.commit()
     
     # Log the action
-    log = AdminLog(
+    audit_log.log(
         username=user["username"],
         action="add_bot",
         details=f"Added new bot: {name}",
         ip_address=request.client.host if request.client else None
     )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/bots", status_code=status.HTTP_302_FOUND)
 
@@ -115,10 +133,10 @@ async def edit_bot_page(
     request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Render edit bot page"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -127,8 +145,8 @@ async def edit_bot_page(
         {
             "request": request,
             "user": user,
-            "bot": bot.to_dict(),
-            "title": f"Edit Bot: {bot.name}"
+            "bot": bot,
+            "title": f"Edit Bot: {bot['name']}"
         }
     )
 
@@ -137,10 +155,10 @@ async def edit_bot(
     request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a bot"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await db.get(Bot, bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -153,17 +171,15 @@ async def edit_bot(
     bot.name = name
     bot.token = token
     bot.description = description
-    db.commit()
+    await db.commit()
     
     # Log the action
-    log = AdminLog(
+    audit_log.log(
         username=user["username"],
         action="edit_bot",
         details=f"Updated bot: {name}",
         ip_address=request.client.host if request.client else None
     )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/bots", status_code=status.HTTP_302_FOUND)
 
@@ -172,31 +188,29 @@ async def start_bot(
     request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Start a bot"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     success = await bot_manager.start_bot(db, bot_id)
     
     if success:
-        log = AdminLog(
+        audit_log.log(
             username=user["username"],
             action="start_bot",
-            details=f"Started bot: {bot.name}",
+            details=f"Started bot: {bot['name']}",
             ip_address=request.client.host if request.client else None
         )
     else:
-        log = AdminLog(
+        audit_log.log(
             username=user["username"],
             action="start_bot_failed",
-            details=f"Failed to start bot: {bot.name}",
+            details=f"Failed to start bot: {bot['name']}",
             ip_address=request.client.host if request.client else None
         )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
@@ -205,31 +219,29 @@ async def stop_bot(
     request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Stop a bot"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     success = await bot_manager.stop_bot(db, bot_id)
     
     if success:
-        log = AdminLog(
+        audit_log.log(
             username=user["username"],
             action="stop_bot",
-            details=f"Stopped bot: {bot.name}",
+            details=f"Stopped bot: {bot['name']}",
             ip_address=request.client.host if request.client else None
         )
     else:
-        log = AdminLog(
+        audit_log.log(
             username=user["username"],
             action="stop_bot_failed",
-            details=f"Failed to stop bot: {bot.name}",
+            details=f"Failed to stop bot: {bot['name']}",
             ip_address=request.client.host if request.client else None
         )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
@@ -238,23 +250,21 @@ async def restart_bot(
     request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Restart a bot"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await bot_registry.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     success = await bot_manager.restart_bot(db, bot_id)
     
-    log = AdminLog(
+    audit_log.log(
         username=user["username"],
         action="restart_bot",
-        details=f"Restarted bot: {bot.name}",
+        details=f"Restarted bot: {bot['name']}",
         ip_address=request.client.host if request.client else None
     )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
@@ -263,10 +273,10 @@ async def delete_bot(
     request: Request,
     bot_id: int,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a bot"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = await db.get(Bot, bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -275,17 +285,15 @@ async def delete_bot(
         await bot_manager.stop_bot(db, bot_id)
     
     bot_name = bot.name
-    db.delete(bot)
-    db.commit()
+    await db.delete(bot)
+    await db.commit()
     
-    log = AdminLog(
+    audit_log.log(
         username=user["username"],
         action="delete_bot",
         details=f"Deleted bot: {bot_name}",
         ip_address=request.client.host if request.client else None
     )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/bots", status_code=status.HTTP_302_FOUND)
 
@@ -293,18 +301,16 @@ async def delete_bot(
 async def stop_all_bots(
     request: Request,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Stop all running bots"""
-    await bot_manager.stop_all_bots(db)
+    results = await bot_manager.stop_all_bots(db)
     
-    log = AdminLog(
+    audit_log.log(
         username=user["username"],
         action="stop_all_bots",
-        details="Stopped all running bots",
+        details=f"Stopped {sum(results.values())} running bots",
         ip_address=request.client.host if request.client else None
     )
-    db.add(log)
-    db.commit()
     
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
@@ -1,49 +1,57 @@
 """
 Dashboard Router
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, templating
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.db.queries import list_logs
+from app.core.profiling import ProfiledRoute
+from app.core.templates import templates
 from app.core.security import get_current_user
-from app.db.models import Bot, AdminLog, SystemStats
 from app.services.bot_manager import bot_manager
+from app.services.bot_registry import bot_registry
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-# Jinja2 templates
-templates = templating.Jinja2Templates(directory="app/templates")
+# Bots shown on the dashboard; the bots page lists the rest
+DASHBOARD_BOTS_LIMIT = 24
 
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(
     request: Request,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Render main dashboard"""
-    # Get all bots
-    bots = db.query(Bot).all()
-    bots_data = [bot.to_dict() for bot in bots]
+    """Render main dashboard; later changes are pushed by /api/dashboard/stream"""
+    # First page and per-status counts come from the registry's sorted indexes,
+    # so rendering does not depend on the number of bots
+    bots, next_cursor = await bot_registry.page(DASHBOARD_BOTS_LIMIT)
+    status_counts = await bot_registry.counts()
     
     # Get system stats
     active_count = bot_manager.get_active_bots_count()
-    total_count = len(bots)
-    error_count = len([b for b in bots if b.status == "error"])
+    total_count = sum(status_counts.values())
+    error_count = status_counts.get("error", 0)
     
     # Get recent logs
-    recent_logs = db.query(AdminLog).order_by(AdminLog.created_at.desc()).limit(10).all()
+    recent_logs, _ = await list_logs(db, limit=10)
     
     return templates.TemplateResponse(
         "dashboard.html",
         {
             "request": request,
             "user": user,
-            "bots": bots_data,
+            "bots": bots,
+            "more_bots": next_cursor is not None,
+            "message_counts": await bot_manager.get_message_counts(),
             "active_bots": active_count,
             "total_bots": total_count,
             "error_bots": error_count,
-            "recent_logs": [log.to_dict() for log in recent_logs]
+            "recent_logs": recent_logs
         }
     )
 
@@ -51,7 +59,7 @@ async def dashboard(
 async def admin_index(
     request: Request,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Admin panel index"""
     return RedirectResponse(url="/admin/dashboard")
@@ -73,16 +81,32 @@ async def settings_page(
 @router.get("/logs", response_class=HTMLResponse)
 async def logs_page(
     request: Request,
+    before: Optional[str] = None,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
     user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Render logs page"""
-    logs = db.query(AdminLog).order_by(AdminLog.created_at.desc()).limit(100).all()
+    try:
+        logs, next_cursor = await list_logs(
+            db,
+            limit=100,
+            before=before,
+            username=username,
+            action=action
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     return templates.TemplateResponse(
         "logs.html",
         {
             "request": request,
             "user": user,
-            "logs": [log.to_dict() for log in logs]
+            "logs": logs,
+            "filters": {"username": username or "", "action": action or ""},
+            "is_first_page": before is None,
+            "next_cursor": next_cursor
         }
     )
@@ -0,0 +1,25 @@
+"""
+Metrics Router
+"""
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.profiling import ProfiledRoute
+from app.services.bot_manager import bot_manager
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Prometheus scrape endpoint"""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    
+    families = metrics.REGISTRY.collect() + await bot_manager.collect_metrics()
+    return Response(content=metrics.render(families), media_type=metrics.CONTENT_TYPE)
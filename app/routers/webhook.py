@@ -0,0 +1,38 @@
+"""
+Webhook Router
+"""
+import logging
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.core.profiling import ProfiledRoute
+from app.core.security import verify_webhook_secret
+from app.services.bot_manager import bot_manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.post("/{bot_id}/{secret}")
+async def receive_update(
+    request: Request,
+    bot_id: int,
+    secret: str
+):
+    """Receive a Telegram update for one of the managed bots"""
+    if not verify_webhook_secret(bot_id, secret):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    try:
+        update = await request.json()
+    except ValueError:
+        update = None
+    if not isinstance(update, dict):
+        # Acknowledge so Telegram does not keep redelivering a payload we can never parse
+        logger.warning(f"Dropped malformed webhook update for bot {bot_id}")
+        return {"ok": True}
+    
+    if not await bot_manager.process_webhook_update(bot_id, update):
+        raise HTTPException(status_code=404, detail="Bot is not running")
+    
+    return {"ok": True}
@@ -2,8 +2,17 @@
 Services Package
 """
 from app.services.bot_manager import bot_manager, BotManager
+from app.services.audit_log import audit_log, AuditLogWriter
+from app.services.warm_start import warm_start, WarmStart
+from app.services.system_stats import system_stats, SystemStatsSampler
 
 __all__ = [
     "bot_manager",
-    "BotManager"
+    "BotManager",
+    "audit_log",
+    "AuditLogWriter",
+    "warm_start",
+    "WarmStart",
+    "system_stats",
+    "SystemStatsSampler"
 ]
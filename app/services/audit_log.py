@@ -0,0 +1,176 @@
+"""
+Batched Audit Log Writer
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.http_cache import versions
+from app.db.models import AdminLog, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class AuditLogWriter:
+    """Write-behind queue that stores AdminLog rows in bulk inserts
+    
+    Routers enqueue entries without touching the database. A background
+    task flushes the queue once AUDIT_LOG_BATCH_SIZE rows are waiting or
+    AUDIT_LOG_FLUSH_INTERVAL seconds have passed, and once more on shutdown.
+    A batch that still fails after AUDIT_LOG_MAX_RETRIES retries is dropped,
+    so one bad batch cannot hold up every entry behind it.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_queue: int = None,
+        max_retries: int = None
+    ):
+        self.batch_size = batch_size or settings.AUDIT_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_LOG_FLUSH_INTERVAL
+        self.max_queue = max_queue or settings.AUDIT_LOG_MAX_QUEUE
+        self.max_retries = max_retries if max_retries is not None else settings.AUDIT_LOG_MAX_RETRIES
+        
+        self._queue: Deque[dict] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Consecutive failed writes of the batch at the head of the queue
+        self._retries = 0
+        # Called with each entry as it is queued, e.g. to update open dashboards
+        self.listeners: List[Callable[[dict], None]] = []
+        
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_flush_at: Optional[datetime] = None
+    
+    @property
+    def depth(self) -> int:
+        """Number of entries waiting to be written"""
+        return len(self._queue)
+    
+    def log(
+        self,
+        username: str,
+        action: str,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ):
+        """Queue an admin action for writing"""
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+            logger.warning("Audit log queue is full, dropping oldest entry")
+        
+        entry = {
+            "username": username,
+            "action": action,
+            "details": details,
+            "ip_address": ip_address,
+            "created_at": datetime.utcnow()
+        }
+        self._queue.append(entry)
+        for listener in self.listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                logger.error(f"Audit log listener failed: {e}")
+        
+        # Serverless deployments run without lifespan events
+        if self._task is None:
+            self.start()
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+    
+    def start(self):
+        """Start the background flush task"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the flush task and write everything still queued"""
+        if self._task is not None:
+            # Let an in-flight batch finish instead of cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        if self._queue:
+            await self.flush()
+    
+    async def flush(self):
+        """Write all queued entries"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        async with self._flush_lock:
+            while self._queue:
+                batch = self._take_batch()
+                try:
+                    async with SessionLocal() as db:
+                        await db.execute(insert(AdminLog), batch)
+                        await db.commit()
+                except Exception as e:
+                    self.failures += 1
+                    if self._retries >= self.max_retries:
+                        self._retries = 0
+                        self.dropped += len(batch)
+                        logger.error(
+                            f"Dropping {len(batch)} audit log entries after "
+                            f"{self.max_retries} failed retries: {e}"
+                        )
+                    else:
+                        # Keep the entries for the next attempt
+                        self._retries += 1
+                        self._queue.extendleft(reversed(batch))
+                        logger.error(f"Failed to write {len(batch)} audit log entries: {e}")
+                    return
+                
+                self._retries = 0
+                self.written += len(batch)
+                self.batches += 1
+                versions.bump("logs")
+                self.last_flush_at = datetime.utcnow()
+    
+    def get_stats(self) -> dict:
+        """Queue depth and throughput counters"""
+        return {
+            "queue_depth": self.depth,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None
+        }
+    
+    def _take_batch(self) -> List[dict]:
+        """Pop up to batch_size entries from the queue"""
+        count = min(self.batch_size, len(self._queue))
+        return [self._queue.popleft() for _ in range(count)]
+    
+    async def _flush_loop(self):
+        """Flush on size or time threshold, whichever comes first"""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._queue:
+                await self.flush()
+
+# Global audit log writer instance
+audit_log = AuditLogWriter()
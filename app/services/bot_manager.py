@@ -3,166 +3,489 @@ Bot Management Service
 """
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Optional
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import Bot
+from app.db.queries import id_chunks
+from app.core import metrics
 from app.core.config import settings
+from app.core.logging import current_bot_id
+from app.core.security import get_webhook_secret
+from app.services.polling import PollingScheduler
+from app.services.http_pool import create_telegram_bot, http_pool
+from app.services.send_scheduler import send_scheduler
+from app.services.supervisor import BotSupervisor
 
 logger = logging.getLogger(__name__)
 
+# Update fields checked, most common first, to label handler latency
+UPDATE_TYPES = (
+    "message", "callback_query", "edited_message", "channel_post", "edited_channel_post",
+    "inline_query", "chosen_inline_result", "my_chat_member", "chat_member", "chat_join_request",
+    "shipping_query", "pre_checkout_query", "poll", "poll_answer"
+)
+
+def _field(obj, name: str):
+    """Field of a raw update dict or a parsed aiogram object"""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+def _chat_key(update) -> Optional[int]:
+    """Chat whose updates must be handled in order; None for updates without one"""
+    for name in UPDATE_TYPES:
+        payload = _field(update, name)
+        if payload is None:
+            continue
+        if name == "callback_query":
+            payload = _field(payload, "message")
+        chat = _field(payload, "chat") if payload is not None else None
+        chat_id = _field(chat, "id") if chat is not None else None
+        return chat_id if isinstance(chat_id, int) else None
+    return None
+
+def _update_type(update) -> str:
+    """Name of the payload field set on an update"""
+    for name in UPDATE_TYPES:
+        if getattr(update, name, None) is not None:
+            return name
+    return "unknown"
+
 class BotManager:
     """Manages multiple Telegram bot instances"""
     
     def __init__(self):
-        self.active_bots: Dict[int, asyncio.Task] = {}
+        # Running bots; updates arrive via the shared scheduler or webhook route
+        self.active_bots: Dict[int, datetime] = {}
         self.bot_instances: Dict[int, any] = {}
+        self.polling = PollingScheduler(on_updates=self._dispatch)
+        self.supervisor = BotSupervisor(self)
+        # Latest update task per (bot, chat); each waits for the one before it
+        self._update_tasks: Dict[Tuple[int, Optional[int]], asyncio.Task] = {}
+        
+        metrics.BOTS_ACTIVE.set_function(self.get_active_bots_count)
+        metrics.BOTS_POLLING.set_function(lambda: self.polling.get_stats()["bots"])
+    
+    @property
+    def webhook_mode(self) -> bool:
+        """Whether bots receive updates via webhook instead of polling"""
+        return settings.BOT_RUN_MODE == "webhook"
     
-    async def start_bot(self, db: Session, bot_id: int) -> bool:
+    def get_webhook_url(self, bot_id: int) -> str:
+        """Build the public webhook URL for a bot"""
+        base_url = settings.WEBHOOK_BASE_URL.rstrip("/")
+        return f"{base_url}/webhook/{bot_id}/{get_webhook_secret(bot_id)}"
+    
+    def _build_dispatcher(self, bot: Bot, telegram_bot):
+        """Create the dispatcher with the default handlers"""
+        # Import aiogram here to avoid startup errors
+        from aiogram import Dispatcher, types
+        
+        dp = Dispatcher(telegram_bot)
+        
+        bot_id = bot.id
+        bot_name = bot.name
+        
+        async def reply(message: types.Message, text: str, **kwargs):
+            """Answer in the message's chat through the rate-limited scheduler"""
+            return await send_scheduler.send(
+                bot_id,
+                message.chat.id,
+                lambda: telegram_bot.send_message(message.chat.id, text, **kwargs)
+            )
+        
+        # Basic start command handler
+        @dp.message_handler(commands=['start'])
+        async def cmd_start(message: types.Message):
+            await reply(
+                message,
+                f"👋 Hello! I am {bot_name}.\n"
+                f"I am managed by Master Bot Control Panel.\n\n"
+                f"Use /help to see available commands."
+            )
+        
+        @dp.message_handler(commands=['help'])
+        async def cmd_help(message: types.Message):
+            await reply(
+                message,
+                f"🤖 <b>{bot_name} Commands:</b>\n\n"
+                f"/start - Start the bot\n"
+                f"/help - Show this help message\n"
+                f"/status - Check bot status\n\n"
+                f"<i>Managed by Master Bot System</i>",
+                parse_mode='HTML'
+            )
+        
+        @dp.message_handler(commands=['status'])
+        async def cmd_status(message: types.Message):
+            await reply(
+                message,
+                f"✅ <b>{bot_name}</b> is running!\n\n"
+                f"Bot ID: {bot_id}\n"
+                f"Status: Active\n"
+                f"Admin: Master Control Panel",
+                parse_mode='HTML'
+            )
+        
+        @dp.message_handler()
+        async def echo(message: types.Message):
+            await reply(
+                message,
+                f"📝 You said: {message.text}\n\n"
+                f"Use /help to see available commands."
+            )
+        
+        return telegram_bot, dp
+    
+    async def _launch(self, bot: Bot):
+        """Create a bot instance and hook it up to updates; raises on failure"""
+        if self.webhook_mode and not settings.WEBHOOK_BASE_URL:
+            raise RuntimeError("WEBHOOK_BASE_URL is not configured")
+        
+        # Create bot instance on the shared HTTP pool
+        telegram_bot = await create_telegram_bot(bot.token)
+        telegram_bot, dp = self._build_dispatcher(bot, telegram_bot)
+        
+        # Store instance
+        self.bot_instances[bot.id] = (telegram_bot, dp)
+        
+        try:
+            if self.webhook_mode:
+                # Telegram pushes updates to the shared webhook route
+                await telegram_bot.set_webhook(self.get_webhook_url(bot.id))
+            else:
+                # getUpdates is rejected while a webhook is set
+                await telegram_bot.delete_webhook()
+                self.polling.add_bot(bot.id, telegram_bot)
+        except Exception:
+            await self._halt(bot.id)
+            raise
+        
+        self.active_bots[bot.id] = datetime.utcnow()
+        self.supervisor.watch(bot.id)
+    
+    async def _halt(self, bot_id: int):
+        """Disconnect a bot from updates and release its instance"""
+        self.polling.remove_bot(bot_id)
+        send_scheduler.forget(bot_id)
+        await self._close_instance(bot_id)
+        self.active_bots.pop(bot_id, None)
+    
+    def _mark_running(self, bot: Bot):
+        """Apply the running status to a bot row"""
+        bot.is_active = True
+        bot.status = "running"
+        bot.started_at = self.active_bots.get(bot.id, datetime.utcnow())
+        bot.webhook_url = self.get_webhook_url(bot.id) if self.webhook_mode else None
+    
+    async def start_bot(self, db: AsyncSession, bot_id: int) -> bool:
         """Start a bot by its ID"""
-        bot = db.query(Bot).filter(Bot.id == bot_id).first()
+        bot = await db.get(Bot, bot_id)
         if not bot:
             logger.error(f"Bot with ID {bot_id} not found")
             return False
         
         if bot_id in self.active_bots:
-            logger.warning(f"Bot {bot.name} is already running")
+            logger.warning(f"Bot {bot.name} is already running", extra={"bot_id": bot_id})
             return False
         
         try:
-            # Import aiogram here to avoid startup errors
-            from aiogram import Bot as AioBot, Dispatcher, types
-            from aiogram.utils import executor
-            
-            # Create bot instance
-            telegram_bot = AioBot(token=bot.token)
-            dp = Dispatcher(telegram_bot)
-            
-            # Basic start command handler
-            @dp.message_handler(commands=['start'])
-            async def cmd_start(message: types.Message):
-                await message.answer(
-                    f"👋 Hello! I am {bot.name}.\n"
-                    f"I am managed by Master Bot Control Panel.\n\n"
-                    f"Use /help to see available commands."
-                )
-            
-            @dp.message_handler(commands=['help'])
-            async def cmd_help(message: types.Message):
-                await message.answer(
-                    f"🤖 <b>{bot.name} Commands:</b>\n\n"
-                    f"/start - Start the bot\n"
-                    f"/help - Show this help message\n"
-                    f"/status - Check bot status\n\n"
-                    f"<i>Managed by Master Bot System</i>",
-                    parse_mode='HTML'
-                )
-            
-            @dp.message_handler(commands=['status'])
-            async def cmd_status(message: types.Message):
-                await message.answer(
-                    f"✅ <b>{bot.name}</b> is running!\n\n"
-                    f"Bot ID: {bot.id}\n"
-                    f"Status: Active\n"
-                    f"Admin: Master Control Panel",
-                    parse_mode='HTML'
-                )
-            
-            @dp.message_handler()
-            async def echo(message: types.Message):
-                await message.answer(
-                    f"📝 You said: {message.text}\n\n"
-                    f"Use /help to see available commands."
-                )
-            
-            # Store instance
-            self.bot_instances[bot_id] = (telegram_bot, dp)
-            
-            # Create async task
-            async def run_polling():
-                try:
-                    await dp.start_polling()
-                except Exception as e:
-                    logger.error(f"Bot {bot.name} polling error: {e}")
-                    self._set_error_status(db, bot_id)
-            
-            task = asyncio.create_task(run_polling())
-            self.active_bots[bot_id] = task
-            
-            # Update database
-            bot.is_active = True
-            bot.status = "running"
-            bot.started_at = datetime.utcnow()
-            db.commit()
-            
-            logger.info(f"Bot {bot.name} started successfully")
-            return True
-            
+            await self._launch(bot)
         except Exception as e:
-            logger.error(f"Failed to start bot {bot.name}: {e}")
-            self._set_error_status(db, bot_id)
+            logger.error(f"Failed to start bot {bot.name}: {e}", extra={"bot_id": bot_id})
+            await self._set_error_status(db, bot_id)
             return False
+        
+        # Update database
+        self._mark_running(bot)
+        await db.commit()
+        
+        logger.info(f"Bot {bot.name} started successfully", extra={"bot_id": bot_id})
+        return True
     
-    async def stop_bot(self, db: Session, bot_id: int) -> bool:
+    async def stop_bot(self, db: AsyncSession, bot_id: int) -> bool:
         """Stop a bot by its ID"""
-        if bot_id not in self.active_bots:
-            logger.warning(f"Bot with ID {bot_id} is not running")
+        if bot_id not in self.active_bots and not self.supervisor.is_recovering(bot_id):
+            logger.warning(f"Bot with ID {bot_id} is not running", extra={"bot_id": bot_id})
             return False
         
         try:
-            # Cancel the task
-            task = self.active_bots[bot_id]
-            task.cancel()
-            
-            # Close bot instance
-            if bot_id in self.bot_instances:
-                telegram_bot, dp = self.bot_instances[bot_id]
-                await telegram_bot.session.close()
-                del self.bot_instances[bot_id]
-            
-            # Remove from active bots
-            del self.active_bots[bot_id]
+            self.supervisor.forget(bot_id)
+            await self._halt(bot_id)
+            metrics.remove_bot(bot_id)
             
             # Update database
-            bot = db.query(Bot).filter(Bot.id == bot_id).first()
+            bot = await db.get(Bot, bot_id)
             if bot:
                 bot.is_active = False
                 bot.status = "stopped"
                 bot.started_at = None
-                db.commit()
+                bot.webhook_url = None
+                await db.commit()
             
-            logger.info(f"Bot stopped successfully")
+            logger.info(f"Bot stopped successfully", extra={"bot_id": bot_id})
             return True
-            
+        
         except Exception as e:
-            logger.error(f"Failed to stop bot {bot_id}: {e}")
+            logger.error(f"Failed to stop bot {bot_id}: {e}", extra={"bot_id": bot_id})
+            return False
+    
+    async def _run_bounded(self, bot_ids: List[int], action, concurrency: Optional[int]) -> Dict[int, bool]:
+        """Run a per-bot coroutine for many bots with a concurrency cap"""
+        semaphore = asyncio.Semaphore(concurrency or settings.BULK_CONCURRENCY)
+        
+        async def run(bot_id: int) -> bool:
+            async with semaphore:
+                try:
+                    await action(bot_id)
+                    return True
+                except Exception as e:
+                    logger.error(f"Bulk action failed for bot {bot_id}: {e}", extra={"bot_id": bot_id})
+                    return False
+        
+        results = await asyncio.gather(*[run(bot_id) for bot_id in bot_ids])
+        return dict(zip(bot_ids, results))
+    
+    async def start_bots(
+        self,
+        db: AsyncSession,
+        bot_ids: List[int],
+        concurrency: Optional[int] = None
+    ) -> Dict[int, bool]:
+        """Start many bots concurrently and store their status in one commit"""
+        bots = {}
+        for chunk in id_chunks(list(set(bot_ids))):
+            rows = await db.scalars(select(Bot).where(Bot.id.in_(chunk)))
+            bots.update({bot.id: bot for bot in rows})
+        
+        results = {bot_id: False for bot_id in bot_ids}
+        pending = [bot_id for bot_id in bots if bot_id not in self.active_bots]
+        
+        # Only Telegram API calls run concurrently; the session is not shared
+        launched = await self._run_bounded(
+            pending,
+            lambda bot_id: self._launch(bots[bot_id]),
+            concurrency
+        )
+        
+        for bot_id, success in launched.items():
+            bot = bots[bot_id]
+            if success:
+                self._mark_running(bot)
+            else:
+                bot.is_active = False
+                bot.status = "error"
+            results[bot_id] = success
+        await db.commit()
+        
+        logger.info(f"Started {sum(launched.values())} of {len(bot_ids)} bots")
+        return results
+    
+    async def stop_bots(
+        self,
+        db: AsyncSession,
+        bot_ids: List[int],
+        concurrency: Optional[int] = None
+    ) -> Dict[int, bool]:
+        """Stop many bots concurrently and store their status in one commit"""
+        results = {bot_id: False for bot_id in bot_ids}
+        running = [
+            bot_id for bot_id in set(bot_ids)
+            if bot_id in self.active_bots or self.supervisor.is_recovering(bot_id)
+        ]
+        for bot_id in running:
+            self.supervisor.forget(bot_id)
+        
+        halted = await self._run_bounded(running, self._halt, concurrency)
+        results.update(halted)
+        
+        stopped = [bot_id for bot_id, success in halted.items() if success]
+        for bot_id in stopped:
+            metrics.remove_bot(bot_id)
+        for chunk in id_chunks(stopped):
+            await db.execute(
+                update(Bot)
+                .where(Bot.id.in_(chunk))
+                .values(is_active=False, status="stopped", started_at=None, webhook_url=None)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+        
+        logger.info(f"Stopped {len(stopped)} of {len(bot_ids)} bots")
+        return results
+    
+    async def restart_bots(
+        self,
+        db: AsyncSession,
+        bot_ids: List[int],
+        concurrency: Optional[int] = None
+    ) -> Dict[int, bool]:
+        """Restart many bots concurrently"""
+        await self.stop_bots(db, bot_ids, concurrency)
+        db.expire_all()
+        return await self.start_bots(db, bot_ids, concurrency)
+    
+    async def start_all_bots(self, db: AsyncSession, concurrency: Optional[int] = None) -> Dict[int, bool]:
+        """Start every bot that is not running"""
+        bot_ids = (await db.scalars(select(Bot.id))).all()
+        pending = [bot_id for bot_id in bot_ids if bot_id not in self.active_bots]
+        return await self.start_bots(db, pending, concurrency)
+    
+    async def _close_instance(self, bot_id: int):
+        """Detach the webhook and release a bot instance"""
+        instance = self.bot_instances.pop(bot_id, None)
+        if not instance:
+            return
+        
+        telegram_bot, dp = instance
+        if self.webhook_mode:
+            try:
+                await telegram_bot.delete_webhook()
+            except Exception as e:
+                logger.warning(f"Failed to delete webhook for bot {bot_id}: {e}", extra={"bot_id": bot_id})
+        await telegram_bot.close()
+    
+    async def process_webhook_update(self, bot_id: int, data: dict) -> bool:
+        """Hand an incoming webhook update to the bot's dispatcher"""
+        return self._dispatch(bot_id, [data])
+    
+    def _dispatch(self, bot_id: int, updates: list) -> bool:
+        """Process a batch of updates for a bot in background tasks
+        
+        Updates of one chat run strictly in order, also across batches: a
+        full batch is polled again right away, and the next one must not
+        overtake it. Different chats run concurrently, so a chat waiting
+        on its send rate limit does not hold up the others. Updates without
+        a chat (inline queries, polls) share one sequence per bot.
+        """
+        instance = self.bot_instances.get(bot_id)
+        if not instance:
             return False
+        
+        chats: Dict[Optional[int], list] = {}
+        for update in updates:
+            chats.setdefault(_chat_key(update), []).append(update)
+        
+        # Process in the background so the caller is never held up by handlers
+        for chat_id, chat_updates in chats.items():
+            key = (bot_id, chat_id)
+            previous = self._update_tasks.get(key)
+            task = asyncio.create_task(self._process_after(previous, bot_id, instance, chat_updates))
+            self._update_tasks[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget_batch(key, done))
+        return True
+    
+    async def _process_after(self, previous: Optional[asyncio.Task], bot_id: int, instance, updates: list):
+        """Wait for the chat's previous updates, then process these"""
+        if previous is not None and not previous.done():
+            # wait() does not raise if the previous task failed or was cancelled
+            await asyncio.wait([previous])
+        await self._process_updates(bot_id, instance, updates)
     
-    async def restart_bot(self, db: Session, bot_id: int) -> bool:
+    def _forget_batch(self, key: Tuple[int, Optional[int]], task: asyncio.Task):
+        """Drop a finished task unless a newer one is already chained"""
+        if self._update_tasks.get(key) is task:
+            del self._update_tasks[key]
+    
+    async def _process_updates(self, bot_id: int, instance, updates: list):
+        """Run updates through a bot's dispatcher in order"""
+        from aiogram import Bot as AioBot, Dispatcher, types
+        
+        telegram_bot, dp = instance
+        # Webhook updates arrive as raw dicts, polled ones already parsed
+        source = "webhook" if updates and isinstance(updates[0], dict) else "polling"
+        metrics.BOT_UPDATES_RECEIVED.labels(bot_id, source).inc(len(updates))
+        
+        # Handlers resolve the bot from context, so bind it for this task only
+        current_bot_id.set(bot_id)
+        AioBot.set_current(telegram_bot)
+        Dispatcher.set_current(dp)
+        for update in updates:
+            update_type = "unknown"
+            start = time.perf_counter()
+            try:
+                # A malformed webhook update fails here and is dropped like a failing handler
+                if isinstance(update, dict):
+                    update = types.Update(**update)
+                update_type = _update_type(update)
+                message = getattr(update, update_type, None) if update_type in ("message", "channel_post") else None
+                if message is not None and message.date:
+                    metrics.BOT_UPDATE_LAG.labels(source).observe(max(time.time() - message.date.timestamp(), 0.0))
+                
+                start = time.perf_counter()
+                await dp.process_update(update)
+            except Exception as e:
+                metrics.BOT_HANDLER_ERRORS.labels(bot_id).inc()
+                logger.error(f"Bot {bot_id} failed to process update: {e}")
+            metrics.BOT_HANDLER_DURATION.labels(update_type).observe(time.perf_counter() - start)
+    
+    async def restart_bot(self, db: AsyncSession, bot_id: int) -> bool:
         """Restart a bot by its ID"""
         await self.stop_bot(db, bot_id)
-        await asyncio.sleep(1)  # Brief pause
         return await self.start_bot(db, bot_id)
     
-    def _set_error_status(self, db: Session, bot_id: int):
+    async def _set_error_status(self, db: AsyncSession, bot_id: int):
         """Set bot status to error"""
-        bot = db.query(Bot).filter(Bot.id == bot_id).first()
+        await db.rollback()
+        bot = await db.get(Bot, bot_id)
         if bot:
             bot.is_active = False
             bot.status = "error"
-            db.commit()
+            await db.commit()
     
     def get_active_bots_count(self) -> int:
         """Get count of active bots"""
         return len(self.active_bots)
     
-    async def stop_all_bots(self, db: Session):
+    async def get_supervisor_stats(self) -> dict:
+        """Restart counters of the supervisor"""
+        return self.supervisor.get_stats()
+    
+    async def get_bot_health(self, bot_id: int) -> Optional[dict]:
+        """Restart count and last error of a bot"""
+        return self.supervisor.get_bot_health(bot_id)
+    
+    async def get_message_counts(self) -> Dict[int, List[float]]:
+        """Updates received and replies sent per bot since the process started"""
+        counts: Dict[int, List[float]] = {}
+        for (bot_id, _), value in metrics.BOT_UPDATES_RECEIVED.values().items():
+            counts.setdefault(bot_id, [0.0, 0.0])[0] += value
+        for (bot_id,), value in metrics.BOT_REPLIES_SENT.values().items():
+            counts.setdefault(bot_id, [0.0, 0.0])[1] += value
+        return counts
+    
+    async def collect_metrics(self) -> List[dict]:
+        """Metric families of bot processes other than this one"""
+        # Bots run in this process, so the local registry already has them
+        return []
+    
+    async def stop_all_bots(self, db: AsyncSession, concurrency: Optional[int] = None) -> Dict[int, bool]:
         """Stop all running bots"""
-        bot_ids = list(self.active_bots.keys())
-        for bot_id in bot_ids:
-            await self.stop_bot(db, bot_id)
+        bot_ids = set(self.active_bots) | set(self.supervisor.recovering())
+        results = await self.stop_bots(db, list(bot_ids), concurrency)
         logger.info("All bots stopped")
+        return results
+    
+    async def shutdown(self):
+        """Release all bot instances without changing their stored status"""
+        await self.supervisor.stop()
+        await self.polling.stop()
+        for bot_id in list(self.bot_instances.keys()):
+            await self._close_instance(bot_id)
+        self.active_bots.clear()
+        await send_scheduler.stop()
+        await http_pool.close()
+
+def create_bot_manager():
+    """Create the bot runtime for the configured sharding mode"""
+    if settings.BOT_SHARDS > 0:
+        from app.services.sharding import ShardedBotManager
+        return ShardedBotManager(settings.BOT_SHARDS)
+    return BotManager()
 
 # Global bot manager instance
-bot_manager = BotManager()
+bot_manager = create_bot_manager()
@@ -0,0 +1,214 @@
+"""
+In-Memory Bot Registry
+"""
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.http_cache import versions
+from app.db.models import Bot, SessionLocal
+from app.db.queries import bot_projection
+
+logger = logging.getLogger(__name__)
+
+# Session.info keys used to carry pending invalidations until commit
+CHANGED_IDS_KEY = "bot_registry_changed_ids"
+CHANGED_ALL_KEY = "bot_registry_changed_all"
+
+def _remove_sorted(ids: List[int], bot_id: int):
+    """Remove an id from a sorted list"""
+    index = bisect_left(ids, bot_id)
+    if index < len(ids) and ids[index] == bot_id:
+        del ids[index]
+
+class BotRegistry:
+    """Cached copy of the bots table, kept consistent by commit hooks
+    
+    The table is loaded once on first read. Every commit that touches a
+    Bot row (ORM changes or bulk UPDATE/DELETE statements) invalidates the
+    affected ids, and the next read refreshes only those rows. All bot
+    reads, including listings and counts, are served from memory instead
+    of querying the table on every request. Ids are kept sorted, overall
+    and per status like the (status, id) index, so pages and counts cost
+    the same however many bots there are. Returned records are shared and
+    must not be modified.
+    """
+    
+    def __init__(self):
+        self._bots: Dict[int, dict] = {}
+        self._ids: List[int] = []
+        self._ids_by_status: Dict[str, List[int]] = {}
+        self._loaded = False
+        self._stale = False
+        self._dirty: Set[int] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        # Called with changed ids (None for all) after each commit
+        self.listeners: List[Callable[[Optional[List[int]]], None]] = []
+        
+        self.full_loads = 0
+        self.partial_loads = 0
+    
+    def invalidate(self, bot_ids: Optional[Iterable[int]] = None):
+        """Mark bots as changed; None marks the whole table"""
+        if bot_ids is None:
+            self._stale = True
+        else:
+            self._dirty.update(bot_ids)
+    
+    def notify(self, bot_ids: Optional[List[int]]):
+        """Invalidate locally and tell listeners about committed changes"""
+        self.invalidate(bot_ids)
+        versions.bump("bots")
+        for listener in self.listeners:
+            try:
+                listener(bot_ids)
+            except Exception as e:
+                logger.error(f"Bot registry listener failed: {e}")
+    
+    async def _sync(self):
+        """Bring the cache up to date with committed changes"""
+        if self._loaded and not self._stale and not self._dirty:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            if not self._loaded or self._stale:
+                # Reset first so invalidations during the query are kept
+                self._stale = False
+                self._dirty.clear()
+                columns, read = bot_projection()
+                async with SessionLocal() as db:
+                    rows = (await db.execute(select(*columns).order_by(Bot.id))).all()
+                self._bots = {}
+                self._ids = []
+                self._ids_by_status = {}
+                for row in rows:
+                    bot = self._bots[row.id] = read(row)
+                    self._ids.append(row.id)
+                    self._ids_by_status.setdefault(bot["status"], []).append(row.id)
+                self._loaded = True
+                self.full_loads += 1
+            elif self._dirty:
+                bot_ids = list(self._dirty)
+                self._dirty.clear()
+                columns, read = bot_projection()
+                async with SessionLocal() as db:
+                    rows = (await db.execute(select(*columns).where(Bot.id.in_(bot_ids)))).all()
+                for bot_id in bot_ids:
+                    self._discard(bot_id)
+                for row in rows:
+                    self._add(read(row))
+                self.partial_loads += 1
+    
+    def _add(self, bot: dict):
+        """Cache a bot and index its id"""
+        self._bots[bot["id"]] = bot
+        insort(self._ids, bot["id"])
+        insort(self._ids_by_status.setdefault(bot["status"], []), bot["id"])
+    
+    def _discard(self, bot_id: int):
+        """Forget a bot and its indexed ids"""
+        bot = self._bots.pop(bot_id, None)
+        if bot is None:
+            return
+        _remove_sorted(self._ids, bot_id)
+        ids = self._ids_by_status[bot["status"]]
+        _remove_sorted(ids, bot_id)
+        if not ids:
+            del self._ids_by_status[bot["status"]]
+    
+    async def ids(self) -> List[int]:
+        """Ids of all bots in ascending order"""
+        await self._sync()
+        return list(self._ids)
+    
+    async def page(
+        self,
+        limit: int,
+        after: Optional[int] = None,
+        status: Optional[str] = None,
+        name: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[int]]:
+        """One page of bots ordered by id, and the cursor of the next page
+        
+        The page starts with a binary search for the cursor in the sorted
+        ids of all bots or of one status. A name filter (case-insensitive
+        substring) skips non-matching bots from there on.
+        """
+        await self._sync()
+        ids = self._ids_by_status.get(status, []) if status else self._ids
+        start = bisect_right(ids, after) if after is not None else 0
+        needle = name.lower() if name else None
+        
+        bots = []
+        for index in range(start, len(ids)):
+            bot = self._bots[ids[index]]
+            if needle and needle not in (bot["name"] or "").lower():
+                continue
+            if len(bots) == limit:
+                return bots, bots[-1]["id"]
+            bots.append(bot)
+        return bots, None
+    
+    async def get(self, bot_id: int) -> Optional[dict]:
+        """A single bot, or None if it does not exist"""
+        await self._sync()
+        return self._bots.get(bot_id)
+    
+    async def counts(self) -> Dict[str, int]:
+        """Number of bots per status"""
+        await self._sync()
+        return {status: len(ids) for status, ids in self._ids_by_status.items()}
+    
+    async def count(self) -> int:
+        """Number of bots"""
+        await self._sync()
+        return len(self._ids)
+    
+    def get_stats(self) -> dict:
+        """Cache size and reload counters"""
+        return {
+            "bots": len(self._bots),
+            "loaded": self._loaded,
+            "pending_invalidations": len(self._dirty) + (1 if self._stale else 0),
+            "full_loads": self.full_loads,
+            "partial_loads": self.partial_loads
+        }
+
+# Global bot registry instance
+bot_registry = BotRegistry()
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_bots(session: Session, flush_context):
+    """Remember which bots a flush touched until the transaction commits"""
+    changed = session.info.setdefault(CHANGED_IDS_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Bot) and obj.id is not None:
+            changed.add(obj.id)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_statements(orm_execute_state):
+    """Bulk UPDATE/DELETE on bots may touch any row"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        if any(mapper.class_ is Bot for mapper in orm_execute_state.all_mappers):
+            orm_execute_state.session.info[CHANGED_ALL_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed_bots(session: Session):
+    """Invalidate committed changes in the registry"""
+    changed = session.info.pop(CHANGED_IDS_KEY, None)
+    if session.info.pop(CHANGED_ALL_KEY, False):
+        bot_registry.notify(None)
+    elif changed:
+        bot_registry.notify(sorted(changed))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_bots(session: Session):
+    """Rolled back changes never reached the database"""
+    session.info.pop(CHANGED_IDS_KEY, None)
+    session.info.pop(CHANGED_ALL_KEY, None)
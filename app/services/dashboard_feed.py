@@ -0,0 +1,240 @@
+"""
+Live Dashboard Updates
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.audit_log import audit_log
+from app.services.bot_manager import bot_manager
+from app.services.bot_registry import bot_registry
+
+logger = logging.getLogger(__name__)
+
+# Rows of the dashboard's Recent Activity table
+ACTIVITY_ROWS = 10
+
+def _bot_event(bot_id: int, bot: Optional[dict]) -> dict:
+    """Delta for one bot card"""
+    if bot is None:
+        return {"type": "bot_removed", "id": bot_id}
+    return {
+        "type": "bot",
+        "id": bot_id,
+        "name": bot["name"],
+        "status": bot["status"],
+        "is_active": bot["is_active"]
+    }
+
+class DashboardClient:
+    """One open dashboard
+    
+    Deltas waiting to be sent are merged per key (one per bot, one for the
+    summary, ...), so however far a client falls behind it only holds the
+    latest state of each item, and it is sent at most one batch per interval.
+    """
+    
+    def __init__(self, bot_ids: Optional[Set[int]], interval: float):
+        self.bot_ids = bot_ids
+        self.interval = interval
+        self.pending: Dict[str, dict] = {}
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+        self._last_sent = 0.0
+    
+    def wants(self, bot_id: int) -> bool:
+        """Whether the client shows this bot"""
+        return self.bot_ids is None or bot_id in self.bot_ids
+    
+    def offer(self, key: str, event: dict):
+        """Queue a delta, merging it with one not yet sent"""
+        current = self.pending.get(key)
+        if current is not None:
+            self.coalesced += 1
+            if event["type"] == "activity":
+                event = {**event, "entries": (current["entries"] + event["entries"])[-ACTIVITY_ROWS:]}
+            elif event["type"] == "counters":
+                event = {**event, "bots": {**current["bots"], **event["bots"]}}
+        self.pending[key] = event
+        self._ready.set()
+    
+    async def next_batch(self, timeout: float) -> List[dict]:
+        """Wait for deltas, no sooner than one interval after the last batch"""
+        loop = asyncio.get_running_loop()
+        delay = self._last_sent + self.interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if not self.pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        events = list(self.pending.values())
+        self.pending.clear()
+        if events:
+            self._last_sent = loop.time()
+        return events
+
+class DashboardFeed:
+    """Pushes bot state, message counters and admin activity to open dashboards
+    
+    Bot changes come from the bot registry's commit hooks and activity from
+    the audit log, so nothing is queried per client. While dashboards are
+    open, one pass per DASHBOARD_PUSH_INTERVAL reads the changed bots from
+    the registry and the counters from the bot manager and fans the deltas
+    out to every client.
+    """
+    
+    def __init__(self, interval: float = None):
+        self.interval = interval or settings.DASHBOARD_PUSH_INTERVAL
+        self._clients: Set[DashboardClient] = set()
+        self._changed: Set[int] = set()
+        self._changed_all = False
+        self._summary: Optional[dict] = None
+        self._counters: Dict[int, List[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+    
+    def start(self):
+        """Start listening for bot changes and admin activity"""
+        if self._on_bots_changed not in bot_registry.listeners:
+            bot_registry.listeners.append(self._on_bots_changed)
+            audit_log.listeners.append(self._on_activity)
+    
+    async def stop(self):
+        """Stop listening and pushing"""
+        if self._on_bots_changed in bot_registry.listeners:
+            bot_registry.listeners.remove(self._on_bots_changed)
+            audit_log.listeners.remove(self._on_activity)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def _on_bots_changed(self, bot_ids: Optional[List[int]]):
+        if not self._clients:
+            return
+        if bot_ids is None:
+            self._changed_all = True
+        else:
+            self._changed.update(bot_ids)
+    
+    def _on_activity(self, entry: dict):
+        if not self._clients:
+            return
+        row = {
+            "created_at": entry["created_at"].isoformat(),
+            "username": entry["username"],
+            "action": entry["action"],
+            "details": entry["details"]
+        }
+        for client in self._clients:
+            client.offer("activity", {"type": "activity", "entries": [row]})
+    
+    async def subscribe(self, bot_ids: Optional[Set[int]] = None) -> DashboardClient:
+        """Add a client showing `bot_ids` (None for all bots)
+        
+        The client first receives the current summary, counters and the
+        state of its bots, in case they changed since the page was rendered.
+        """
+        client = DashboardClient(bot_ids, self.interval)
+        if not self._clients:
+            self._summary = await self._get_summary()
+            self._counters = await self._get_counters()
+        client.offer("summary", self._summary)
+        client.offer("counters", self._counter_event(client, self._counters))
+        for bot_id in bot_ids or ():
+            client.offer(f"bot:{bot_id}", _bot_event(bot_id, await bot_registry.get(bot_id)))
+        
+        self._clients.add(client)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return client
+    
+    def unsubscribe(self, client: DashboardClient):
+        """Remove a client"""
+        self._clients.discard(client)
+    
+    async def _get_summary(self) -> dict:
+        """Figures of the stat cards, from the registry's in-memory copy"""
+        counts = await bot_registry.counts()
+        return {
+            "type": "summary",
+            "total": sum(counts.values()),
+            "active": bot_manager.get_active_bots_count(),
+            "error": counts.get("error", 0)
+        }
+    
+    async def _get_counters(self) -> Dict[int, List[int]]:
+        """Updates received and replies sent per bot"""
+        counts = await bot_manager.get_message_counts()
+        return {bot_id: [int(received), int(sent)] for bot_id, (received, sent) in counts.items()}
+    
+    def _counter_event(self, client: DashboardClient, counters: Dict[int, List[int]]) -> dict:
+        """Counters of the bots a client shows"""
+        return {
+            "type": "counters",
+            "bots": {bot_id: value for bot_id, value in counters.items() if client.wants(bot_id)}
+        }
+    
+    async def _run(self):
+        """Push deltas every interval while any dashboard is open"""
+        while self._clients:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"Failed to update dashboards: {e}")
+        self._task = None
+    
+    async def _tick(self):
+        """Collect what changed since the last pass and offer it to clients"""
+        self.ticks += 1
+        if self._changed or self._changed_all:
+            if self._changed_all:
+                bot_ids = await bot_registry.ids()
+            else:
+                bot_ids = sorted(self._changed)
+            self._changed.clear()
+            self._changed_all = False
+            
+            for bot_id in bot_ids:
+                wanted_by = [client for client in self._clients if client.wants(bot_id)]
+                if wanted_by:
+                    event = _bot_event(bot_id, await bot_registry.get(bot_id))
+                    for client in wanted_by:
+                        client.offer(f"bot:{bot_id}", event)
+            
+            summary = await self._get_summary()
+            if summary != self._summary:
+                self._summary = summary
+                for client in self._clients:
+                    client.offer("summary", summary)
+        
+        counters = await self._get_counters()
+        changed = {
+            bot_id: value for bot_id, value in counters.items() if self._counters.get(bot_id) != value
+        }
+        self._counters = counters
+        if changed:
+            for client in self._clients:
+                event = self._counter_event(client, changed)
+                if event["bots"]:
+                    client.offer("counters", event)
+    
+    def get_stats(self) -> dict:
+        """Connected dashboards and push counters"""
+        return {
+            "clients": len(self._clients),
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "coalesced": sum(client.coalesced for client in self._clients)
+        }
+
+# Global dashboard feed instance
+dashboard_feed = DashboardFeed()
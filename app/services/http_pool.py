@@ -0,0 +1,173 @@
+"""
+Shared HTTP Connection Pool
+"""
+import asyncio
+import logging
+import ssl
+import time
+from functools import lru_cache
+from typing import Optional
+
+import aiohttp
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _api_method(url) -> str:
+    """Bot API method of a request URL, e.g. sendMessage for /bot<token>/sendMessage"""
+    parts = url.path.split("/")
+    if len(parts) >= 3 and parts[-2].startswith("bot"):
+        return parts[-1]
+    # File downloads (/file/bot<token>/<path>) would otherwise label by file name
+    return "file"
+
+class SharedHTTPPool:
+    """One keep-alive aiohttp session used by every bot instance
+    
+    aiogram gives each Bot its own ClientSession and connector, which means
+    one TLS handshake and one idle pool per bot. Routing all bots through a
+    single size-limited connector lets them reuse warm connections to the
+    Bot API instead.
+    """
+    
+    def __init__(
+        self,
+        limit: int = None,
+        limit_per_host: int = None,
+        keepalive_timeout: float = None
+    ):
+        self.limit = limit or settings.HTTP_POOL_LIMIT
+        self.limit_per_host = limit_per_host or settings.HTTP_POOL_LIMIT_PER_HOST
+        self.keepalive_timeout = keepalive_timeout or settings.HTTP_POOL_KEEPALIVE_TIMEOUT
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self.requests = 0
+        self.request_errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Build the session with a bounded keep-alive connector"""
+        import certifi
+        from aiogram.utils import json
+        
+        # Loading the CA bundle takes tens of milliseconds, so do it once per process
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ssl=self._ssl_context
+        )
+        logger.info(
+            f"Created shared HTTP pool (limit={self.limit}, "
+            f"limit_per_host={self.limit_per_host})"
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            json_serialize=json.dumps,
+            trace_configs=[self._trace_config()]
+        )
+    
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Count requests and connection reuse, and time Bot API calls"""
+        trace_config = aiohttp.TraceConfig()
+        
+        async def on_request_start(session, context, params):
+            self.requests += 1
+            context.start = time.perf_counter()
+        
+        async def on_request_end(session, context, params):
+            method = _api_method(params.url)
+            metrics.TELEGRAM_API_REQUEST_DURATION.labels(method).observe(time.perf_counter() - context.start)
+            if params.response.status >= 400:
+                metrics.TELEGRAM_API_ERRORS.labels(method, params.response.status).inc()
+        
+        async def on_request_exception(session, context, params):
+            self.request_errors += 1
+            metrics.TELEGRAM_API_ERRORS.labels(_api_method(params.url), "network").inc()
+        
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+        
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+        
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+    
+    async def close(self):
+        """Close the shared session and all pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    def get_stats(self) -> dict:
+        """Pool configuration and usage counters"""
+        in_use = 0
+        idle = 0
+        if self._session is not None and not self._session.closed:
+            # aiohttp has no public API for pool occupancy
+            connector = self._session.connector
+            in_use = len(getattr(connector, "_acquired", ()))
+            idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "in_use": in_use,
+            "idle": idle,
+            "requests": self.requests,
+            "request_errors": self.request_errors,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused
+        }
+
+@lru_cache()
+def get_pooled_bot_class():
+    """aiogram Bot subclass that sends requests through the shared pool"""
+    # Import aiogram here to avoid startup errors
+    from aiogram import Bot as AioBot
+    
+    class PooledBot(AioBot):
+        async def get_session(self) -> aiohttp.ClientSession:
+            return http_pool.get_session()
+        
+        async def close(self):
+            # The shared session outlives individual bots
+            pass
+    
+    return PooledBot
+
+async def create_telegram_bot(token: str):
+    """Create an aiogram Bot bound to the shared HTTP pool
+    
+    aiogram loads the CA bundle into a new SSLContext in every Bot's
+    constructor (~30ms). Pooled bots never use that context, but building
+    them in a worker thread keeps the load off the event loop; OpenSSL
+    releases the GIL while it reads the bundle.
+    """
+    bot_class = get_pooled_bot_class()
+    kwargs = {}
+    if settings.TELEGRAM_API_URL:
+        from aiogram.bot.api import TelegramAPIServer
+        
+        kwargs["server"] = TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)
+    return await asyncio.to_thread(bot_class, token=token, **kwargs)
+
+# Global shared HTTP pool instance
+http_pool = SharedHTTPPool()
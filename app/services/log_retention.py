@@ -0,0 +1,239 @@
+"""
+Audit Log Retention and Archival
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.http_cache import versions
+from app.db.models import AdminLog, SessionLocal
+from app.db.queries import LOG_FIELDS, id_chunks, naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Pause between chunks so request handlers can take the write lock
+CHUNK_PAUSE = 0.05
+# Widest range an archive query may scan
+MAX_QUERY_DAYS = 31
+
+class LogRetention:
+    """Moves old AdminLog rows into compressed daily archive files
+    
+    Rows older than LOG_RETENTION_DAYS are copied to one gzip NDJSON file
+    per day under LOG_ARCHIVE_DIR (YYYY/MM/admin_logs-YYYY-MM-DD.ndjson.gz)
+    and then deleted, LOG_ARCHIVE_CHUNK_SIZE rows per short transaction.
+    Each chunk is appended as its own gzip member, so files never need to
+    be rewritten. A chunk whose delete fails is archived again on the next
+    run, and readers skip the duplicate ids.
+    """
+    
+    def __init__(
+        self,
+        retention_days: int = None,
+        archive_dir: str = None,
+        chunk_size: int = None,
+        interval: float = None
+    ):
+        self.retention_days = retention_days if retention_days is not None else settings.LOG_RETENTION_DAYS
+        self.archive_dir = archive_dir or settings.LOG_ARCHIVE_DIR
+        self.chunk_size = chunk_size or settings.LOG_ARCHIVE_CHUNK_SIZE
+        self.interval = interval or settings.LOG_RETENTION_INTERVAL
+        
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.archived = 0
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether old rows are archived"""
+        return self.retention_days > 0
+    
+    def start(self):
+        """Start the periodic archival task"""
+        if self._task is not None or not self.enabled:
+            return
+        self._task = asyncio.create_task(self._run_loop())
+    
+    async def stop(self):
+        """Stop the archival task; a chunk in progress is rolled back"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    def get_stats(self) -> dict:
+        """Archival counters"""
+        return {
+            "enabled": self.enabled,
+            "retention_days": self.retention_days,
+            "archived": self.archived,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error
+        }
+    
+    def partition_path(self, day: date) -> str:
+        """Archive file of a day"""
+        return os.path.join(
+            self.archive_dir,
+            f"{day:%Y}",
+            f"{day:%m}",
+            f"admin_logs-{day.isoformat()}.ndjson.gz"
+        )
+    
+    async def _run_loop(self):
+        """Archive at a fixed interval"""
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Audit log archival failed: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def run(self) -> int:
+        """Archive every row past the retention age; returns rows moved"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+            moved = 0
+            while True:
+                count = await self._archive_chunk(cutoff)
+                moved += count
+                if count < self.chunk_size:
+                    break
+                await asyncio.sleep(CHUNK_PAUSE)
+            
+            self.runs += 1
+            self.archived += moved
+            self.last_run_at = datetime.utcnow()
+            self.last_error = None
+            if moved:
+                logger.info(f"Archived {moved} audit log entries older than {cutoff:%Y-%m-%d}")
+            return moved
+    
+    async def _archive_chunk(self, cutoff: datetime) -> int:
+        """Copy the oldest chunk to the archive, then delete it"""
+        columns = [getattr(AdminLog, field) for field in LOG_FIELDS]
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(*columns)
+                .where(AdminLog.created_at < cutoff)
+                .order_by(AdminLog.created_at, AdminLog.id)
+                .limit(self.chunk_size)
+            )).all()
+            if not rows:
+                return 0
+            
+            by_day: Dict[date, List[dict]] = {}
+            for row in rows:
+                entry = dict(zip(LOG_FIELDS, row))
+                by_day.setdefault(entry["created_at"].date(), []).append(entry)
+            
+            # Files first: a crash before the delete only duplicates rows
+            await asyncio.to_thread(self._append, by_day)
+            
+            for chunk in id_chunks([row.id for row in rows]):
+                await db.execute(
+                    delete(AdminLog)
+                    .where(AdminLog.id.in_(chunk))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+            versions.bump("logs")
+            return len(rows)
+    
+    def _append(self, by_day: Dict[date, List[dict]]):
+        """Append entries to their daily archive files as new gzip members"""
+        for day, entries in by_day.items():
+            path = self.partition_path(day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            lines = "".join(
+                json.dumps({**entry, "created_at": entry["created_at"].isoformat()}) + "\n"
+                for entry in entries
+            )
+            with open(path, "ab") as f:
+                f.write(gzip.compress(lines.encode()))
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def list_partitions(self) -> List[dict]:
+        """Archived days with their file sizes"""
+        partitions = []
+        if not os.path.isdir(self.archive_dir):
+            return partitions
+        for root, _, files in os.walk(self.archive_dir):
+            for name in files:
+                if name.startswith("admin_logs-") and name.endswith(".ndjson.gz"):
+                    partitions.append({
+                        "date": name[len("admin_logs-"):-len(".ndjson.gz")],
+                        "size_bytes": os.path.getsize(os.path.join(root, name))
+                    })
+        return sorted(partitions, key=lambda p: p["date"])
+    
+    async def query(
+        self,
+        since: datetime,
+        until: datetime,
+        username: Optional[str] = None,
+        action: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[dict]:
+        """Archived entries in [since, until), oldest first"""
+        # Archived timestamps are naive UTC
+        since, until = naive_utc(since), naive_utc(until)
+        if until - since > timedelta(days=MAX_QUERY_DAYS):
+            raise ValueError(f"Archive queries may span at most {MAX_QUERY_DAYS} days")
+        return await asyncio.to_thread(self._scan, since, until, username, action, limit)
+    
+    def _scan(
+        self,
+        since: datetime,
+        until: datetime,
+        username: Optional[str],
+        action: Optional[str],
+        limit: int
+    ) -> List[dict]:
+        """Read matching entries from the daily files in the range"""
+        results = []
+        day = since.date()
+        while day <= until.date() and len(results) < limit:
+            path = self.partition_path(day)
+            day += timedelta(days=1)
+            if not os.path.exists(path):
+                continue
+            
+            seen = set()
+            entries = []
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["id"] in seen:
+                        continue
+                    seen.add(entry["id"])
+                    if not since <= datetime.fromisoformat(entry["created_at"]) < until:
+                        continue
+                    if username and entry["username"] != username:
+                        continue
+                    if action and entry["action"] != action:
+                        continue
+                    entries.append(entry)
+            
+            entries.sort(key=lambda e: (e["created_at"], e["id"]))
+            results.extend(entries)
+        return results[:limit]
+
+# Global log retention instance
+log_retention = LogRetention()
@@ -0,0 +1,185 @@
+"""
+Live Bot Log Stream
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.logging import add_log_handler, remove_log_handler
+
+class LogSubscriber:
+    """One live tail client with a bounded buffer
+    
+    Publishing never waits for the client: when the buffer is full the
+    oldest entry is dropped and counted, and the client is told how many
+    lines it missed.
+    """
+    
+    def __init__(self, bot_id: Optional[int], min_level: int, max_buffer: int):
+        self.bot_id = bot_id
+        self.min_level = min_level
+        self.max_buffer = max_buffer
+        self.buffer: Deque[dict] = deque()
+        self.dropped = 0  # Since the last batch
+        self.dropped_total = 0
+        self._ready = asyncio.Event()
+    
+    def matches(self, entry: dict) -> bool:
+        """Whether an entry passes the client's filters"""
+        if entry["levelno"] < self.min_level:
+            return False
+        return self.bot_id is None or entry["bot_id"] == self.bot_id
+    
+    def offer(self, entry: dict):
+        """Buffer an entry for the client"""
+        if not self.matches(entry):
+            return
+        if len(self.buffer) >= self.max_buffer:
+            self.buffer.popleft()
+            self.dropped += 1
+            self.dropped_total += 1
+        self.buffer.append(entry)
+        self._ready.set()
+    
+    async def next_batch(self, timeout: float) -> Tuple[List[dict], int]:
+        """Wait for entries; returns them with the count dropped since the last batch"""
+        if not self.buffer and not self.dropped:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        entries = list(self.buffer)
+        self.buffer.clear()
+        dropped, self.dropped = self.dropped, 0
+        return entries, dropped
+
+class LogStreamHandler(logging.Handler):
+    """Forward bot log records from the log writer thread to the event loop
+    
+    Records are handed over in batches with one call_soon_threadsafe per
+    batch, so a burst of lines costs the loop a single wakeup.
+    """
+    
+    def __init__(self, hub: "LogHub", loop: asyncio.AbstractEventLoop, max_pending: int):
+        super().__init__()
+        self.hub = hub
+        self.loop = loop
+        self._pending: Deque[dict] = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._scheduled = False
+    
+    def emit(self, record: logging.LogRecord):
+        bot_id = getattr(record, "bot_id", None)
+        if bot_id is None:
+            return
+        entry = {
+            "time": datetime.utcfromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "levelno": record.levelno,
+            "logger": record.name,
+            "bot_id": bot_id,
+            "message": record.getMessage()
+        }
+        with self._lock:
+            self._pending.append(entry)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self._drain)
+        except RuntimeError:
+            # Loop closed during shutdown
+            pass
+    
+    def _drain(self):
+        with self._lock:
+            entries = list(self._pending)
+            self._pending.clear()
+            self._scheduled = False
+        self.hub.publish(entries)
+
+class LogHub:
+    """Recent bot log lines and the live tail clients following them
+    
+    Every line gets a sequence number and the last LOG_TAIL_HISTORY lines
+    are kept, so a client that reconnects with Last-Event-ID receives what
+    it missed as long as it is still in the history. In sharded mode the
+    shards forward their lines here and they are numbered on arrival.
+    """
+    
+    def __init__(self, history: int = None, client_buffer: int = None):
+        self.history: Deque[dict] = deque(maxlen=history or settings.LOG_TAIL_HISTORY)
+        self.client_buffer = client_buffer or settings.LOG_TAIL_CLIENT_BUFFER
+        self.listeners: List[Callable[[List[dict]], None]] = []
+        self._subscribers: Set[LogSubscriber] = set()
+        self._handler: Optional[LogStreamHandler] = None
+        self._seq = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Start receiving bot log records from this process"""
+        if self._handler is not None:
+            return
+        self._handler = LogStreamHandler(self, asyncio.get_running_loop(), self.history.maxlen)
+        add_log_handler(self._handler)
+    
+    def stop(self):
+        """Stop receiving log records"""
+        if self._handler is not None:
+            remove_log_handler(self._handler)
+            self._handler = None
+    
+    def publish(self, entries: List[dict]):
+        """Number entries, keep them and hand them to matching clients"""
+        if not entries:
+            return
+        for entry in entries:
+            self._seq += 1
+            entry["seq"] = self._seq
+            self.history.append(entry)
+            for subscriber in self._subscribers:
+                subscriber.offer(entry)
+        for listener in self.listeners:
+            listener(entries)
+    
+    def subscribe(self, bot_id: Optional[int], min_level: int, after: Optional[int] = None) -> Tuple[LogSubscriber, int]:
+        """Add a client; with `after`, replay the lines since that sequence number
+        
+        Returns the subscriber and how many requested lines are no longer
+        in the history.
+        """
+        subscriber = LogSubscriber(bot_id, min_level, self.client_buffer)
+        missed = 0
+        if after is not None and after > self._seq:
+            # Numbering restarted with the process; everything kept is new to the client
+            after = 0
+        if after is not None:
+            oldest = self.history[0]["seq"] if self.history else self._seq + 1
+            missed = max(oldest - after - 1, 0)
+            for entry in self.history:
+                if entry["seq"] > after:
+                    subscriber.offer(entry)
+        self._subscribers.add(subscriber)
+        return subscriber, missed
+    
+    def unsubscribe(self, subscriber: LogSubscriber):
+        """Remove a client"""
+        self.dropped += subscriber.dropped_total
+        self._subscribers.discard(subscriber)
+    
+    def get_stats(self) -> dict:
+        """History size, connected clients and lines dropped for slow clients"""
+        return {
+            "seq": self._seq,
+            "history": len(self.history),
+            "clients": len(self._subscribers),
+            "dropped": self.dropped + sum(subscriber.dropped_total for subscriber in self._subscribers)
+        }
+
+# Global log hub instance
+log_hub = LogHub()
@@ -0,0 +1,226 @@
+"""
+Shared Polling Scheduler
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single getUpdates round trip
+REQUEST_TIMEOUT = 10
+# Max updates fetched per getUpdates call
+UPDATES_LIMIT = 100
+
+@dataclass
+class PolledBot:
+    """Polling state of a single bot"""
+    bot_id: int
+    telegram_bot: any
+    generation: int
+    offset: Optional[int] = None
+    interval: float = 0.0
+    last_poll_at: Optional[float] = None
+    last_update_at: Optional[float] = None
+    added_at: float = field(default_factory=time.monotonic)
+    errors: int = 0  # Consecutive failed polls
+    last_error: Optional[str] = None
+
+class PollingScheduler:
+    """Drives getUpdates for many bots from a fixed pool of workers
+    
+    Instead of one long-poll loop per bot, due bots are kept in a heap
+    ordered by their next poll time. A bounded set of workers short-polls
+    whichever bot is due next, so concurrent requests to Telegram never
+    exceed the worker count. Bots that receive updates are polled at
+    POLL_MIN_INTERVAL; every empty poll doubles the interval up to
+    POLL_MAX_INTERVAL.
+    """
+    
+    def __init__(
+        self,
+        on_updates: Callable[[int, list], bool],
+        workers: int = None,
+        min_interval: float = None,
+        max_interval: float = None
+    ):
+        self.on_updates = on_updates
+        self.workers = workers or settings.POLL_WORKERS
+        self.min_interval = min_interval or settings.POLL_MIN_INTERVAL
+        self.max_interval = max_interval or settings.POLL_MAX_INTERVAL
+        
+        self._bots: Dict[int, PolledBot] = {}
+        self._heap: List[Tuple[float, int, int, int]] = []  # (due, seq, bot_id, generation)
+        self._seq = itertools.count()
+        self._generation = itertools.count(1)
+        self._ready: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    @property
+    def running(self) -> bool:
+        """Whether the scheduler tasks are alive"""
+        return bool(self._tasks)
+    
+    @property
+    def crashed(self) -> bool:
+        """Whether a scheduler task died unexpectedly"""
+        return any(task.done() for task in self._tasks)
+    
+    def start(self):
+        """Start the scheduler and its polling workers"""
+        if self.running:
+            return
+        self._ready = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._schedule_loop()))
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker_loop()))
+        logger.info(f"Polling scheduler started with {self.workers} workers")
+    
+    async def stop(self):
+        """Stop all workers; registered bots are kept"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Polling scheduler stopped")
+    
+    def add_bot(self, bot_id: int, telegram_bot):
+        """Register a bot for polling; it is polled immediately"""
+        self.start()
+        entry = PolledBot(
+            bot_id=bot_id,
+            telegram_bot=telegram_bot,
+            generation=next(self._generation),
+            interval=self.min_interval
+        )
+        self._bots[bot_id] = entry
+        self._schedule(entry, 0)
+    
+    def remove_bot(self, bot_id: int):
+        """Stop polling a bot; an in-flight poll is discarded"""
+        self._bots.pop(bot_id, None)
+    
+    def is_polling(self, bot_id: int) -> bool:
+        """Whether a bot is registered with the scheduler"""
+        return bot_id in self._bots
+    
+    def check_bot(self, bot_id: int, stall_timeout: float, max_errors: int) -> Optional[str]:
+        """Reason a bot needs restarting, or None if it is healthy"""
+        entry = self._bots.get(bot_id)
+        if entry is None:
+            return "not registered with the polling scheduler"
+        if entry.errors >= max_errors:
+            return f"{entry.errors} consecutive getUpdates errors: {entry.last_error}"
+        
+        idle = time.monotonic() - (entry.last_poll_at or entry.added_at)
+        if idle > stall_timeout:
+            return f"no successful poll for {idle:.0f}s"
+        return None
+    
+    def is_healthy(self, bot_id: int) -> bool:
+        """Whether a bot has polled successfully since it was added"""
+        entry = self._bots.get(bot_id)
+        return bool(entry and entry.errors == 0 and entry.last_poll_at is not None)
+    
+    async def restart(self):
+        """Restart dead scheduler tasks; bots that were in flight stall and get re-added"""
+        await self.stop()
+        self.start()
+    
+    def get_stats(self) -> dict:
+        """Scheduler load summary"""
+        now = time.monotonic()
+        overdue = sum(1 for due, _, bot_id, _ in self._heap if due <= now and bot_id in self._bots)
+        return {
+            "bots": len(self._bots),
+            "workers": self.workers,
+            "ready": self._ready.qsize() if self._ready else 0,
+            "overdue": overdue
+        }
+    
+    def _schedule(self, entry: PolledBot, delay: float):
+        """Put a bot back on the heap"""
+        due = time.monotonic() + delay
+        heapq.heappush(self._heap, (due, next(self._seq), entry.bot_id, entry.generation))
+        if self._wakeup and self._heap[0][0] == due:
+            self._wakeup.set()
+    
+    def _current(self, bot_id: int, generation: int) -> Optional[PolledBot]:
+        """Get the entry for a bot unless it was removed or re-added since"""
+        entry = self._bots.get(bot_id)
+        if entry and entry.generation == generation:
+            return entry
+        return None
+    
+    async def _schedule_loop(self):
+        """Move due bots from the heap to the worker queue"""
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, bot_id, generation = heapq.heappop(self._heap)
+                if self._current(bot_id, generation):
+                    self._ready.put_nowait((bot_id, generation))
+            
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _worker_loop(self):
+        """Poll due bots one at a time"""
+        while True:
+            bot_id, generation = await self._ready.get()
+            entry = self._current(bot_id, generation)
+            if entry:
+                await self._poll(entry)
+    
+    async def _poll(self, entry: PolledBot):
+        """Run one getUpdates call for a bot and reschedule it"""
+        try:
+            with entry.telegram_bot.request_timeout(REQUEST_TIMEOUT):
+                updates = await entry.telegram_bot.get_updates(
+                    offset=entry.offset,
+                    limit=UPDATES_LIMIT,
+                    timeout=0
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Bot {entry.bot_id} getUpdates error: {e}", extra={"bot_id": entry.bot_id})
+            entry.errors += 1
+            entry.last_error = str(e)
+            entry.interval = self.max_interval
+            if self._current(entry.bot_id, entry.generation):
+                self._schedule(entry, entry.interval)
+            return
+        
+        now = time.monotonic()
+        entry.last_poll_at = now
+        entry.errors = 0
+        
+        # Bot was removed while the request was in flight
+        if not self._current(entry.bot_id, entry.generation):
+            return
+        
+        if updates:
+            entry.offset = updates[-1].update_id + 1
+            entry.last_update_at = now
+            entry.interval = self.min_interval
+            self.on_updates(entry.bot_id, updates)
+            # A full batch means more are waiting
+            delay = 0 if len(updates) >= UPDATES_LIMIT else entry.interval
+        else:
+            entry.interval = min(entry.interval * 2, self.max_interval)
+            delay = entry.interval
+        
+        self._schedule(entry, delay)
@@ -0,0 +1,348 @@
+"""
+Outbound Send Scheduler
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, served in this order
+PRIORITY_REPLY = 0
+PRIORITY_BROADCAST = 1
+PRIORITIES = (PRIORITY_REPLY, PRIORITY_BROADCAST)
+
+# Jobs inspected per lane when looking for a chat that is not throttled
+LANE_SCAN_DEPTH = 32
+# Seconds between sweeps that forget idle bots
+IDLE_SWEEP_INTERVAL = 60
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+    
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def consume(self, now: float):
+        """Take one token"""
+        self._refill(now)
+        self.tokens -= 1
+    
+    def pause(self, seconds: float, now: float):
+        """Empty the bucket so no token is available for `seconds`"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+    
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket is idle and can be forgotten"""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+@dataclass
+class SendJob:
+    """A queued outbound API call"""
+    bot_id: int
+    chat_id: int
+    priority: int
+    send: Callable[[], Awaitable]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class BotSendQueue:
+    """Pending sends and rate limits of a single bot"""
+    
+    def __init__(self, bot_rate: float):
+        self.bucket = TokenBucket(bot_rate)
+        self.lanes: Dict[int, Deque[SendJob]] = {priority: deque() for priority in PRIORITIES}
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.inflight = 0
+    
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self.lanes.values())
+    
+    def chat_bucket(self, chat_id: int, chat_rate: float) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(chat_rate, 1)
+        return bucket
+    
+    def prune(self, now: float):
+        """Forget chat buckets that have fully refilled"""
+        for chat_id in [c for c, b in self.chat_buckets.items() if b.is_full(now)]:
+            del self.chat_buckets[chat_id]
+    
+    def is_idle(self, now: float) -> bool:
+        """Whether nothing is pending and every limit has fully recovered"""
+        if len(self) or self.inflight:
+            return False
+        self.prune(now)
+        return not self.chat_buckets and self.bucket.is_full(now)
+
+class SendScheduler:
+    """Rate-limited, fair scheduler for outbound Telegram messages
+    
+    Every send passes a per-bot token bucket (SEND_BOT_RATE), a per-chat
+    bucket (SEND_CHAT_RATE) and optionally a global one (SEND_GLOBAL_RATE).
+    Replies are served before broadcasts, and bots with pending sends are
+    served round-robin so one noisy bot cannot starve the rest. Sends that are over the limit wait in the queue
+    instead of failing with 429, and a 429 that slips through pauses the
+    bot for the retry_after period. Bots whose limits have recovered are
+    forgotten, so state is only kept for bots that sent recently.
+    """
+    
+    def __init__(
+        self,
+        bot_rate: float = None,
+        chat_rate: float = None,
+        global_rate: float = None
+    ):
+        self.bot_rate = bot_rate or settings.SEND_BOT_RATE
+        self.chat_rate = chat_rate or settings.SEND_CHAT_RATE
+        global_rate = global_rate if global_rate is not None else settings.SEND_GLOBAL_RATE
+        self.global_bucket = TokenBucket(global_rate) if global_rate else None
+        
+        self._bots: Dict[int, BotSendQueue] = {}
+        self._ring: Deque[int] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+        self._swept_at = time.monotonic()
+        
+        self.queued = 0
+        self.started = 0
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        
+        metrics.SEND_QUEUE_DEPTH.set_function(lambda: self.queued)
+    
+    async def send(
+        self,
+        bot_id: int,
+        chat_id: int,
+        send: Callable[[], Awaitable],
+        priority: int = PRIORITY_REPLY
+    ):
+        """Queue an API call and wait for its result
+        
+        `send` runs in the scheduler's own task, so it must not rely on
+        aiogram's context-bound current bot (use telegram_bot.send_message,
+        not message.answer). Bulk sends such as broadcasts should pass
+        PRIORITY_BROADCAST so they never delay replies.
+        """
+        if self._task is None:
+            self.start()
+        
+        job = SendJob(
+            bot_id=bot_id,
+            chat_id=chat_id,
+            priority=priority,
+            send=send,
+            future=asyncio.get_running_loop().create_future()
+        )
+        self._enqueue(job)
+        return await job.future
+    
+    def start(self):
+        """Start the dispatch loop"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch_loop())
+    
+    async def stop(self):
+        """Stop dispatching and fail queued sends"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for bot_id in list(self._bots):
+            self.forget(bot_id)
+    
+    def forget(self, bot_id: int):
+        """Cancel a bot's queued sends and drop its rate limit state"""
+        queue = self._bots.pop(bot_id, None)
+        if queue is None:
+            return
+        for lane in queue.lanes.values():
+            for job in lane:
+                if not job.future.done():
+                    job.future.cancel()
+        self.queued -= len(queue)
+        if bot_id in self._ring:
+            self._ring.remove(bot_id)
+    
+    def get_stats(self) -> dict:
+        """Queue depth, throughput and wait time"""
+        return {
+            "queued": self.queued,
+            "bots_waiting": len(self._ring),
+            "bots_tracked": len(self._bots),
+            "sent": self.sent,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "avg_wait_seconds": round(self.wait_time_total / self.started, 4) if self.started else 0.0,
+            "max_wait_seconds": round(self.wait_time_max, 4)
+        }
+    
+    def _enqueue(self, job: SendJob, front: bool = False):
+        """Add a job to its bot's lane"""
+        queue = self._bots.get(job.bot_id)
+        if queue is None:
+            queue = self._bots[job.bot_id] = BotSendQueue(self.bot_rate)
+        if not len(queue):
+            self._ring.append(job.bot_id)
+        
+        lane = queue.lanes[job.priority]
+        if front:
+            lane.appendleft(job)
+        else:
+            lane.append(job)
+        self.queued += 1
+        self._wakeup.set()
+    
+    def _pick(self, queue: BotSendQueue, now: float):
+        """Next job a bot may send now, or the delay until one is ready"""
+        wait = queue.bucket.delay(now)
+        if wait:
+            return None, wait
+        
+        for priority in PRIORITIES:
+            lane = queue.lanes[priority]
+            for index in range(min(len(lane), LANE_SCAN_DEPTH)):
+                job = lane[index]
+                chat_wait = queue.chat_bucket(job.chat_id, self.chat_rate).delay(now)
+                if not chat_wait:
+                    del lane[index]
+                    return job, 0.0
+                wait = chat_wait if not wait else min(wait, chat_wait)
+        return None, wait
+    
+    def _sweep(self, now: float):
+        """Forget bots that have been idle long enough for their limits to recover"""
+        self._swept_at = now
+        for bot_id in [b for b, queue in self._bots.items() if queue.is_idle(now)]:
+            del self._bots[bot_id]
+    
+    async def _dispatch_loop(self):
+        """Serve bots round-robin, one send per bot per pass"""
+        while True:
+            now = time.monotonic()
+            next_wake = None
+            
+            for _ in range(len(self._ring)):
+                if self.global_bucket:
+                    global_wait = self.global_bucket.delay(now)
+                    if global_wait:
+                        next_wake = global_wait
+                        break
+                
+                bot_id = self._ring[0]
+                self._ring.rotate(-1)
+                queue = self._bots[bot_id]
+                job, wait = self._pick(queue, now)
+                
+                if job is None:
+                    next_wake = wait if next_wake is None else min(next_wake, wait)
+                    continue
+                
+                self._start(queue, job, now)
+                if not len(queue):
+                    self._ring.remove(bot_id)
+                    queue.prune(now)
+                next_wake = 0
+            
+            if now - self._swept_at >= IDLE_SWEEP_INTERVAL:
+                self._sweep(now)
+            if next_wake is None and self._bots:
+                # Nothing to send; wake up later to forget the idle bots
+                next_wake = IDLE_SWEEP_INTERVAL
+            
+            self._wakeup.clear()
+            if next_wake == 0:
+                # Yield so started sends and new enqueues get a turn
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_wake)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _start(self, queue: BotSendQueue, job: SendJob, now: float):
+        """Consume rate tokens and run the send in the background"""
+        queue.bucket.consume(now)
+        queue.chat_bucket(job.chat_id, self.chat_rate).consume(now)
+        if self.global_bucket:
+            self.global_bucket.consume(now)
+        self.queued -= 1
+        self.started += 1
+        queue.inflight += 1
+        
+        wait = now - job.enqueued_at
+        self.wait_time_total += wait
+        self.wait_time_max = max(self.wait_time_max, wait)
+        
+        task = asyncio.create_task(self._run(queue, job))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+    
+    async def _run(self, queue: BotSendQueue, job: SendJob):
+        """Execute a send and resolve its future"""
+        from aiogram.utils.exceptions import RetryAfter
+        
+        if job.future.done():
+            queue.inflight -= 1
+            return
+        try:
+            result = await job.send()
+        except RetryAfter as e:
+            # Telegram asked us to back off; hold the whole bot and retry
+            self.rate_limited += 1
+            metrics.TELEGRAM_API_RATE_LIMITED.labels(job.bot_id).inc()
+            logger.warning(f"Bot {job.bot_id} rate limited for {e.timeout}s", extra={"bot_id": job.bot_id})
+            queue.bucket.pause(e.timeout, time.monotonic())
+            if self._bots.get(job.bot_id) is queue:
+                self._enqueue(job, front=True)
+            elif not job.future.done():
+                # The bot was stopped while this send was in flight
+                job.future.cancel()
+            return
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        finally:
+            queue.inflight -= 1
+        
+        self.sent += 1
+        metrics.BOT_REPLIES_SENT.labels(job.bot_id).inc()
+        if not job.future.done():
+            job.future.set_result(result)
+
+# Global send scheduler instance
+send_scheduler = SendScheduler()
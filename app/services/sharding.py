@@ -0,0 +1,475 @@
+"""
+Sharded Bot Runtime
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.services.bot_registry import bot_registry
+from app.services.log_stream import log_hub
+
+logger = logging.getLogger(__name__)
+
+def shard_for(bot_id: int, shards: int) -> int:
+    """Stable shard index for a bot"""
+    return zlib.crc32(str(bot_id).encode()) % shards
+
+class PipeWriter:
+    """Sends messages over a pipe from a background thread
+    
+    Connection.send blocks once the pipe buffer is full until the other end
+    reads. On the event loop that would stall every bot and request, and
+    deadlock when both ends write large messages to each other at once.
+    """
+    
+    def __init__(self, conn, name: str, on_error: Callable[[], None]):
+        self.conn = conn
+        self._on_error = on_error
+        self._loop = asyncio.get_running_loop()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def send(self, message: dict):
+        """Queue a message without blocking"""
+        self._queue.put(message)
+    
+    def close(self, timeout: float = 5):
+        """Flush queued messages and stop the thread (blocking)"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                # The other end went away or the pipe was closed
+                try:
+                    self._loop.call_soon_threadsafe(self._on_error)
+                except RuntimeError:
+                    pass  # Event loop already closed
+                return
+            except Exception as e:
+                logger.error(f"Failed to send {message.get('op') or message.get('event')} over pipe: {e}")
+
+def _shard_main(shard_id: int, conn):
+    """Entry point of a shard worker process"""
+    from app.core.logging import setup_logging
+    
+    setup_logging(f"shard{shard_id}")
+    try:
+        asyncio.run(_serve(shard_id, conn))
+    except KeyboardInterrupt:
+        pass
+
+async def _serve(shard_id: int, conn):
+    """Run a local BotManager and execute commands sent by the admin process"""
+    from app.db.models import SessionLocal
+    from app.services.bot_manager import BotManager
+    
+    manager = BotManager()
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    tasks = set()
+    writer = PipeWriter(conn, f"shard{shard_id}-writer", on_error=stopped.set)
+    
+    def on_bots_changed(bot_ids: Optional[List[int]]):
+        # Keep the admin process registry in sync with status changes made here
+        writer.send({"event": "bots_changed", "bot_ids": bot_ids})
+    
+    bot_registry.listeners.append(on_bots_changed)
+    
+    def on_log_entries(entries: List[dict]):
+        # Bot log lines are tailed from the admin process
+        writer.send({"event": "logs", "entries": entries})
+    
+    log_hub.listeners.append(on_log_entries)
+    log_hub.start()
+    
+    async def handle(request: dict):
+        op = request["op"]
+        bot_id = request.get("bot_id")
+        result = None
+        error = None
+        try:
+            async with SessionLocal() as db:
+                if op == "start":
+                    result = await manager.start_bot(db, bot_id)
+                elif op == "stop":
+                    result = await manager.stop_bot(db, bot_id)
+                elif op == "restart":
+                    result = await manager.restart_bot(db, bot_id)
+                elif op == "start_many":
+                    result = await manager.start_bots(db, request["bot_ids"], request.get("concurrency"))
+                elif op == "stop_many":
+                    result = await manager.stop_bots(db, request["bot_ids"], request.get("concurrency"))
+                elif op == "restart_many":
+                    result = await manager.restart_bots(db, request["bot_ids"], request.get("concurrency"))
+                elif op == "update":
+                    result = await manager.process_webhook_update(bot_id, request["data"])
+                elif op == "supervisor_stats":
+                    result = await manager.get_supervisor_stats()
+                elif op == "health":
+                    result = await manager.get_bot_health(bot_id)
+                elif op == "message_counts":
+                    result = await manager.get_message_counts()
+                elif op == "metrics":
+                    result = metrics.REGISTRY.collect()
+                elif op == "stop_all":
+                    result = await manager.stop_all_bots(db)
+                elif op == "shutdown":
+                    await manager.shutdown()
+                elif op != "ping":
+                    error = f"Unknown operation: {op}"
+        except Exception as e:
+            logger.error(f"Shard {shard_id} failed to run {op}: {e}")
+            error = str(e)
+        
+        writer.send({
+            "id": request["id"],
+            "result": result,
+            "error": error,
+            "active": manager.get_active_bots_count()
+        })
+        if op == "shutdown":
+            # Only once the reply is queued ahead of closing the writer
+            stopped.set()
+    
+    def on_readable():
+        try:
+            while conn.poll():
+                task = asyncio.create_task(handle(conn.recv()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (EOFError, OSError):
+            # Admin process went away
+            stopped.set()
+    
+    loop.add_reader(conn.fileno(), on_readable)
+    logger.info(f"Bot shard {shard_id} ready")
+    await stopped.wait()
+    loop.remove_reader(conn.fileno())
+    await manager.shutdown()
+    # Deliver the last responses before the process exits
+    await loop.run_in_executor(None, writer.close)
+    logger.info(f"Bot shard {shard_id} stopped")
+
+class ShardClient:
+    """Admin-side handle to one shard worker process"""
+    
+    def __init__(self, shard_id: int, shards: int):
+        self.shard_id = shard_id
+        self.shards = shards
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+        self.writer: Optional[PipeWriter] = None
+        self.active = 0
+        self._closing = False
+        self._recovery: Optional[asyncio.Task] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+    
+    @property
+    def alive(self) -> bool:
+        """Whether the worker process is running"""
+        return self.process is not None and self.process.is_alive()
+    
+    def start(self):
+        """Spawn the worker process"""
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_shard_main,
+            args=(self.shard_id, child_conn),
+            name=f"bot-shard-{self.shard_id}",
+            daemon=True
+        )
+        self._closing = False
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        
+        def on_write_error():
+            # Ignore the writer of a pipe that was already replaced
+            if self.conn is parent_conn:
+                self._on_disconnect()
+        
+        self.writer = PipeWriter(parent_conn, f"shard{self.shard_id}-client-writer", on_error=on_write_error)
+        asyncio.get_running_loop().add_reader(self.conn.fileno(), self._on_readable)
+        logger.info(f"Started bot shard {self.shard_id} (pid {self.process.pid})")
+    
+    async def call(self, op: str, **params):
+        """Send a command to the shard and wait for its result"""
+        if self.conn is None or not self.alive:
+            self.start()
+        
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self.writer.send({"id": request_id, "op": op, **params})
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+    
+    def _on_readable(self):
+        """Resolve pending calls with responses from the worker"""
+        try:
+            while self.conn.poll():
+                response = self.conn.recv()
+                if response.get("event") == "bots_changed":
+                    bot_registry.notify(response["bot_ids"])
+                    continue
+                if response.get("event") == "logs":
+                    log_hub.publish(response["entries"])
+                    continue
+                self.active = response["active"]
+                future = self._pending.get(response["id"])
+                if future is None or future.done():
+                    continue
+                if response["error"]:
+                    future.set_exception(RuntimeError(response["error"]))
+                else:
+                    future.set_result(response["result"])
+        except (EOFError, OSError):
+            self._on_disconnect()
+    
+    def _on_disconnect(self):
+        """Release the pipe and fail outstanding calls when the worker dies"""
+        if self.conn is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.conn.fileno())
+        self.writer.close(timeout=0)
+        self.conn.close()
+        self.conn = None
+        self.active = 0
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"Shard {self.shard_id} disconnected"))
+        
+        if not self._closing:
+            logger.error(f"Bot shard {self.shard_id} disconnected")
+            if self.process.is_alive():
+                self.process.terminate()
+            if self._recovery is None or self._recovery.done():
+                self._recovery = asyncio.create_task(self._recover(self.process))
+    
+    async def _recover(self, process: multiprocessing.Process):
+        """Respawn a crashed worker and start the bots that died with it
+        
+        Their rows still say running. Bots that cannot be started on the
+        new worker are marked as errored instead.
+        """
+        from app.db.models import Bot, SessionLocal
+        
+        await asyncio.get_running_loop().run_in_executor(None, process.join, 5)
+        
+        async with SessionLocal() as db:
+            active = await db.scalars(select(Bot.id).where(Bot.is_active.is_(True)))
+            bot_ids = [bot_id for bot_id in active if shard_for(bot_id, self.shards) == self.shard_id]
+            if not bot_ids:
+                return
+            
+            logger.info(f"Restarting {len(bot_ids)} bots of shard {self.shard_id}")
+            try:
+                results = await self.call("start_many", bot_ids=bot_ids)
+            except Exception as e:
+                logger.error(f"Failed to restore bots of shard {self.shard_id}: {e}")
+                results = {}
+            
+            failed = [bot_id for bot_id in bot_ids if not results.get(bot_id)]
+            if failed:
+                await db.execute(
+                    update(Bot)
+                    .where(Bot.id.in_(failed), Bot.is_active.is_(True))
+                    .values(is_active=False, status="error", started_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+    
+    async def close(self):
+        """Shut the worker down gracefully"""
+        if self._recovery is not None:
+            self._recovery.cancel()
+            await asyncio.gather(self._recovery, return_exceptions=True)
+        if not self.alive:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self.call("shutdown"), timeout=30)
+        except Exception as e:
+            logger.warning(f"Shard {self.shard_id} did not shut down cleanly: {e}")
+        self._on_disconnect()
+        await asyncio.get_running_loop().run_in_executor(None, self.process.join, 5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+class ShardedBotManager:
+    """Routes bot lifecycle commands to worker processes by bot id
+    
+    Each shard process runs its own BotManager and event loop, so a busy
+    bot only competes with the bots on its shard and never with the admin
+    API. Shards are spawned on first use and persist bot status themselves.
+    """
+    
+    def __init__(self, shards: int):
+        self.shards: List[ShardClient] = [ShardClient(i, shards) for i in range(shards)]
+    
+    def _shard(self, bot_id: int) -> ShardClient:
+        """Shard that owns a bot"""
+        return self.shards[shard_for(bot_id, len(self.shards))]
+    
+    async def _call(self, bot_id: int, op: str, **params):
+        """Run a command on the owning shard, treating failures as a False result"""
+        try:
+            return await self._shard(bot_id).call(op, bot_id=bot_id, **params)
+        except Exception as e:
+            logger.error(f"Shard call {op} for bot {bot_id} failed: {e}")
+            return False
+    
+    async def start_bot(self, db: AsyncSession, bot_id: int) -> bool:
+        """Start a bot on its shard"""
+        return await self._call(bot_id, "start")
+    
+    async def stop_bot(self, db: AsyncSession, bot_id: int) -> bool:
+        """Stop a bot on its shard"""
+        return await self._call(bot_id, "stop")
+    
+    async def restart_bot(self, db: AsyncSession, bot_id: int) -> bool:
+        """Restart a bot on its shard"""
+        return await self._call(bot_id, "restart")
+    
+    async def _call_many(self, op: str, bot_ids: List[int], concurrency: Optional[int]) -> Dict[int, bool]:
+        """Split a bulk command by shard and run the parts in parallel"""
+        groups: Dict[int, List[int]] = {}
+        for bot_id in bot_ids:
+            groups.setdefault(shard_for(bot_id, len(self.shards)), []).append(bot_id)
+        
+        async def call(shard: ShardClient, ids: List[int]) -> Dict[int, bool]:
+            try:
+                return await shard.call(op, bot_ids=ids, concurrency=concurrency)
+            except Exception as e:
+                logger.error(f"Shard call {op} on shard {shard.shard_id} failed: {e}")
+                return {bot_id: False for bot_id in ids}
+        
+        results = {}
+        for part in await asyncio.gather(*[
+            call(self.shards[index], ids) for index, ids in groups.items()
+        ]):
+            results.update(part)
+        return results
+    
+    async def start_bots(
+        self,
+        db: AsyncSession,
+        bot_ids: List[int],
+        concurrency: Optional[int] = None
+    ) -> Dict[int, bool]:
+        """Start many bots, each shard in parallel"""
+        return await self._call_many("start_many", bot_ids, concurrency)
+    
+    async def stop_bots(
+        self,
+        db: AsyncSession,
+        bot_ids: List[int],
+        concurrency: Optional[int] = None
+    ) -> Dict[int, bool]:
+        """Stop many bots, each shard in parallel"""
+        return await self._call_many("stop_many", bot_ids, concurrency)
+    
+    async def restart_bots(
+        self,
+        db: AsyncSession,
+        bot_ids: List[int],
+        concurrency: Optional[int] = None
+    ) -> Dict[int, bool]:
+        """Restart many bots, each shard in parallel"""
+        return await self._call_many("restart_many", bot_ids, concurrency)
+    
+    async def start_all_bots(self, db: AsyncSession, concurrency: Optional[int] = None) -> Dict[int, bool]:
+        """Start every bot that is not running"""
+        from app.db.models import Bot
+        
+        bot_ids = (await db.scalars(select(Bot.id).where(Bot.is_active.is_(False)))).all()
+        return await self.start_bots(db, list(bot_ids), concurrency)
+    
+    async def process_webhook_update(self, bot_id: int, data: dict) -> bool:
+        """Forward a webhook update to the shard running the bot"""
+        return await self._call(bot_id, "update", data=data)
+    
+    async def get_supervisor_stats(self) -> dict:
+        """Restart counters summed over live shards"""
+        parts = await asyncio.gather(*[
+            shard.call("supervisor_stats") for shard in self.shards if shard.alive
+        ], return_exceptions=True)
+        totals = {"watched": 0, "recovering": 0, "restarts": 0, "scheduler_restarts": 0}
+        for part in parts:
+            if isinstance(part, dict):
+                for key in totals:
+                    totals[key] += part[key]
+        return totals
+    
+    async def get_bot_health(self, bot_id: int) -> Optional[dict]:
+        """Restart count and last error of a bot, from its shard"""
+        shard = self._shard(bot_id)
+        if not shard.alive:
+            return None
+        try:
+            return await shard.call("health", bot_id=bot_id)
+        except Exception as e:
+            logger.error(f"Shard call health for bot {bot_id} failed: {e}")
+            return None
+    
+    async def get_message_counts(self) -> Dict[int, List[float]]:
+        """Updates received and replies sent per bot, from every live shard"""
+        parts = await asyncio.gather(*[
+            shard.call("message_counts") for shard in self.shards if shard.alive
+        ], return_exceptions=True)
+        counts = {}
+        for part in parts:
+            if isinstance(part, dict):
+                counts.update(part)
+        return counts
+    
+    async def collect_metrics(self) -> List[dict]:
+        """Metric families of every live shard, labelled with the shard id"""
+        live = [shard for shard in self.shards if shard.alive]
+        parts = await asyncio.gather(*[shard.call("metrics") for shard in live], return_exceptions=True)
+        families = []
+        for shard, part in zip(live, parts):
+            if isinstance(part, list):
+                families.extend(metrics.with_labels(part, shard=str(shard.shard_id)))
+        return families
+    
+    def get_active_bots_count(self) -> int:
+        """Get count of active bots across all shards"""
+        return sum(shard.active for shard in self.shards)
+    
+    async def stop_all_bots(self, db: AsyncSession, concurrency: Optional[int] = None) -> Dict[int, bool]:
+        """Stop all running bots on every live shard"""
+        parts = await asyncio.gather(*[
+            shard.call("stop_all") for shard in self.shards if shard.alive
+        ], return_exceptions=True)
+        results = {}
+        for part in parts:
+            if isinstance(part, dict):
+                results.update(part)
+        logger.info("All bots stopped")
+        return results
+    
+    async def shutdown(self):
+        """Shut down all shard processes"""
+        await asyncio.gather(*[shard.close() for shard in self.shards])
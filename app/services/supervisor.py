@@ -0,0 +1,237 @@
+"""
+Bot Supervisor
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.db.models import Bot, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BotHealth:
+    """Supervision state of a single bot"""
+    bot_id: int
+    state: str = "ok"  # ok, restarting, backoff
+    restarts: int = 0
+    failures: int = 0  # Consecutive failures since the bot was last healthy
+    last_error: Optional[str] = None
+    last_error_at: Optional[datetime] = None
+    last_restart_at: Optional[datetime] = None
+    next_attempt_at: Optional[float] = None
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary"""
+        return {
+            "bot_id": self.bot_id,
+            "state": self.state,
+            "restarts": self.restarts,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at.isoformat() if self.last_error_at else None,
+            "last_restart_at": self.last_restart_at.isoformat() if self.last_restart_at else None,
+            "next_attempt_in": (
+                round(max(0.0, self.next_attempt_at - time.monotonic()), 1)
+                if self.next_attempt_at else None
+            )
+        }
+
+class BotSupervisor:
+    """Detects crashed or stalled bots and restarts them with backoff
+    
+    Every SUPERVISOR_INTERVAL seconds each running bot is checked. In
+    polling mode a bot needs a restart when it dropped out of the polling
+    scheduler, failed SUPERVISOR_MAX_ERRORS polls in a row, or has not
+    polled successfully for SUPERVISOR_STALL_TIMEOUT seconds. Restarts are
+    delayed by exponential backoff with jitter, and a bot whose restart
+    fails stays supervised and is retried until an admin stops it. Status
+    changes are written with the supervisor's own database session.
+    """
+    
+    def __init__(
+        self,
+        manager,
+        interval: float = None,
+        stall_timeout: float = None,
+        max_errors: int = None,
+        backoff_base: float = None,
+        backoff_max: float = None
+    ):
+        self.manager = manager
+        self.interval = interval or settings.SUPERVISOR_INTERVAL
+        self.stall_timeout = stall_timeout or settings.SUPERVISOR_STALL_TIMEOUT
+        self.max_errors = max_errors or settings.SUPERVISOR_MAX_ERRORS
+        self.backoff_base = backoff_base or settings.SUPERVISOR_BACKOFF_BASE
+        self.backoff_max = backoff_max or settings.SUPERVISOR_BACKOFF_MAX
+        
+        self._health: Dict[int, BotHealth] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._restarts: Set[asyncio.Task] = set()
+        self.restarts_total = 0
+        self.scheduler_restarts = 0
+        self.last_check_at: Optional[datetime] = None
+    
+    def watch(self, bot_id: int):
+        """Supervise a bot that was just started"""
+        if self._task is None:
+            self.start()
+        health = self._health.get(bot_id)
+        if health is None:
+            self._health[bot_id] = BotHealth(bot_id=bot_id)
+        elif health.state != "restarting":
+            health.state = "ok"
+            health.next_attempt_at = None
+    
+    def forget(self, bot_id: int):
+        """Stop supervising a bot that was stopped on purpose"""
+        self._health.pop(bot_id, None)
+    
+    def is_recovering(self, bot_id: int) -> bool:
+        """Whether a bot is down and waiting to be restarted"""
+        health = self._health.get(bot_id)
+        return bool(health and health.state != "ok")
+    
+    def recovering(self) -> List[int]:
+        """Ids of bots that are down and waiting to be restarted"""
+        return [bot_id for bot_id, health in self._health.items() if health.state != "ok"]
+    
+    def get_bot_health(self, bot_id: int) -> Optional[dict]:
+        """Restart count and last error of a bot"""
+        health = self._health.get(bot_id)
+        return health.to_dict() if health else None
+    
+    def get_stats(self) -> dict:
+        """Supervision summary"""
+        return {
+            "watched": len(self._health),
+            "recovering": len(self.recovering()),
+            "restarts": self.restarts_total,
+            "scheduler_restarts": self.scheduler_restarts,
+            "last_check_at": self.last_check_at.isoformat() if self.last_check_at else None
+        }
+    
+    def start(self):
+        """Start the health check loop"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._check_loop())
+    
+    async def stop(self):
+        """Stop checking and cancel pending restarts"""
+        tasks = list(self._restarts)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._health.clear()
+    
+    def _backoff(self, failures: int) -> float:
+        """Exponential backoff with jitter for the nth consecutive failure"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** max(0, failures - 1))
+        # Equal jitter spreads out restarts of bots that failed together
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def _record_failure(self, health: BotHealth, reason: str):
+        """Note a failure and schedule the next restart attempt"""
+        health.failures += 1
+        health.last_error = reason
+        health.last_error_at = datetime.utcnow()
+        health.state = "backoff"
+        health.next_attempt_at = time.monotonic() + self._backoff(health.failures)
+    
+    async def _check_loop(self):
+        """Run health checks at a fixed interval"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Supervisor check failed: {e}")
+    
+    async def check(self):
+        """Check every supervised bot once"""
+        self.last_check_at = datetime.utcnow()
+        polling = self.manager.polling
+        
+        if polling.crashed:
+            self.scheduler_restarts += 1
+            logger.error("Polling scheduler task died, restarting it")
+            await polling.restart()
+        
+        now = time.monotonic()
+        for bot_id, health in list(self._health.items()):
+            if health.state == "restarting":
+                continue
+            
+            if health.state == "backoff":
+                if now >= health.next_attempt_at:
+                    self._spawn_restart(health)
+                continue
+            
+            if self.manager.webhook_mode:
+                reason = None if bot_id in self.manager.bot_instances else "bot instance is gone"
+            else:
+                reason = polling.check_bot(bot_id, self.stall_timeout, self.max_errors)
+            
+            if reason:
+                logger.warning(f"Bot {bot_id} needs a restart: {reason}", extra={"bot_id": bot_id})
+                self._record_failure(health, reason)
+            elif health.failures and (self.manager.webhook_mode or polling.is_healthy(bot_id)):
+                # Healthy again since the last restart
+                health.failures = 0
+    
+    def _spawn_restart(self, health: BotHealth):
+        """Restart a bot in the background"""
+        health.state = "restarting"
+        task = asyncio.create_task(self._restart(health))
+        self._restarts.add(task)
+        task.add_done_callback(self._restarts.discard)
+    
+    async def _restart(self, health: BotHealth):
+        """Relaunch a bot and store the outcome"""
+        bot_id = health.bot_id
+        health.restarts += 1
+        health.last_restart_at = datetime.utcnow()
+        self.restarts_total += 1
+        
+        try:
+            async with SessionLocal() as db:
+                bot = await db.get(Bot, bot_id)
+                if bot is None or not bot.is_active:
+                    # Deleted or stopped in the meantime
+                    self.forget(bot_id)
+                    return
+                
+                try:
+                    await self.manager._halt(bot_id)
+                    await self.manager._launch(bot)
+                except Exception as e:
+                    logger.error(f"Restart of bot {bot_id} failed: {e}", extra={"bot_id": bot_id})
+                    self._record_failure(health, str(e))
+                    # Keep is_active so the bot is restored after a reboot too
+                    bot.status = "error"
+                    await db.commit()
+                    return
+                
+                if self._health.get(bot_id) is not health:
+                    # Stopped while the restart was in flight
+                    self.forget(bot_id)
+                    await self.manager._halt(bot_id)
+                    return
+                
+                self.manager._mark_running(bot)
+                await db.commit()
+                health.state = "ok"
+                health.next_attempt_at = None
+                logger.info(f"Bot {bot_id} restarted (restart #{health.restarts})", extra={"bot_id": bot_id})
+        except Exception as e:
+            logger.error(f"Supervisor could not restart bot {bot_id}: {e}", extra={"bot_id": bot_id})
+            self._record_failure(health, str(e))
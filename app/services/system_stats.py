@@ -0,0 +1,357 @@
+"""
+System Stats Sampler
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.db.models import SessionLocal, SystemStats
+from app.db.queries import naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Persisted resolutions and their period length in seconds
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+# Per-bot counter snapshots kept for message rates, one per minute
+RATE_SNAPSHOTS = 16
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+def read_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / 1048576
+    except OSError:
+        # Not Linux; fall back to the peak RSS
+        import resource
+        import sys
+        
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1048576 if sys.platform == "darwin" else peak / 1024
+
+def _counter_delta(value: float, old: float) -> float:
+    """Increase of a counter; counters restart from zero with their process or bot"""
+    return value - old if value >= old else value
+
+@dataclass
+class Sample:
+    """One sampler tick"""
+    timestamp: float
+    cpu_percent: float
+    rss_mb: float
+    loop_lag_ms: float
+    active_bots: int
+    total_bots: int
+    messages_received: int  # Since the previous tick
+    messages_sent: int
+    
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["recorded_at"] = datetime.utcfromtimestamp(self.timestamp).isoformat()
+        return data
+
+class Rollup:
+    """Running aggregate of the samples in one period"""
+    
+    def __init__(self, resolution: str, start: float):
+        self.resolution = resolution
+        self.start = start
+        self.samples = 0
+        self.cpu_sum = 0.0
+        self.cpu_max = 0.0
+        self.rss_sum = 0.0
+        self.rss_max = 0.0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.active_max = 0
+        self.total_bots = 0
+        self.messages_received = 0
+        self.messages_sent = 0
+    
+    def add(self, sample: Sample):
+        """Fold a sample into the aggregate"""
+        self.samples += 1
+        self.cpu_sum += sample.cpu_percent
+        self.cpu_max = max(self.cpu_max, sample.cpu_percent)
+        self.rss_sum += sample.rss_mb
+        self.rss_max = max(self.rss_max, sample.rss_mb)
+        self.lag_sum += sample.loop_lag_ms
+        self.lag_max = max(self.lag_max, sample.loop_lag_ms)
+        self.active_max = max(self.active_max, sample.active_bots)
+        self.total_bots = sample.total_bots
+        self.messages_received += sample.messages_received
+        self.messages_sent += sample.messages_sent
+    
+    def merge_into(self, row: SystemStats):
+        """Combine with a row already stored for the same period, e.g. before a restart"""
+        before = row.samples or 0
+        total = before + self.samples
+        
+        def average(stored, added_sum):
+            return ((stored or 0) * before + added_sum) / total
+        
+        row.cpu_usage = round(average(row.cpu_usage, self.cpu_sum))
+        row.memory_usage = round(average(row.memory_usage, self.rss_sum))
+        row.loop_lag_ms = round(average(row.loop_lag_ms, self.lag_sum), 3)
+        row.cpu_max = max(row.cpu_max or 0, round(self.cpu_max))
+        row.memory_max = max(row.memory_max or 0, round(self.rss_max))
+        row.loop_lag_max_ms = max(row.loop_lag_max_ms or 0.0, round(self.lag_max, 3))
+        row.active_bots = max(row.active_bots or 0, self.active_max)
+        row.total_bots = self.total_bots
+        row.messages_received = (row.messages_received or 0) + self.messages_received
+        row.messages_sent = (row.messages_sent or 0) + self.messages_sent
+        row.samples = total
+    
+    def to_dict(self) -> dict:
+        """Same shape as SystemStats.to_dict, for the period still in progress"""
+        row = SystemStats(samples=0)
+        self.merge_into(row)
+        data = row.to_dict()
+        data.update(recorded_at=datetime.utcfromtimestamp(self.start).isoformat(), resolution=self.resolution)
+        return data
+
+class SystemStatsSampler:
+    """Samples process and bot load into a ring buffer and stored rollups
+    
+    Every STATS_SAMPLE_INTERVAL seconds one Sample is appended to an
+    in-memory ring of STATS_BUFFER_SIZE entries, which serves recent
+    high-resolution charts. Samples are also folded into running 1m, 1h and
+    1d aggregates; each is written to system_stats once its period ends, so
+    the table grows by about 1,500 rows a day rather than one per tick.
+    Minute and hour rows are pruned after their retention period.
+    """
+    
+    def __init__(
+        self,
+        interval: float = None,
+        buffer_size: int = None,
+        retention_1m_days: int = None,
+        retention_1h_days: int = None
+    ):
+        self.interval = interval or settings.STATS_SAMPLE_INTERVAL
+        self.buffer: Deque[Sample] = deque(maxlen=buffer_size or settings.STATS_BUFFER_SIZE)
+        self.retention = {
+            "1m": retention_1m_days if retention_1m_days is not None else settings.STATS_RETENTION_1M_DAYS,
+            "1h": retention_1h_days if retention_1h_days is not None else settings.STATS_RETENTION_1H_DAYS
+        }
+        
+        self._task: Optional[asyncio.Task] = None
+        self._rollups: Dict[str, Rollup] = {}
+        self._last_cpu: Optional[Tuple[float, float]] = None
+        self._last_counts: Dict[int, List[float]] = {}
+        self._last_counts_at = 0.0
+        self._snapshots: Deque[Tuple[float, Dict[int, List[float]]]] = deque(maxlen=RATE_SNAPSHOTS)
+        self.rows_written = 0
+        self.last_error: Optional[str] = None
+    
+    def start(self):
+        """Start sampling"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run_loop())
+    
+    async def stop(self):
+        """Stop sampling and store the periods still in progress"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        rollups, self._rollups = list(self._rollups.values()), {}
+        await self._write(rollups)
+    
+    def get_stats(self) -> dict:
+        """Sampler state and the latest sample"""
+        return {
+            "interval": self.interval,
+            "buffered": len(self.buffer),
+            "rows_written": self.rows_written,
+            "last_error": self.last_error,
+            "latest": self.buffer[-1].to_dict() if self.buffer else None
+        }
+    
+    async def history(self, resolution: str, since: datetime, until: datetime, limit: int) -> List[dict]:
+        """Time series of one resolution between two UTC times, oldest first
+        
+        "raw" reads the ring buffer; other resolutions read system_stats and
+        end with the period still in progress.
+        """
+        since, until = naive_utc(since), naive_utc(until)
+        if resolution == "raw":
+            start = since.replace(tzinfo=timezone.utc).timestamp()
+            end = until.replace(tzinfo=timezone.utc).timestamp()
+            points = [sample for sample in self.buffer if start <= sample.timestamp <= end]
+            return [sample.to_dict() for sample in points[-limit:]]
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        
+        async with SessionLocal() as db:
+            rows = (await db.scalars(
+                select(SystemStats)
+                .where(
+                    SystemStats.resolution == resolution,
+                    SystemStats.recorded_at >= since,
+                    SystemStats.recorded_at <= until
+                )
+                .order_by(SystemStats.recorded_at.desc())
+                .limit(limit)
+            )).all()
+            # Rows are only read; merging the current period below must not be written back
+            db.expunge_all()
+        points = [row.to_dict() for row in reversed(rows)]
+        
+        rollup = self._rollups.get(resolution)
+        if rollup and rollup.samples:
+            current_start = datetime.utcfromtimestamp(rollup.start)
+            if rows and rows[0].recorded_at == current_start:
+                # Part of this period was stored before a restart
+                rollup.merge_into(rows[0])
+                points[-1] = rows[0].to_dict()
+            elif since <= current_start <= until:
+                points = points[1:] if len(points) >= limit else points
+                points.append(rollup.to_dict())
+        return points
+    
+    def get_bot_rates(self, limit: int = 10) -> List[dict]:
+        """Busiest bots by messages per minute over the last ~15 minutes"""
+        if not self._snapshots:
+            return []
+        since, old_counts = self._snapshots[0]
+        elapsed = self._last_counts_at - since
+        if elapsed <= 0:
+            return []
+        
+        rates = []
+        for bot_id, (received, sent) in self._last_counts.items():
+            old_received, old_sent = old_counts.get(bot_id, (0.0, 0.0))
+            received_delta = _counter_delta(received, old_received)
+            sent_delta = _counter_delta(sent, old_sent)
+            if received_delta or sent_delta:
+                rates.append({
+                    "bot_id": bot_id,
+                    "received_per_minute": round(received_delta * 60 / elapsed, 2),
+                    "sent_per_minute": round(sent_delta * 60 / elapsed, 2)
+                })
+        rates.sort(key=lambda rate: rate["received_per_minute"] + rate["sent_per_minute"], reverse=True)
+        return rates[:limit]
+    
+    async def _run_loop(self):
+        """Sample on a fixed interval; sleep overshoot is the loop lag"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            try:
+                sample = await self._sample(lag)
+                self.buffer.append(sample)
+                await self._roll(sample)
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"System stats sample failed: {e}")
+    
+    async def _sample(self, loop_lag: float) -> Sample:
+        """Take one reading of process and bot load"""
+        from app.services.bot_manager import bot_manager
+        from app.services.bot_registry import bot_registry
+        
+        now = time.time()
+        cpu_time = time.process_time()
+        cpu_percent = 0.0
+        if self._last_cpu:
+            last_now, last_cpu_time = self._last_cpu
+            cpu_percent = (cpu_time - last_cpu_time) / max(now - last_now, 1e-6) * 100
+        self._last_cpu = (now, cpu_time)
+        
+        counts = await bot_manager.get_message_counts()
+        received_delta = sent_delta = 0
+        if self._last_counts_at:
+            # Summed per bot, so a stopped bot whose counters were dropped
+            # does not hide the traffic of the others
+            for bot_id, (received, sent) in counts.items():
+                old_received, old_sent = self._last_counts.get(bot_id, (0.0, 0.0))
+                received_delta += _counter_delta(received, old_received)
+                sent_delta += _counter_delta(sent, old_sent)
+        self._last_counts = counts
+        self._last_counts_at = now
+        
+        return Sample(
+            timestamp=now,
+            cpu_percent=round(cpu_percent, 1),
+            rss_mb=round(read_rss_mb(), 1),
+            loop_lag_ms=round(loop_lag * 1000, 3),
+            active_bots=bot_manager.get_active_bots_count(),
+            total_bots=await bot_registry.count(),
+            messages_received=int(received_delta),
+            messages_sent=int(sent_delta)
+        )
+    
+    async def _roll(self, sample: Sample):
+        """Add a sample to the running aggregates and store finished periods"""
+        finished = []
+        for resolution, period in RESOLUTIONS.items():
+            start = sample.timestamp - sample.timestamp % period
+            rollup = self._rollups.get(resolution)
+            if rollup is None or rollup.start != start:
+                if rollup is not None:
+                    finished.append(rollup)
+                rollup = self._rollups[resolution] = Rollup(resolution, start)
+            rollup.add(sample)
+        
+        if not finished:
+            return
+        if any(rollup.resolution == "1m" for rollup in finished):
+            self._snapshots.append((self._last_counts_at, self._last_counts))
+        await self._write(finished)
+        if any(rollup.resolution == "1h" for rollup in finished):
+            await self._prune()
+    
+    async def _write(self, rollups: List[Rollup]):
+        """Store finished periods, merging with rows from before a restart"""
+        rollups = [rollup for rollup in rollups if rollup.samples]
+        if not rollups:
+            return
+        async with SessionLocal() as db:
+            for rollup in rollups:
+                recorded_at = datetime.utcfromtimestamp(rollup.start)
+                row = await db.scalar(
+                    select(SystemStats)
+                    .where(SystemStats.resolution == rollup.resolution, SystemStats.recorded_at == recorded_at)
+                    .limit(1)
+                )
+                if row is None:
+                    row = SystemStats(resolution=rollup.resolution, recorded_at=recorded_at, samples=0)
+                    db.add(row)
+                rollup.merge_into(row)
+            await db.commit()
+        self.rows_written += len(rollups)
+    
+    async def _prune(self):
+        """Delete minute and hour rows past their retention"""
+        async with SessionLocal() as db:
+            for resolution, days in self.retention.items():
+                if days > 0:
+                    cutoff = datetime.utcnow() - timedelta(days=days)
+                    await db.execute(
+                        delete(SystemStats)
+                        .where(SystemStats.resolution == resolution, SystemStats.recorded_at < cutoff)
+                    )
+            await db.commit()
+
+# Global system stats sampler instance
+system_stats = SystemStatsSampler()
@@ -0,0 +1,137 @@
+"""
+Warm Start of Previously Running Bots
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.db.models import Bot, SessionLocal
+from app.services.bot_manager import bot_manager
+
+logger = logging.getLogger(__name__)
+
+class WarmStart:
+    """Restores bots whose rows are still marked active after a restart
+    
+    Shutdown leaves is_active set on running bots, so on boot they are
+    started again in the background: WARM_START_BATCH_SIZE bots at a time,
+    paced to WARM_START_RATE bots per second so a large fleet does not hit
+    the Bot API all at once. The API serves requests while this runs.
+    """
+    
+    def __init__(self, rate: float = None, batch_size: int = None):
+        self.rate = rate or settings.WARM_START_RATE
+        self.batch_size = batch_size or settings.WARM_START_BATCH_SIZE
+        
+        self._task: Optional[asyncio.Task] = None
+        self.state = "idle"
+        self.total = 0
+        self.started = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+    
+    def start(self):
+        """Begin restoring bots in the background"""
+        if self._task is not None:
+            return
+        self.state = "pending"
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Cancel an unfinished restore"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    def get_progress(self) -> dict:
+        """Restoration progress"""
+        return {
+            "state": self.state,
+            "total": self.total,
+            "started": self.started,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "remaining": max(0, self.total - self.started - self.failed - self.skipped),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    async def _load_bot_ids(self) -> List[int]:
+        """Ids of bots that were running when the process last stopped"""
+        async with SessionLocal() as db:
+            bot_ids = await db.scalars(
+                select(Bot.id).where(Bot.is_active.is_(True)).order_by(Bot.id)
+            )
+            return list(bot_ids)
+    
+    async def _reset_stale(self):
+        """Mark leftover running rows as stopped when restoring is disabled"""
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Bot)
+                .where(Bot.is_active.is_(True))
+                .values(is_active=False, status="stopped", started_at=None, webhook_url=None)
+            )
+            await db.commit()
+    
+    async def _run(self):
+        """Start bots batch by batch at the configured rate"""
+        self.started_at = datetime.utcnow()
+        try:
+            if not settings.RESTORE_BOTS_ON_STARTUP:
+                await self._reset_stale()
+                self.state = "disabled"
+                return
+            
+            bot_ids = await self._load_bot_ids()
+            self.total = len(bot_ids)
+            self.state = "running"
+            if bot_ids:
+                logger.info(f"Restoring {self.total} bots at {self.rate:g} bots/s")
+            
+            interval = self.batch_size / self.rate
+            for start in range(0, len(bot_ids), self.batch_size):
+                batch_started = time.monotonic()
+                batch = bot_ids[start:start + self.batch_size]
+                
+                async with SessionLocal() as db:
+                    # Skip bots an admin stopped while earlier batches ran
+                    pending = list(await db.scalars(
+                        select(Bot.id).where(Bot.id.in_(batch), Bot.is_active.is_(True))
+                    ))
+                    results = await bot_manager.start_bots(db, pending)
+                self.skipped += len(batch) - len(pending)
+                self.started += sum(results.values())
+                self.failed += len(results) - sum(results.values())
+                
+                logger.info(
+                    f"Warm start: {self.started + self.failed + self.skipped}/{self.total} bots "
+                    f"({self.failed} failed)"
+                )
+                
+                # Pace batches instead of bursting every bot at once
+                if start + self.batch_size < len(bot_ids):
+                    await asyncio.sleep(max(0.0, interval - (time.monotonic() - batch_started)))
+            
+            self.state = "done"
+            if bot_ids:
+                logger.info(f"Warm start finished: {self.started} started, {self.failed} failed")
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            logger.error(f"Warm start failed: {e}")
+        finally:
+            self.finished_at = datetime.utcnow()
+
+# Global warm start instance
+warm_start = WarmStart()
@@ -0,0 +1,117 @@
+/*
+ * Live Dashboard
+ *
+ * Applies the deltas pushed by /api/dashboard/stream to the rendered page
+ * and runs start/stop/restart in the background, so the page never has to
+ * be reloaded to show a change.
+ */
+(function () {
+    "use strict";
+
+    const ACTIVITY_ROWS = 10;
+
+    function cardFor(botId) {
+        return document.querySelector(`.bot-card[data-bot-id="${botId}"]`);
+    }
+
+    function setText(root, selector, value) {
+        const element = root.querySelector(selector);
+        if (element && element.textContent !== String(value)) {
+            element.textContent = value;
+        }
+    }
+
+    function applyBot(event) {
+        const card = cardFor(event.id);
+        if (!card) {
+            return;
+        }
+        setText(card, '[data-field="name"]', event.name);
+        const badge = card.querySelector('[data-field="status"]');
+        badge.className = `status-badge status-${event.status}`;
+        badge.textContent = event.status;
+        card.querySelector('[data-when="active"]').hidden = !event.is_active;
+        card.querySelector('[data-when="inactive"]').hidden = event.is_active;
+    }
+
+    function applyRemoved(event) {
+        const card = cardFor(event.id);
+        if (card) {
+            card.classList.add("removed");
+            card.querySelectorAll(".action-group").forEach((group) => { group.hidden = true; });
+        }
+    }
+
+    function applySummary(event) {
+        for (const name of ["total", "active", "error"]) {
+            setText(document, `[data-stat="${name}"]`, event[name]);
+        }
+    }
+
+    function applyCounters(event) {
+        for (const [botId, counts] of Object.entries(event.bots)) {
+            const card = cardFor(botId);
+            if (card) {
+                setText(card, '[data-field="received"]', counts[0]);
+                setText(card, '[data-field="sent"]', counts[1]);
+            }
+        }
+    }
+
+    function applyActivity(event) {
+        const body = document.getElementById("recent-activity");
+        for (const entry of event.entries) {
+            const row = body.insertRow(0);
+            for (const value of [entry.created_at.slice(0, 19), entry.username, entry.action, entry.details]) {
+                row.insertCell().textContent = value ?? "";
+            }
+        }
+        while (body.rows.length > ACTIVITY_ROWS) {
+            body.deleteRow(-1);
+        }
+    }
+
+    const handlers = {
+        bot: applyBot,
+        bot_removed: applyRemoved,
+        summary: applySummary,
+        counters: applyCounters,
+        activity: applyActivity
+    };
+
+    function connect() {
+        const ids = Array.from(document.querySelectorAll(".bot-card[data-bot-id]"), (card) => card.dataset.botId);
+        const query = ids.length ? `?bots=${ids.join(",")}` : "";
+        const source = new EventSource(`/api/dashboard/stream${query}`);
+        // Each message is a batch of deltas, at most one per push interval
+        source.addEventListener("update", (message) => {
+            for (const event of JSON.parse(message.data)) {
+                const handler = handlers[event.type];
+                if (handler) {
+                    handler(event);
+                }
+            }
+        });
+    }
+
+    // Run bot actions without following the redirect back to a full page render
+    document.addEventListener("click", async (click) => {
+        const link = click.target.closest("a[data-live-action]");
+        if (!link) {
+            return;
+        }
+        click.preventDefault();
+        link.classList.add("disabled");
+        try {
+            await fetch(link.href, { credentials: "same-origin", redirect: "manual" });
+        } catch (error) {
+            window.location.href = link.href;
+        } finally {
+            link.classList.remove("disabled");
+        }
+    });
+
+    if (window.EventSource) {
+        connect();
+    }
+})();
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+End-to-End Bot Runtime Benchmark
+
+Starts N bots through BotManager against the fake Bot API, pushes M
+updates per second at them and measures update-to-reply latency,
+throughput, RSS per bot and event-loop lag.
+
+    python benchmarks/bench_runtime.py --bots 500 --rate 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SEQ_PATTERN = re.compile(r"bench-(\d+)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the bot start/poll/handle path")
+    parser.add_argument("--bots", type=int, default=100, help="Number of bots to start")
+    parser.add_argument("--rate", type=float, default=100, help="Updates per second across all bots")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to generate load")
+    parser.add_argument("--drain", type=float, default=15, help="Max seconds to wait for outstanding replies")
+    parser.add_argument("--mode", choices=["polling", "webhook"], default="polling")
+    parser.add_argument("--api-port", type=int, default=18081, help="Port of the fake Bot API")
+    parser.add_argument("--app-port", type=int, default=18000, help="Port of the webhook app (webhook mode)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+def configure_environment(args) -> str:
+    """Point the app at a scratch database and the fake API before importing it"""
+    workdir = tempfile.mkdtemp(prefix="master_bot_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{args.api_port}"
+    os.environ["BOT_RUN_MODE"] = args.mode
+    os.environ["WEBHOOK_BASE_URL"] = f"http://127.0.0.1:{args.app_port}"
+    os.environ["BOT_SHARDS"] = "0"
+    # The fake API does not rate limit; keep the scheduler out of the way
+    os.environ.setdefault("SEND_CHAT_RATE", "1000")
+    os.environ.setdefault("SEND_BOT_RATE", "1000")
+    return workdir
+
+def read_rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a sleeping task"""
+    
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+    
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+    
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - started - self.interval)
+
+async def start_webhook_app(port: int):
+    """Serve the webhook route for webhook-mode runs"""
+    import uvicorn
+    from fastapi import FastAPI
+    from app.routers import webhook
+    
+    app = FastAPI()
+    app.include_router(webhook.router, prefix="/webhook")
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+async def run(args) -> dict:
+    configure_environment(args)
+    
+    from fake_telegram import FakeTelegramServer
+    from app.db.init_db import init_db
+    from app.db.models import Bot, SessionLocal
+    from app.services.bot_manager import bot_manager
+    
+    fake_api = FakeTelegramServer(port=args.api_port)
+    await fake_api.start()
+    
+    webhook_server = None
+    if args.mode == "webhook":
+        webhook_server = await start_webhook_app(args.app_port)
+    
+    await init_db()
+    tokens = [f"{100000 + i}:bench{i:06d}" for i in range(args.bots)]
+    async with SessionLocal() as db:
+        db.add_all([
+            Bot(name=f"bench-bot-{i}", token=token, status="stopped", is_active=False)
+            for i, token in enumerate(tokens)
+        ])
+        await db.commit()
+    
+    # Start every bot and measure memory and startup time
+    rss_before = read_rss_bytes()
+    started_at = time.perf_counter()
+    async with SessionLocal() as db:
+        for bot_id in range(1, args.bots + 1):
+            await bot_manager.start_bot(db, bot_id)
+    startup_seconds = time.perf_counter() - started_at
+    rss_after = read_rss_bytes()
+    
+    # Correlate replies with injected updates
+    injected: Dict[int, float] = {}
+    latencies: List[float] = []
+    
+    def on_send_message(token: str, params: dict, now: float):
+        match = SEQ_PATTERN.search(str(params.get("text", "")))
+        if match:
+            sent_at = injected.pop(int(match.group(1)), None)
+            if sent_at is not None:
+                latencies.append(now - sent_at)
+    
+    fake_api.on_send_message.append(on_send_message)
+    
+    lag_monitor = LoopLagMonitor()
+    lag_monitor.start()
+    
+    # Generate load at a fixed rate
+    seq = 0
+    interval = 1 / args.rate
+    load_started = time.perf_counter()
+    next_at = load_started
+    while time.perf_counter() - load_started < args.duration:
+        token = random.choice(tokens)
+        chat_id = random.randint(1, 1_000_000)
+        injected[seq] = time.perf_counter()
+        await fake_api.inject_message(token, chat_id, f"bench-{seq}")
+        seq += 1
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    load_seconds = time.perf_counter() - load_started
+    
+    # Wait for outstanding replies
+    drain_started = time.perf_counter()
+    while injected and time.perf_counter() - drain_started < args.drain:
+        await asyncio.sleep(0.1)
+    total_seconds = time.perf_counter() - load_started
+    
+    await lag_monitor.stop()
+    await bot_manager.shutdown()
+    if webhook_server:
+        server, task = webhook_server
+        server.should_exit = True
+        await task
+    await fake_api.stop()
+    
+    return {
+        "mode": args.mode,
+        "bots": args.bots,
+        "target_rate": args.rate,
+        "updates_sent": seq,
+        "replies_received": len(latencies),
+        "replies_missing": len(injected),
+        "offered_rate": round(seq / load_seconds, 1),
+        "throughput": round(len(latencies) / total_seconds, 1),
+        "startup_seconds": round(startup_seconds, 3),
+        "rss_per_bot_kib": round((rss_after - rss_before) / max(args.bots, 1) / 1024, 1),
+        "rss_total_mib": round(rss_after / 1024 / 1024, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p90": round(percentile(latencies, 90) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies, default=0) * 1000, 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lag_monitor.samples, 50) * 1000, 2),
+            "p99": round(percentile(lag_monitor.samples, 99) * 1000, 2),
+            "max": round(max(lag_monitor.samples, default=0) * 1000, 2)
+        },
+        "api_calls": fake_api.api_calls
+    }
+
+def print_report(report: dict):
+    latency = report["latency_ms"]
+    lag = report["loop_lag_ms"]
+    print(f"Mode:               {report['mode']}")
+    print(f"Bots:               {report['bots']} (started in {report['startup_seconds']}s)")
+    print(f"Updates sent:       {report['updates_sent']} at {report['offered_rate']}/s")
+    print(f"Replies received:   {report['replies_received']} ({report['replies_missing']} missing)")
+    print(f"Throughput:         {report['throughput']} replies/s")
+    print(f"Latency (ms):       p50={latency['p50']} p90={latency['p90']} p99={latency['p99']} max={latency['max']}")
+    print(f"Event loop lag (ms): p50={lag['p50']} p99={lag['p99']} max={lag['max']}")
+    print(f"RSS:                {report['rss_total_mib']} MiB total, {report['rss_per_bot_kib']} KiB per bot")
+    print(f"API calls:          {report['api_calls']}")
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Serialization Benchmark
+
+Seeds a scratch database with N bots and M audit log entries and times
+turning them into a JSON response body two ways:
+
+- orm: load ORM objects, to_dict(), jsonable_encoder, stdlib JSONResponse
+- projected: column-projected rows, native datetimes, FastJSONResponse
+  (orjson when installed)
+    
+    python benchmarks/bench_serialization.py --bots 10000 --logs 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Rows inserted per statement while seeding
+SEED_BATCH_SIZE = 5000
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark bot and log list serialization")
+    parser.add_argument("--bots", type=int, default=10000, help="Bots in the payload")
+    parser.add_argument("--logs", type=int, default=100000, help="Audit log entries in the payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the best is reported")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+def configure_environment() -> str:
+    """Point the app at a scratch database before importing it"""
+    workdir = tempfile.mkdtemp(prefix="master_bot_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["BOT_SHARDS"] = "0"
+    return workdir
+
+async def seed(bots: int, logs: int):
+    """Insert the benchmark rows in bulk"""
+    from sqlalchemy import insert
+    from app.db.init_db import init_db
+    from app.db.models import AdminLog, Bot, SessionLocal
+    
+    await init_db()
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        for start in range(0, bots, SEED_BATCH_SIZE):
+            await db.execute(insert(Bot), [
+                {
+                    "name": f"bench_bot_{i}",
+                    "token": f"{1000000 + i}:AAbenchmarktoken{i:08d}",
+                    "description": f"Benchmark bot number {i}",
+                    "is_active": i % 3 == 0,
+                    "status": "running" if i % 3 == 0 else "stopped",
+                    "created_at": now - timedelta(minutes=i),
+                    "updated_at": now,
+                    "started_at": now if i % 3 == 0 else None
+                }
+                for i in range(start, min(start + SEED_BATCH_SIZE, bots))
+            ])
+        for start in range(0, logs, SEED_BATCH_SIZE):
+            await db.execute(insert(AdminLog), [
+                {
+                    "username": "admin",
+                    "action": ("start_bot", "stop_bot", "login")[i % 3],
+                    "details": f"Benchmark entry {i}",
+                    "ip_address": "127.0.0.1",
+                    "created_at": now - timedelta(seconds=i)
+                }
+                for i in range(start, min(start + SEED_BATCH_SIZE, logs))
+            ])
+        await db.commit()
+
+async def measure(load: Callable, encode: Callable, repeat: int) -> Dict[str, float]:
+    """Best load and encode times over `repeat` runs, in milliseconds"""
+    best_load = best_encode = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = await load()
+        loaded = time.perf_counter()
+        body = encode({"success": True, "data": items})
+        encoded = time.perf_counter()
+        best_load = min(best_load, loaded - start)
+        best_encode = min(best_encode, encoded - loaded)
+        size = len(body)
+    return {
+        "load_ms": round(best_load * 1000, 1),
+        "encode_ms": round(best_encode * 1000, 1),
+        "total_ms": round((best_load + best_encode) * 1000, 1),
+        "bytes": size
+    }
+
+async def run(args) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import select
+    
+    from app.core import serialization
+    from app.core.serialization import FastJSONResponse
+    from app.db.models import AdminLog, Bot, SessionLocal
+    from app.db.queries import bot_projection, log_projection
+    
+    await seed(args.bots, args.logs)
+    
+    def encode_orm(payload):
+        return JSONResponse(jsonable_encoder(payload)).body
+    
+    def encode_projected(payload):
+        return FastJSONResponse(payload).body
+    
+    async def load_orm(model):
+        async with SessionLocal() as db:
+            return [row.to_dict() for row in (await db.scalars(select(model))).all()]
+    
+    async def load_projected(columns, read):
+        async with SessionLocal() as db:
+            return [read(row) for row in (await db.execute(select(*columns))).all()]
+    
+    bot_columns, read_bot = bot_projection(native_datetimes=True)
+    log_columns, read_log = log_projection(native_datetimes=True)
+    
+    results = {}
+    for name, model, columns, read in (
+        ("bots", Bot, bot_columns, read_bot),
+        ("logs", AdminLog, log_columns, read_log)
+    ):
+        orm = await measure(lambda: load_orm(model), encode_orm, args.repeat)
+        projected = await measure(lambda: load_projected(columns, read), encode_projected, args.repeat)
+        results[name] = {
+            "orm": orm,
+            "projected": projected,
+            "speedup": round(orm["total_ms"] / projected["total_ms"], 2) if projected["total_ms"] else None
+        }
+    
+    return {
+        "bots": args.bots,
+        "logs": args.logs,
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "results": results
+    }
+
+def print_report(report: dict):
+    print(f"Payloads:           {report['bots']} bots, {report['logs']} log entries")
+    print(f"Fast path encoder:  {report['encoder']}")
+    for name, result in report["results"].items():
+        print()
+        print(f"{name}:")
+        for path in ("orm", "projected"):
+            timing = result[path]
+            print(
+                f"  {path:<10} load={timing['load_ms']:>8} ms  encode={timing['encode_ms']:>8} ms  "
+                f"total={timing['total_ms']:>8} ms  ({timing['bytes']} bytes)"
+            )
+        print(f"  speedup    {result['speedup']}x")
+
+def main():
+    args = parse_args()
+    configure_environment()
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
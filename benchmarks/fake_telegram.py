@@ -0,0 +1,186 @@
+"""
+Fake Telegram Bot API Server
+
+A local stand-in for api.telegram.org that implements just enough of the
+Bot API (getMe, getUpdates, setWebhook, deleteWebhook, sendMessage) to
+load-test BotManager. Point the app at it with TELEGRAM_API_URL.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+class FakeBotState:
+    """Pending updates and webhook of one bot token"""
+    
+    def __init__(self, token: str):
+        self.token = token
+        self.bot_id = int(token.split(":")[0])
+        self.updates: Deque[dict] = deque()
+        self.next_update_id = 1
+        self.webhook_url: Optional[str] = None
+        self.has_updates = asyncio.Event()
+
+class FakeTelegramServer:
+    """In-process fake Bot API with update injection and send hooks"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081):
+        self.host = host
+        self.port = port
+        self.bots: Dict[str, FakeBotState] = {}
+        self.sent_messages = 0
+        self.api_calls: Dict[str, int] = {}
+        self.on_send_message: List[Callable[[str, dict, float], None]] = []
+        self._next_message_id = 1
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    async def start(self):
+        """Start serving the fake API"""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._session = aiohttp.ClientSession()
+    
+    async def stop(self):
+        """Stop the server"""
+        if self._session:
+            await self._session.close()
+        if self._runner:
+            await self._runner.cleanup()
+    
+    def _state(self, token: str) -> FakeBotState:
+        state = self.bots.get(token)
+        if state is None:
+            state = self.bots[token] = FakeBotState(token)
+        return state
+    
+    async def inject_message(self, token: str, chat_id: int, text: str):
+        """Deliver a text message update to a bot"""
+        state = self._state(token)
+        update = {
+            "update_id": state.next_update_id,
+            "message": {
+                "message_id": state.next_update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+                "text": text
+            }
+        }
+        state.next_update_id += 1
+        
+        if state.webhook_url:
+            async with self._session.post(state.webhook_url, json=update) as response:
+                await response.read()
+        else:
+            state.updates.append(update)
+            state.has_updates.set()
+    
+    async def _params(self, request: web.Request) -> dict:
+        """Read call parameters from JSON or form data"""
+        if request.content_type == "application/json":
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        return params
+    
+    async def _handle(self, request: web.Request) -> web.Response:
+        token = request.match_info["token"]
+        method = request.match_info["method"]
+        params = await self._params(request)
+        state = self._state(token)
+        self.api_calls[method] = self.api_calls.get(method, 0) + 1
+        
+        if method == "getMe":
+            result = {
+                "id": state.bot_id,
+                "is_bot": True,
+                "first_name": f"Bench {state.bot_id}",
+                "username": f"bench_{state.bot_id}_bot"
+            }
+        elif method == "getUpdates":
+            result = await self._get_updates(state, params)
+        elif method == "setWebhook":
+            state.webhook_url = params.get("url")
+            result = True
+        elif method == "deleteWebhook":
+            state.webhook_url = None
+            result = True
+        elif method == "sendMessage":
+            result = self._send_message(token, params)
+        else:
+            return web.json_response(
+                {"ok": False, "error_code": 404, "description": "Not Found: method not found"},
+                status=404
+            )
+        
+        return web.json_response({"ok": True, "result": result})
+    
+    async def _get_updates(self, state: FakeBotState, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        
+        # Confirm everything below the offset
+        while state.updates and state.updates[0]["update_id"] < offset:
+            state.updates.popleft()
+        
+        if not state.updates and timeout:
+            state.has_updates.clear()
+            try:
+                await asyncio.wait_for(state.has_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        
+        return list(state.updates)[:limit]
+    
+    def _send_message(self, token: str, params: dict) -> dict:
+        now = time.perf_counter()
+        self.sent_messages += 1
+        for callback in self.on_send_message:
+            callback(token, params, now)
+        
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        chat_id = int(params["chat_id"])
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", "")
+        }
+
+async def main():
+    """Run the fake API standalone"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    
+    server = FakeTelegramServer(args.host, args.port)
+    await server.start()
+    print(f"Fake Bot API listening on {server.base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
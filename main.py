@@ -13,14 +13,25 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
 import uvicorn
 
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.routers import auth, dashboard, bots, api
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.serialization import FastJSONResponse
+from app.core.templates import fragment_cache
+from app.routers import auth, dashboard, bots, api, webhook, metrics
 from app.db.init_db import init_db
+from app.services.bot_manager import bot_manager
+from app.services.bot_registry import bot_registry
+from app.services.audit_log import audit_log
+from app.services.warm_start import warm_start
+from app.services.log_retention import log_retention
+from app.services.system_stats import system_stats
+from app.services.log_stream import log_hub
+from app.services.dashboard_feed import dashboard_feed
 
 # Setup logging
 logger = setup_logging()
@@ -30,17 +41,32 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info("Starting Master Bot System...")
+    log_hub.start()
     await init_db()
     logger.info("Database initialized successfully")
+    audit_log.start()
+    # Restore running bots in the background so the API is available at once
+    warm_start.start()
+    log_retention.start()
+    system_stats.start()
+    dashboard_feed.start()
     yield
     # Shutdown
     logger.info("Shutting down Master Bot System...")
+    await warm_start.stop()
+    await log_retention.stop()
+    await system_stats.stop()
+    await dashboard_feed.stop()
+    await bot_manager.shutdown()
+    await audit_log.stop()
+    log_hub.stop()
 
 # Create FastAPI app
 app = FastAPI(
     title="Master Bot Control Panel",
     description="A powerful system to manage multiple Telegram bots",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -53,15 +79,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-phase request timings
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency by route, outermost so it times every middleware
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+
+# Cached bot rows are re-rendered once their bot changes
+bot_registry.listeners.append(fragment_cache.invalidate)
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(dashboard.router, prefix="/admin", tags=["Dashboard"])
 app.include_router(bots.router, prefix="/admin/bots", tags=["Bot Management"])
 app.include_router(api.router, prefix="/api", tags=["API"])
+app.include_router(webhook.router, prefix="/webhook", tags=["Webhook"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,30 @@
+"""
+Test Configuration
+"""
+import os
+import tempfile
+
+import pytest
+
+# Point the app at scratch storage before any app module reads its settings
+_workdir = tempfile.mkdtemp(prefix="master_bot_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["LOG_ARCHIVE_DIR"] = f"{_workdir}/audit"
+os.environ["LOGS_DIR"] = f"{_workdir}/logs"
+os.environ["BOTS_DIR"] = f"{_workdir}/bots"
+os.environ["TEMPLATE_CACHE_DIR"] = f"{_workdir}/templates"
+os.environ["BOT_SHARDS"] = "0"
+os.environ["ADMIN_USERNAME"] = "admin"
+os.environ["ADMIN_PASSWORD"] = "admin123"
+os.environ["ADMIN_PASSWORD_HASH"] = ""
+
+@pytest.fixture
+def client():
+    """Admin app client signed in with HTTP Basic"""
+    from fastapi.testclient import TestClient
+    
+    import main
+    
+    with TestClient(main.app) as client:
+        client.auth = ("admin", "admin123")
+        yield client
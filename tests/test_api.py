@@ -0,0 +1,28 @@
+"""
+API Tests
+"""
+
+def test_bot_crud_round_trip(client):
+    created = client.post("/api/bots", params={"name": "crud_bot", "token": "111:CRUD", "description": "x"})
+    assert created.status_code == 200
+    bot_id = created.json()["data"]["id"]
+    
+    bot = client.get(f"/api/bots/{bot_id}").json()["data"]
+    assert bot["name"] == "crud_bot"
+    assert bot["status"] == "stopped"
+    assert bot["token_masked"] == "111:CRUD..."
+    
+    names = [bot["name"] for bot in client.get("/api/bots", params={"name": "crud"}).json()["data"]]
+    assert names == ["crud_bot"]
+    
+    duplicate = client.post("/api/bots", params={"name": "crud_bot", "token": "222:CRUD"})
+    assert duplicate.status_code == 400
+    
+    assert client.delete(f"/api/bots/{bot_id}").json()["success"]
+    assert client.get(f"/api/bots/{bot_id}").status_code == 404
+
+def test_api_requires_credentials(client):
+    client.auth = None
+    assert client.get("/api/bots").status_code == 401
+    client.auth = ("admin", "wrong")
+    assert client.get("/api/bots").status_code == 401
@@ -0,0 +1,66 @@
+"""
+Audit Log Writer Tests
+"""
+import asyncio
+import sys
+
+from sqlalchemy import func, select
+
+from app.db.init_db import init_db
+from app.db.models import AdminLog, SessionLocal, engine
+from app.services.audit_log import AuditLogWriter
+
+def test_failing_listener_does_not_lose_the_entry():
+    async def run():
+        await init_db()
+        writer = AuditLogWriter(batch_size=10, flush_interval=60)
+        seen = []
+        
+        def broken(entry):
+            raise RuntimeError("listener bug")
+        
+        writer.listeners.extend([broken, seen.append])
+        writer.log("listener_test", "login")
+        await writer.stop()
+        
+        async with SessionLocal() as db:
+            stored = await db.scalar(
+                select(func.count()).select_from(AdminLog).where(AdminLog.username == "listener_test")
+            )
+        await engine.dispose()
+        return seen, stored
+    
+    seen, stored = asyncio.run(run())
+    assert [entry["action"] for entry in seen] == ["login"]
+    assert stored == 1
+
+class FailingSession:
+    """Session factory stand-in whose writes always fail"""
+    
+    async def __aenter__(self):
+        raise RuntimeError("database is locked")
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+def test_batch_is_dropped_after_max_retries(monkeypatch):
+    monkeypatch.setattr(sys.modules[AuditLogWriter.__module__], "SessionLocal", FailingSession)
+    
+    async def run():
+        writer = AuditLogWriter(batch_size=10, flush_interval=60, max_retries=2)
+        for i in range(3):
+            writer.log("retry_test", f"action_{i}")
+        
+        depths = []
+        for _ in range(4):
+            await writer.flush()
+            depths.append(writer.depth)
+        stats = writer.get_stats()
+        await writer.stop()
+        return depths, stats
+    
+    depths, stats = asyncio.run(run())
+    # Two retries keep the batch, the third failure drops it
+    assert depths == [3, 3, 0, 0]
+    assert stats["failures"] == 3
+    assert stats["dropped"] == 3
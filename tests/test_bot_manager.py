@@ -0,0 +1,140 @@
+"""
+Bot Manager Tests
+"""
+import asyncio
+import random
+from datetime import datetime
+
+from aiogram import Bot as AioBot, Dispatcher
+
+from app.core import metrics
+from app.db.init_db import init_db
+from app.db.models import Bot, SessionLocal, engine
+from app.services.bot_manager import BotManager
+from app.services.polling import UPDATES_LIMIT
+
+class RecordingDispatcher(Dispatcher):
+    """Dispatcher that records the order updates are handled in"""
+    
+    def __init__(self):
+        super().__init__(AioBot("123456:TEST"))
+        self.handled = []
+    
+    async def process_update(self, update):
+        # Yield so a later batch would get the chance to overtake this one
+        await asyncio.sleep(random.random() / 1000)
+        self.handled.append(update.update_id)
+
+def test_full_batches_are_processed_in_order():
+    async def run():
+        manager = BotManager()
+        dp = RecordingDispatcher()
+        manager.bot_instances[1] = (dp.bot, dp)
+        
+        # Two full batches back to back, as the scheduler polls them
+        first = [{"update_id": i} for i in range(UPDATES_LIMIT)]
+        second = [{"update_id": i} for i in range(UPDATES_LIMIT, 2 * UPDATES_LIMIT)]
+        assert manager._dispatch(1, first)
+        assert manager._dispatch(1, second)
+        
+        while manager._update_tasks:
+            await asyncio.wait(list(manager._update_tasks.values()))
+        return dp.handled
+    
+    assert asyncio.run(run()) == list(range(2 * UPDATES_LIMIT))
+
+def test_batches_of_different_bots_run_concurrently():
+    async def run():
+        manager = BotManager()
+        dispatchers = {bot_id: RecordingDispatcher() for bot_id in (1, 2)}
+        for bot_id, dp in dispatchers.items():
+            manager.bot_instances[bot_id] = (dp.bot, dp)
+            manager._dispatch(bot_id, [{"update_id": i} for i in range(10)])
+        
+        assert len(manager._update_tasks) == 2
+        await asyncio.wait(list(manager._update_tasks.values()))
+        assert not manager._update_tasks
+        return [dp.handled for dp in dispatchers.values()]
+    
+    assert asyncio.run(run()) == [list(range(10))] * 2
+
+def test_malformed_webhook_updates_are_dropped_without_losing_the_batch():
+    async def run():
+        manager = BotManager()
+        dp = RecordingDispatcher()
+        manager.bot_instances[7] = (dp.bot, dp)
+        errors_before = metrics.BOT_HANDLER_ERRORS.labels(7).value
+        
+        manager._dispatch(7, [
+            {"update_id": 1, "message": [1]},
+            {"update_id": 2, "message": {"date": "bad"}},
+            {"update_id": 3}
+        ])
+        await asyncio.wait(list(manager._update_tasks.values()))
+        return dp.handled, metrics.BOT_HANDLER_ERRORS.labels(7).value - errors_before
+    
+    handled, errors = asyncio.run(run())
+    assert handled == [3]
+    assert errors == 2
+
+class SlowChatDispatcher(RecordingDispatcher):
+    """Dispatcher whose handler is slow for one chat, like a rate-limited reply"""
+    
+    def __init__(self, slow_chat_id: int):
+        super().__init__()
+        self.slow_chat_id = slow_chat_id
+    
+    async def process_update(self, update):
+        if update.message.chat.id == self.slow_chat_id:
+            await asyncio.sleep(0.05)
+        self.handled.append((update.message.chat.id, update.update_id))
+
+def _chat_update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "chat": {"id": chat_id, "type": "private"}}
+    }
+
+def test_busy_chat_does_not_hold_up_other_chats_of_the_bot():
+    async def run():
+        manager = BotManager()
+        dp = SlowChatDispatcher(slow_chat_id=100)
+        manager.bot_instances[1] = (dp.bot, dp)
+        
+        manager._dispatch(1, [_chat_update(i, 100) for i in range(8)])
+        manager._dispatch(1, [_chat_update(8, 100), _chat_update(9, 200)])
+        
+        while manager._update_tasks:
+            await asyncio.wait(list(manager._update_tasks.values()))
+        return dp.handled
+    
+    handled = asyncio.run(run())
+    # The other chat is handled before the busy chat gets through its first update
+    assert handled[0] == (200, 9)
+    # Updates of the busy chat keep their order across batches
+    assert [update_id for chat_id, update_id in handled if chat_id == 100] == list(range(9))
+
+def test_bulk_stop_drops_per_bot_metric_series():
+    async def run():
+        await init_db()
+        async with SessionLocal() as db:
+            bots = [Bot(name=f"bulk_stop_{i}", token=f"{900 + i}:BULK", status="running", is_active=True) for i in range(2)]
+            db.add_all(bots)
+            await db.commit()
+            bot_ids = [bot.id for bot in bots]
+            
+            manager = BotManager()
+            for bot_id in bot_ids:
+                dp = RecordingDispatcher()
+                manager.bot_instances[bot_id] = (dp.bot, dp)
+                manager.active_bots[bot_id] = datetime.utcnow()
+                metrics.BOT_UPDATES_RECEIVED.labels(bot_id, "polling").inc()
+            
+            results = await manager.stop_bots(db, bot_ids)
+        await engine.dispose()
+        return bot_ids, results
+    
+    bot_ids, results = asyncio.run(run())
+    assert all(results.values())
+    series = {labels["bot_id"] for _, labels, _ in metrics.BOT_UPDATES_RECEIVED.collect()["samples"]}
+    assert not series & {str(bot_id) for bot_id in bot_ids}
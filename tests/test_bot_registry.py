@@ -0,0 +1,79 @@
+"""
+Bot Registry Tests
+"""
+import asyncio
+
+from sqlalchemy import update
+
+from app.db.init_db import init_db
+from app.db.models import Bot, SessionLocal, engine
+from app.services.bot_registry import bot_registry
+
+async def _create_bots(prefix: str, count: int, **values) -> list:
+    async with SessionLocal() as db:
+        bots = [Bot(name=f"{prefix}_{i}", token=f"{i}:{prefix.upper()}", **values) for i in range(count)]
+        db.add_all(bots)
+        await db.commit()
+        return [bot.id for bot in bots]
+
+def test_commits_invalidate_only_the_changed_bots():
+    async def run():
+        await init_db()
+        bot_ids = await _create_bots("reg_hooks", 3)
+        await bot_registry.get(bot_ids[0])
+        full_loads = bot_registry.full_loads
+        
+        async with SessionLocal() as db:
+            bot = await db.get(Bot, bot_ids[0])
+            bot.status = "running"
+            await db.commit()
+            
+            # Rolled back changes never reach the registry
+            bot.status = "error"
+            await db.flush()
+            await db.rollback()
+        pending_after_rollback = bot_registry.get_stats()["pending_invalidations"]
+        orm_status = (await bot_registry.get(bot_ids[0]))["status"]
+        reloaded_fully = bot_registry.full_loads != full_loads
+        
+        async with SessionLocal() as db:
+            await db.execute(update(Bot).where(Bot.id.in_(bot_ids[1:])).values(status="error"))
+            await db.commit()
+        counts = await bot_registry.counts()
+        bulk_statuses = [(await bot_registry.get(bot_id))["status"] for bot_id in bot_ids]
+        await engine.dispose()
+        return pending_after_rollback, orm_status, reloaded_fully, bulk_statuses, counts, full_loads
+    
+    pending_after_rollback, orm_status, reloaded_fully, bulk_statuses, counts, full_loads = asyncio.run(run())
+    # Only the committed change is waiting to be loaded
+    assert pending_after_rollback == 1
+    assert orm_status == "running"
+    assert not reloaded_fully
+    # A bulk UPDATE may touch any row, so the whole table is reloaded
+    assert bot_registry.full_loads == full_loads + 1
+    assert bulk_statuses == ["running", "error", "error"]
+    assert counts["error"] >= 2
+
+def test_pages_follow_the_cursor_in_id_order():
+    async def run():
+        await init_db()
+        bot_ids = await _create_bots("reg_page", 5)
+        async with SessionLocal() as db:
+            await db.execute(update(Bot).where(Bot.id.in_(bot_ids[::2])).values(status="running"))
+            await db.commit()
+        
+        pages = []
+        cursor = None
+        while True:
+            bots, cursor = await bot_registry.page(2, after=cursor, name="REG_PAGE")
+            pages.append([bot["id"] for bot in bots])
+            if cursor is None:
+                break
+        
+        running, _ = await bot_registry.page(10, status="running", name="reg_page")
+        await engine.dispose()
+        return bot_ids, pages, [bot["id"] for bot in running]
+    
+    bot_ids, pages, running = asyncio.run(run())
+    assert pages == [bot_ids[0:2], bot_ids[2:4], bot_ids[4:]]
+    assert running == bot_ids[::2]
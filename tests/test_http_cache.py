@@ -0,0 +1,46 @@
+"""
+Conditional GET Tests
+"""
+import time
+
+from app.core.http_cache import ResponseCache
+
+def test_unchanged_bot_list_is_answered_with_304(client):
+    first = client.get("/api/bots", params={"name": "etag_bot"})
+    etag = first.headers["ETag"]
+    
+    repeat = client.get("/api/bots", params={"name": "etag_bot"}, headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert repeat.headers["ETag"] == etag
+    
+    # Another query is another representation
+    other = client.get("/api/bots", params={"name": "etag_bo"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+    
+    client.post("/api/bots", params={"name": "etag_bot", "token": "333:ETAG"})
+    changed = client.get("/api/bots", params={"name": "etag_bot"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [bot["name"] for bot in changed.json()["data"]] == ["etag_bot"]
+
+def test_unversioned_responses_get_a_body_etag(client):
+    first = client.get("/api/stats")
+    etag = first.headers["ETag"]
+    # Served from the short-lived cache, so the body and its digest match
+    repeat = client.get("/api/stats", headers={"If-None-Match": f'"other", {etag}'})
+    assert repeat.status_code == 304
+
+def test_response_cache_expires_and_tracks_versions():
+    cache = ResponseCache(ttl=0.05, max_entries=2)
+    cache.put(("/a", ""), "1", b"a", '"a"')
+    assert cache.get(("/a", ""), "1") == (b"a", '"a"')
+    assert cache.get(("/a", ""), "2") is None
+    
+    cache.put(("/b", ""), None, b"b", '"b"')
+    cache.put(("/c", ""), None, b"c", '"c"')
+    assert cache.get(("/a", ""), "1") is None
+    
+    time.sleep(0.06)
+    assert cache.get(("/c", ""), None) is None
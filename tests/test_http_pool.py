@@ -0,0 +1,50 @@
+"""
+Shared HTTP Pool Tests
+"""
+import asyncio
+
+from aiohttp import web
+
+from app.core.config import settings
+from app.services.http_pool import create_telegram_bot, http_pool
+
+async def _serve_get_me() -> web.AppRunner:
+    """Minimal Bot API answering getMe on a free local port"""
+    async def get_me(request):
+        bot_id = int(request.match_info["token"].split(":")[0])
+        return web.json_response({"ok": True, "result": {"id": bot_id, "is_bot": True, "first_name": "Pool"}})
+    
+    app = web.Application()
+    app.router.add_post("/bot{token}/getMe", get_me)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+def test_bots_share_one_session_and_reuse_connections(monkeypatch):
+    async def run():
+        runner = await _serve_get_me()
+        port = runner.addresses[0][1]
+        monkeypatch.setattr(settings, "TELEGRAM_API_URL", f"http://127.0.0.1:{port}")
+        before = http_pool.get_stats()
+        try:
+            bots = [await create_telegram_bot(f"{bot_id}:POOL") for bot_id in (1, 2)]
+            sessions = {id(await bot.get_session()) for bot in bots}
+            
+            for bot in bots * 2:
+                await bot.get_me()
+            
+            # Closing one bot must leave the pool usable for the others
+            await bots[0].close()
+            me = await bots[1].get_me()
+            after = http_pool.get_stats()
+            return sessions, me.id, {key: after[key] - before[key] for key in ("connections_created", "connections_reused")}
+        finally:
+            await http_pool.close()
+            await runner.cleanup()
+    
+    sessions, me_id, stats = asyncio.run(run())
+    assert len(sessions) == 1
+    assert me_id == 2
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] >= 4
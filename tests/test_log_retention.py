@@ -0,0 +1,47 @@
+"""
+Log Retention Tests
+"""
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select
+
+from app.db.init_db import init_db
+from app.db.models import AdminLog, SessionLocal, engine
+from app.services.log_retention import LogRetention
+
+def test_old_rows_are_archived_and_queried_with_aware_bounds(tmp_path):
+    day = (datetime.utcnow() - timedelta(days=3)).replace(hour=12, minute=0, second=0, microsecond=0)
+    
+    async def run():
+        await init_db()
+        async with SessionLocal() as db:
+            await db.execute(insert(AdminLog), [
+                {"username": "archiver", "action": f"action_{i % 2}", "created_at": day + timedelta(seconds=i)}
+                for i in range(1500)
+            ])
+            await db.commit()
+        
+        retention = LogRetention(retention_days=1, archive_dir=str(tmp_path), chunk_size=1200)
+        moved = await retention.run()
+        async with SessionLocal() as db:
+            left = await db.scalar(select(func.count()).select_from(AdminLog).where(AdminLog.username == "archiver"))
+        
+        # The API parses "...Z" and "+02:00" query values into aware datetimes
+        since = day.replace(tzinfo=timezone.utc)
+        until = (day + timedelta(hours=2, seconds=10)).replace(tzinfo=timezone(timedelta(hours=2)))
+        entries = await retention.query(since, until, action="action_1")
+        await engine.dispose()
+        return moved, left, retention.partition_path(day.date()), entries
+    
+    moved, left, path, entries = asyncio.run(run())
+    assert moved == 1500
+    assert left == 0
+    with gzip.open(path, "rt") as f:
+        assert len([json.loads(line) for line in f]) == 1500
+    # Seconds 0-9 of the day in UTC, odd ones only
+    assert [entry["created_at"] for entry in entries] == [
+        (day + timedelta(seconds=i)).isoformat() for i in range(1, 10, 2)
+    ]
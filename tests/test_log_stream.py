@@ -0,0 +1,73 @@
+"""
+Live Log Stream Tests
+"""
+import asyncio
+import logging
+import threading
+
+from app.services.log_stream import LogHub, LogStreamHandler
+
+def _entry(bot_id: int, message: str, levelno: int = logging.INFO) -> dict:
+    return {
+        "time": "2026-01-01T00:00:00",
+        "level": logging.getLevelName(levelno),
+        "levelno": levelno,
+        "logger": "test",
+        "bot_id": bot_id,
+        "message": message
+    }
+
+def test_slow_client_loses_oldest_lines_and_is_told_how_many():
+    async def run():
+        hub = LogHub(history=100, client_buffer=3)
+        subscriber, _ = hub.subscribe(bot_id=1, min_level=logging.INFO)
+        hub.publish([_entry(1, f"line {i}") for i in range(5)])
+        hub.publish([_entry(2, "other bot"), _entry(1, "too quiet", logging.DEBUG)])
+        entries, dropped = await subscriber.next_batch(timeout=1)
+        return [entry["message"] for entry in entries], dropped, hub.get_stats()
+    
+    messages, dropped, stats = asyncio.run(run())
+    assert messages == ["line 2", "line 3", "line 4"]
+    assert dropped == 2
+    assert stats["dropped"] == 2
+
+def test_reconnecting_client_gets_the_lines_it_missed():
+    async def run():
+        hub = LogHub(history=4, client_buffer=100)
+        hub.publish([_entry(1, f"line {i}") for i in range(1, 7)])
+        
+        caught_up, missed = hub.subscribe(bot_id=None, min_level=logging.INFO, after=4)
+        behind, missed_behind = hub.subscribe(bot_id=None, min_level=logging.INFO, after=1)
+        # A sequence number from before a restart replays everything kept
+        restarted, _ = hub.subscribe(bot_id=None, min_level=logging.INFO, after=99)
+        
+        batches = [await client.next_batch(timeout=1) for client in (caught_up, behind, restarted)]
+        return [[entry["seq"] for entry in entries] for entries, _ in batches], missed, missed_behind
+    
+    seqs, missed, missed_behind = asyncio.run(run())
+    assert seqs == [[5, 6], [3, 4, 5, 6], [3, 4, 5, 6]]
+    assert missed == 0
+    # Line 2 fell out of the history before the client came back
+    assert missed_behind == 1
+
+def test_handler_hands_records_from_other_threads_to_the_loop():
+    async def run():
+        hub = LogHub(history=100, client_buffer=100)
+        subscriber, _ = hub.subscribe(bot_id=7, min_level=logging.INFO)
+        handler = LogStreamHandler(hub, asyncio.get_running_loop(), max_pending=100)
+        
+        def log_from_thread():
+            for i in range(3):
+                handler.emit(logging.makeLogRecord({"msg": f"line {i}", "levelno": logging.INFO, "levelname": "INFO", "bot_id": 7}))
+            # Records without a bot are not tailed
+            handler.emit(logging.makeLogRecord({"msg": "app", "levelno": logging.INFO, "levelname": "INFO"}))
+        
+        thread = threading.Thread(target=log_from_thread)
+        thread.start()
+        thread.join()
+        entries, _ = await subscriber.next_batch(timeout=1)
+        return [entry["message"] for entry in entries], hub.get_stats()["seq"]
+    
+    messages, seq = asyncio.run(run())
+    assert messages == ["line 0", "line 1", "line 2"]
+    assert seq == 3
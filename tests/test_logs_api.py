@@ -0,0 +1,74 @@
+"""
+Audit Log API Tests
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.db.models import AdminLog, SessionLocal, engine
+from app.db.queries import EXPORT_BATCH_SIZE
+
+def _seed_logs(username: str, count: int) -> datetime:
+    """Insert entries two per timestamp, so pages split ties on created_at"""
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    
+    async def run():
+        async with SessionLocal() as db:
+            await db.execute(insert(AdminLog), [
+                {"username": username, "action": f"action_{i % 3}", "created_at": start + timedelta(seconds=i // 2)}
+                for i in range(count)
+            ])
+            await db.commit()
+        await engine.dispose()
+    
+    asyncio.run(run())
+    return start
+
+def test_log_pages_cover_every_entry_once_newest_first(client):
+    _seed_logs("cursor_test", 25)
+    
+    entries = []
+    cursor = None
+    while True:
+        params = {"username": "cursor_test", "limit": 4}
+        if cursor:
+            params["before"] = cursor
+        page = client.get("/api/logs", params=params).json()
+        entries.extend(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    
+    ids = [entry["id"] for entry in entries]
+    assert len(ids) == 25 == len(set(ids))
+    keys = [(entry["created_at"], entry["id"]) for entry in entries]
+    assert keys == sorted(keys, reverse=True)
+    
+    assert client.get("/api/logs", params={"before": "not-a-cursor"}).status_code == 400
+
+def test_log_filters_accept_aware_bounds(client):
+    start = _seed_logs("aware_test", 10)
+    params = {"username": "aware_test", "since": f"{start.isoformat()}Z", "until": f"{start.isoformat()}+00:00"}
+    assert client.get("/api/logs", params=params).json()["data"] == []
+    
+    params["until"] = f"{(start + timedelta(hours=2, seconds=2)).isoformat()}+02:00"
+    assert len(client.get("/api/logs", params=params).json()["data"]) == 4
+
+def test_export_streams_every_matching_entry(client):
+    count = EXPORT_BATCH_SIZE + 10
+    _seed_logs("export_test", count)
+    
+    response = client.get("/api/logs/export", params={"username": "export_test", "action": "action_0"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    entries = [json.loads(line) for line in response.text.splitlines()]
+    assert len(entries) == len(range(0, count, 3))
+    assert [entry["id"] for entry in entries] == sorted(entry["id"] for entry in entries)
+    
+    response = client.get("/api/logs/export", params={"username": "export_test", "format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == count
+    assert rows[0]["username"] == "export_test"
@@ -0,0 +1,56 @@
+"""
+End-to-End Runtime Tests
+"""
+import asyncio
+import socket
+
+from benchmarks.fake_telegram import FakeTelegramServer
+
+from app.core.config import settings
+from app.db.init_db import init_db
+from app.db.models import Bot, SessionLocal, engine
+from app.services.bot_manager import BotManager
+from app.services.http_pool import http_pool
+from app.services.send_scheduler import send_scheduler
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_polled_bot_answers_through_the_fake_api(monkeypatch):
+    async def run():
+        server = FakeTelegramServer(port=_free_port())
+        await server.start()
+        monkeypatch.setattr(settings, "TELEGRAM_API_URL", server.base_url)
+        
+        replies = asyncio.Queue()
+        server.on_send_message.append(lambda token, params, now: replies.put_nowait(params))
+        
+        await init_db()
+        manager = BotManager()
+        try:
+            async with SessionLocal() as db:
+                bot = Bot(name="runtime_bot", token="4242:RUNTIME")
+                db.add(bot)
+                await db.commit()
+                assert await manager.start_bot(db, bot.id)
+                
+                await server.inject_message(bot.token, chat_id=77, text="/status")
+                reply = await asyncio.wait_for(replies.get(), 10)
+                
+                assert await manager.stop_bot(db, bot.id)
+                await db.refresh(bot)
+                return reply, bot.status, server.api_calls
+        finally:
+            await manager.shutdown()
+            await send_scheduler.stop()
+            await http_pool.close()
+            await server.stop()
+            await engine.dispose()
+    
+    reply, status, api_calls = asyncio.run(run())
+    assert reply["chat_id"] == 77
+    assert "runtime_bot" in reply["text"]
+    assert status == "stopped"
+    assert api_calls["getUpdates"] >= 1
@@ -0,0 +1,77 @@
+"""
+Authentication Tests
+"""
+import asyncio
+import time
+from datetime import timedelta
+
+from app.core import security
+from app.core.security import (
+    TTLCache,
+    authenticate_admin,
+    create_access_token,
+    credential_cache,
+    decode_access_token_cached,
+    token_cache
+)
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+def test_decoded_tokens_are_cached_until_they_expire():
+    token_cache.clear()
+    token = create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=2))
+    payload = decode_access_token_cached(token)
+    assert payload["sub"] == "admin"
+    
+    # The cached entry never outlives the token itself
+    _, expires_at = token_cache._entries[token]
+    assert expires_at - time.monotonic() <= 2
+    assert decode_access_token_cached(token) is payload
+    
+    assert decode_access_token_cached("not.a.token") is None
+    expired = create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=-1))
+    assert decode_access_token_cached(expired) is None
+    assert expired not in token_cache._entries
+
+def test_verified_passwords_skip_bcrypt_until_the_cache_expires(monkeypatch):
+    credential_cache.clear()
+    verifications = []
+    verify_password = security.verify_password
+    
+    def counting_verify(password, password_hash):
+        verifications.append(password)
+        return verify_password(password, password_hash)
+    
+    monkeypatch.setattr(security, "verify_password", counting_verify)
+    
+    async def run():
+        return [
+            await authenticate_admin("admin", "admin123"),
+            await authenticate_admin("admin", "admin123"),
+            await authenticate_admin("admin", "wrong"),
+            await authenticate_admin("admin", "wrong"),
+            await authenticate_admin("someone", "admin123")
+        ]
+    
+    assert asyncio.run(run()) == [True, True, False, False, False]
+    # One bcrypt check for the good password, one per attempt with a bad one
+    assert verifications == ["admin123", "wrong", "wrong"]
+    assert not any("admin123" in key for key in credential_cache._entries)
+
+def test_issued_token_authenticates_api_requests(client):
+    token = client.post("/auth/token").json()["access_token"]
+    client.auth = None
+    response = client.get("/api/bots/counts", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert client.get("/api/bots/counts", headers={"Authorization": "Bearer forged"}).status_code == 401
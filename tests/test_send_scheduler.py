@@ -0,0 +1,94 @@
+"""
+Send Scheduler Tests
+"""
+import asyncio
+import time
+
+from aiogram.utils.exceptions import RetryAfter
+
+from app.services.send_scheduler import PRIORITY_BROADCAST, SendScheduler
+
+def test_replies_are_sent_before_queued_broadcasts():
+    async def run():
+        scheduler = SendScheduler(bot_rate=1000, chat_rate=1000, global_rate=0)
+        sent = []
+        
+        async def send(name):
+            sent.append(name)
+        
+        broadcasts = [
+            asyncio.create_task(scheduler.send(1, chat_id, lambda c=chat_id: send(f"broadcast {c}"), PRIORITY_BROADCAST))
+            for chat_id in range(3)
+        ]
+        reply = asyncio.create_task(scheduler.send(1, 10, lambda: send("reply")))
+        await asyncio.gather(*broadcasts, reply)
+        await scheduler.stop()
+        return sent
+    
+    assert asyncio.run(run()) == ["reply", "broadcast 0", "broadcast 1", "broadcast 2"]
+
+def test_chat_rate_limit_does_not_hold_up_other_chats():
+    async def run():
+        scheduler = SendScheduler(bot_rate=1000, chat_rate=10, global_rate=0)
+        done_at = {}
+        start = time.monotonic()
+        
+        async def send(name):
+            done_at[name] = time.monotonic() - start
+        
+        await asyncio.gather(
+            *(scheduler.send(1, 100, lambda i=i: send(f"busy {i}")) for i in range(3)),
+            scheduler.send(1, 200, lambda: send("other"))
+        )
+        await scheduler.stop()
+        return done_at
+    
+    done_at = asyncio.run(run())
+    # Three sends to one chat at 10/s need two refills of its bucket
+    assert done_at["busy 2"] >= 0.18
+    assert done_at["other"] < 0.1
+
+def test_rate_limited_send_pauses_the_bot_and_is_retried():
+    async def run():
+        scheduler = SendScheduler(bot_rate=1000, chat_rate=1000, global_rate=0)
+        attempts = []
+        
+        async def send():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryAfter(1)
+            return "ok"
+        
+        result = await scheduler.send(1, 100, send)
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return result, attempts, stats
+    
+    result, attempts, stats = asyncio.run(run())
+    assert result == "ok"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.9
+    assert stats["rate_limited"] == 1
+    assert stats["sent"] == 1
+
+def test_forget_cancels_queued_sends():
+    async def run():
+        scheduler = SendScheduler(bot_rate=1, chat_rate=1000, global_rate=0)
+        
+        async def send():
+            return "ok"
+        
+        first = asyncio.create_task(scheduler.send(1, 100, send))
+        second = asyncio.create_task(scheduler.send(1, 200, send))
+        assert await first == "ok"
+        # The bot bucket is empty, so the second send is still queued
+        scheduler.forget(1)
+        results = await asyncio.gather(second, return_exceptions=True)
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return results, stats
+    
+    results, stats = asyncio.run(run())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert stats["queued"] == 0
+    assert stats["bots_tracked"] == 0
@@ -0,0 +1,41 @@
+"""
+Sharding Tests
+"""
+import asyncio
+import multiprocessing
+import time
+
+from app.services.sharding import PipeWriter
+
+def test_pipe_writer_does_not_block_the_loop_on_a_full_pipe():
+    async def run():
+        reader, conn = multiprocessing.Pipe(duplex=False)
+        writer = PipeWriter(conn, "test-writer", on_error=lambda: None)
+        
+        # Far more than the pipe buffer holds while nobody reads
+        start = time.monotonic()
+        writer.send({"event": "logs", "entries": ["x" * 4_000_000]})
+        writer.send({"event": "logs", "entries": ["done"]})
+        queued_in = time.monotonic() - start
+        
+        received = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [reader.recv() for _ in range(2)]
+        )
+        writer.close()
+        return queued_in, received
+    
+    queued_in, received = asyncio.run(run())
+    assert queued_in < 0.5
+    assert received[1]["entries"] == ["done"]
+
+def test_pipe_writer_reports_a_closed_peer():
+    async def run():
+        reader, conn = multiprocessing.Pipe(duplex=False)
+        failed = asyncio.Event()
+        writer = PipeWriter(conn, "test-writer", on_error=failed.set)
+        reader.close()
+        writer.send({"event": "logs", "entries": []})
+        await asyncio.wait_for(failed.wait(), 5)
+        writer.close()
+    
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+"""
+Supervisor Tests
+"""
+import asyncio
+
+from app.db.init_db import init_db
+from app.db.models import Bot, SessionLocal, engine
+from app.services.supervisor import BotSupervisor
+
+class FlakyManager:
+    """Webhook-mode manager whose first relaunch of a bot fails"""
+    
+    webhook_mode = True
+    
+    def __init__(self):
+        self.bot_instances = {}
+        self.polling = type("Polling", (), {"crashed": False})()
+        self.launches = 0
+    
+    async def _halt(self, bot_id: int):
+        self.bot_instances.pop(bot_id, None)
+    
+    async def _launch(self, bot: Bot):
+        self.launches += 1
+        if self.launches == 1:
+            raise RuntimeError("Bot API unreachable")
+        self.bot_instances[bot.id] = object()
+    
+    def _mark_running(self, bot: Bot):
+        bot.is_active = True
+        bot.status = "running"
+
+def test_backoff_doubles_with_jitter_up_to_the_cap():
+    supervisor = BotSupervisor(manager=None, backoff_base=1, backoff_max=8)
+    for failures, delay in ((1, 1), (2, 2), (3, 4), (4, 8), (10, 8)):
+        for _ in range(20):
+            assert delay / 2 <= supervisor._backoff(failures) <= delay
+
+def test_lost_bot_is_restarted_after_a_failed_attempt():
+    async def run():
+        await init_db()
+        async with SessionLocal() as db:
+            bot = Bot(name="supervised_bot", token="555:SUPERVISED", is_active=True, status="running")
+            db.add(bot)
+            await db.commit()
+        
+        manager = FlakyManager()
+        supervisor = BotSupervisor(manager, interval=3600, backoff_base=0.01, backoff_max=0.01)
+        supervisor.watch(bot.id)
+        
+        states = []
+        for _ in range(6):
+            await supervisor.check()
+            await asyncio.gather(*supervisor._restarts)
+            await asyncio.sleep(0.02)
+            states.append(supervisor.get_bot_health(bot.id)["state"])
+        
+        health = supervisor.get_bot_health(bot.id)
+        await supervisor.stop()
+        async with SessionLocal() as db:
+            status = (await db.get(Bot, bot.id)).status
+        await engine.dispose()
+        return states, health, status, manager.launches
+    
+    states, health, status, launches = asyncio.run(run())
+    # Lost instance, failed relaunch, then a successful one
+    assert states[:3] == ["backoff", "backoff", "ok"]
+    assert launches == 2
+    assert health["restarts"] == 2
+    assert health["last_error"] == "Bot API unreachable"
+    assert status == "running"